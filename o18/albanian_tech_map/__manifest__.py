@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 {
     'name': 'Albanian Tech Map',
-    'version': '18.0.1.0.0',
+    'version': '18.0.1.1.0',
     'category': 'Website',
     'summary': 'Interactive map of Albanian IT companies in Tirane',
     'description': """
@@ -34,7 +34,6 @@ Features:
         'security/security.xml',
         'security/ir.model.access.csv',
         'data/ir_cron.xml',
-        'data/tech_company_data.xml',
         'views/tech_company_views.xml',
         'views/tech_company_scraper_views.xml',
         'views/map_template.xml',
@@ -42,7 +41,6 @@ Features:
     'assets': {
         'web.assets_frontend': [
             'albanian_tech_map/static/src/css/map.css',
-            'albanian_tech_map/static/src/js/map.js',
         ],
     },
     'installable': True,
@@ -2,7 +2,62 @@
 
 from odoo import http
 from odoo.http import request
-import json
+from odoo.tools import config
+from odoo.addons.albanian_tech_map.models.tech_company import (
+    MAP_API_COLUMNS, ALL_API_COLUMNS, MAP_CLUSTER_BELOW_ZOOM, MAP_CLUSTER_MAX_ZOOM, MAP_TILE_MAX_ZOOM,
+    fold_text, tile_bbox,
+)
+from collections import OrderedDict
+from datetime import datetime, timezone
+import hashlib
+import logging
+import os
+import re
+import shutil
+import threading
+
+_logger = logging.getLogger(__name__)
+
+# (dbname, city filter) -> (version, body, etag, last_modified) of the last
+# encoded /techmap/api/companies response; reused while the tech.company
+# snapshot version is unchanged. Least recently used first.
+_SNAPSHOT_CACHE = OrderedDict()
+SNAPSHOT_CACHE_SIZE = 32
+_SNAPSHOT_CACHE_LOCK = threading.Lock()
+
+# /techmap/api/v2/companies: public field name -> tech.company field
+API_V2_FIELDS = {
+    'id': 'id',
+    'name': 'name',
+    'nipt': 'nipt',
+    'city': 'city',
+    'legal_form': 'legal_form',
+    'registration_date': 'registration_date',
+    'category': 'category',
+    'lat': 'latitude',
+    'lng': 'longitude',
+    'website': 'website',
+    'email': 'email',
+    'phone': 'phone',
+    'is_tech': 'is_tech',
+    'activity_description': 'activity_description',
+}
+# Returned when no fields= is given - the long activity text is opt-in
+API_V2_DEFAULT_FIELDS = ['id', 'name', 'nipt', 'city', 'legal_form', 'category', 'lat', 'lng', 'is_tech']
+API_V2_DEFAULT_LIMIT = 100
+API_V2_MAX_LIMIT = 1000
+# Vector tiles are cached under
+# <data_dir>/TILE_CACHE_DIR/<db>/<clusters|companies>/<version digits>/<category>/z/x/y.pbf
+TILE_CACHE_DIR = 'techmap_tiles'
+TILE_CONTENT_TYPE = 'application/vnd.mapbox-vector-tile'
+
+# /techmap/api/search
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+
+# /techmap/api/companies/nearest
+NEAREST_DEFAULT_LIMIT = 10
+NEAREST_MAX_LIMIT = 50
 
 
 class TechMapController(http.Controller):
@@ -10,85 +65,319 @@ class TechMapController(http.Controller):
     @http.route('/techmap', type='http', auth='public', website=True)
     def tech_map_page(self, **kwargs):
         """Public map page - no authentication required"""
-        companies = request.env['tech.company'].sudo().search([
+        company_count = request.env['tech.company'].sudo().search_count([
             ('active', '=', True),
             ('latitude', '!=', 0),
             ('longitude', '!=', 0),
         ])
 
         values = {
-            'companies': companies,
-            'company_count': len(companies),
+            'company_count': company_count,
             'selected_company_id': int(kwargs.get('company_id', 0)) or None,
+            'selected_company_position': 'null',
+            'cluster_below_zoom': MAP_CLUSTER_BELOW_ZOOM,
         }
+        # The map only loads what is in view - open it on the selected company
+        if values['selected_company_id']:
+            company = request.env['tech.company'].sudo().browse(values['selected_company_id']).exists()
+            if company and company.has_coordinates:
+                values['selected_company_position'] = '[%s, %s]' % (company.latitude, company.longitude)
 
         return request.render('albanian_tech_map.techmap_page', values)
 
     @http.route('/techmap/api/companies', type='http', auth='public', methods=['GET'], cors='*')
     def api_companies_list(self, **kwargs):
-        """JSON API - returns all companies with coordinates"""
-        domain = [
-            ('active', '=', True),
-            ('latitude', '!=', 0),
-            ('longitude', '!=', 0),
+        """JSON API - returns all companies with coordinates.
+
+        Served from a pre-encoded snapshot, rebuilt only after tech.company
+        changes; repeat visits are answered with 304 Not Modified.
+        """
+        city = fold_text((kwargs.get('city') or '').strip())
+        version, body, etag, modified = self._companies_snapshot(city)
+        headers = [
+            ('ETag', etag),
+            ('Last-Modified', modified.strftime('%a, %d %b %Y %H:%M:%S GMT')),
+            ('Cache-Control', 'public, no-cache'),
+            ('Access-Control-Allow-Origin', '*'),
         ]
 
-        city = kwargs.get('city')
-        if city:
-            domain.append(('city', 'ilike', city))
+        if self._not_modified(etag, modified):
+            return request.make_response(b'', headers=headers, status=304)
 
-        companies = request.env['tech.company'].sudo().search(domain)
+        return request.make_response(body, headers=headers + [('Content-Type', 'application/json')])
 
-        data = []
-        for c in companies:
-            data.append({
-                'id': c.id,
-                'name': c.name,
-                'lat': c.latitude,
-                'lng': c.longitude,
-                'city': c.city or '',
-                'website': c.website or '',
-                'email': c.email or '',
-                'phone': c.phone or '',
-                'category': c.category or 'other',
-                'nipt': c.nipt or '',
-                'is_tech': c.is_tech,
-                'activity_description': c.activity_description or '',
-            })
+    def _not_modified(self, etag, modified=None):
+        """True if the request's conditional headers match this ETag / modification time."""
+        httprequest = request.httprequest
+        if httprequest.if_none_match:
+            return httprequest.if_none_match.contains(etag.strip('"'))
+        since = httprequest.if_modified_since
+        return modified is not None and since is not None and modified.replace(microsecond=0) <= since
 
-        return request.make_response(
-            json.dumps(data, ensure_ascii=False, indent=2),
-            headers=[
-                ('Content-Type', 'application/json'),
-                ('Access-Control-Allow-Origin', '*'),
-            ]
-        )
+    def _companies_snapshot(self, city=''):
+        """Return (version, body, etag, last_modified) for the companies list, from cache if current."""
+        Company = request.env['tech.company'].sudo()
+        version = Company._get_snapshot_version()
+        key = (request.env.cr.dbname, city)
+        with _SNAPSHOT_CACHE_LOCK:
+            cached = _SNAPSHOT_CACHE.get(key)
+            if cached and cached[0] == version:
+                _SNAPSHOT_CACHE.move_to_end(key)
+                return cached
+
+        body = Company._get_api_companies_json(MAP_API_COLUMNS, with_coordinates=True, city=city)
+        etag = '"%s"' % hashlib.sha1(body).hexdigest()
+        try:
+            modified = datetime.strptime(version, '%Y-%m-%d %H:%M:%S.%f')
+        except ValueError:
+            modified = datetime.utcnow()
+        modified = modified.replace(tzinfo=timezone.utc)
+
+        entry = (version, body, etag, modified)
+        with _SNAPSHOT_CACHE_LOCK:
+            _SNAPSHOT_CACHE[key] = entry
+            _SNAPSHOT_CACHE.move_to_end(key)
+            while len(_SNAPSHOT_CACHE) > SNAPSHOT_CACHE_SIZE:
+                _SNAPSHOT_CACHE.popitem(last=False)
+        return entry
 
     @http.route('/techmap/api/companies/all', type='http', auth='public', methods=['GET'], cors='*')
     def api_all_companies(self, **kwargs):
         """JSON API - returns ALL companies (even without coordinates)"""
-        companies = request.env['tech.company'].sudo().search([('active', '=', True)])
-
-        data = []
-        for c in companies:
-            data.append({
-                'id': c.id,
-                'name': c.name,
-                'nipt': c.nipt or '',
-                'city': c.city or '',
-                'email': c.email or '',
-                'phone': c.phone or '',
-                'legal_form': c.legal_form or '',
-                'lat': c.latitude,
-                'lng': c.longitude,
-                'is_tech': c.is_tech,
-                'activity_description': c.activity_description or '',
-            })
+        body = request.env['tech.company'].sudo()._get_api_companies_json(ALL_API_COLUMNS)
 
         return request.make_response(
-            json.dumps(data, ensure_ascii=False, indent=2),
+            body,
             headers=[
                 ('Content-Type', 'application/json'),
                 ('Access-Control-Allow-Origin', '*'),
             ]
         )
+
+    @http.route('/techmap/api/companies/bbox', type='http', auth='public', methods=['GET'], cors='*')
+    def api_companies_bbox(self, **kwargs):
+        """JSON API - companies inside the visible map area.
+
+        Query parameters:
+            bbox: west,south,east,north in degrees
+            zoom: map zoom level; low zooms get cluster counts instead of points
+            category: optional exact category filter
+        """
+        try:
+            west, south, east, north = (float(v) for v in kwargs.get('bbox', '').split(','))
+            zoom = int(kwargs.get('zoom', 13))
+        except ValueError:
+            return self._api_error('bbox must be west,south,east,north and zoom an integer')
+        zoom = max(0, min(zoom, 22))
+        result = request.env['tech.company'].sudo()._get_map_viewport(
+            west, south, east, north, zoom, category=kwargs.get('category') or None)
+        result['zoom'] = zoom
+        return request.make_json_response(result, headers=[('Access-Control-Allow-Origin', '*')])
+
+    @http.route('/techmap/api/clusters/<int:zoom>/<int:x>/<int:y>', type='http', auth='public',
+                methods=['GET'], cors='*')
+    def api_cluster_tile(self, zoom, x, y, **kwargs):
+        """JSON API - precomputed company clusters of one web map tile.
+
+        Returns {"zoom", "x", "y", "clusters": [{"lat", "lng", "count"}]}; each
+        cluster belongs to the tile holding its centroid. Optional `category`
+        filter. Revalidates with ETag (304 until the companies change).
+        """
+        if not (0 <= zoom <= MAP_CLUSTER_MAX_ZOOM and 0 <= x < 2 ** zoom and 0 <= y < 2 ** zoom):
+            return self._api_error(f'tile out of range (zoom 0-{MAP_CLUSTER_MAX_ZOOM})', status=404)
+        category = kwargs.get('category') or ''
+        Company = request.env['tech.company'].sudo()
+        version = Company._get_map_cluster_version()
+        etag = '"%s"' % hashlib.sha1(f'{version}|{category}'.encode()).hexdigest()
+        headers = [
+            ('ETag', etag),
+            ('Cache-Control', 'public, no-cache'),
+            ('Access-Control-Allow-Origin', '*'),
+        ]
+        if self._not_modified(etag):
+            return request.make_response(b'', headers=headers, status=304)
+
+        clusters = Company._get_map_clusters(*tile_bbox(zoom, x, y), zoom,
+                                             category=category or None, centroid_inside=True)
+        return request.make_json_response({'zoom': zoom, 'x': x, 'y': y, 'clusters': clusters}, headers=headers)
+
+    @http.route('/techmap/tiles/<int:zoom>/<int:x>/<int:y>.pbf', type='http', auth='public',
+                methods=['GET'], cors='*')
+    def vector_tile(self, zoom, x, y, **kwargs):
+        """Mapbox Vector Tile of the companies in one web map tile.
+
+        Low zooms carry a 'clusters' layer, higher ones a 'companies' layer with
+        category, city and is_tech per point. Optional `category` filter. Tiles
+        are cached on disk per snapshot version and revalidate with ETag.
+        """
+        if not (0 <= zoom <= MAP_TILE_MAX_ZOOM and 0 <= x < 2 ** zoom and 0 <= y < 2 ** zoom):
+            return self._api_error('tile out of range', status=404)
+        Company = request.env['tech.company'].sudo()
+        category = kwargs.get('category') or ''
+        if category and category not in dict(Company._fields['category'].selection):
+            return self._api_error('unknown category')
+        # Cluster tiles follow the last cluster rebuild, company tiles the live
+        # rows; read in the transaction that builds the tile, so the version
+        # is the one the tile reflects
+        if zoom < MAP_CLUSTER_BELOW_ZOOM:
+            layer, version = 'clusters', Company._get_map_cluster_version()
+        else:
+            layer, version = 'companies', Company._get_snapshot_version()
+        etag = '"%s"' % hashlib.sha1(f'{version}|{category}'.encode()).hexdigest()
+        headers = [
+            ('ETag', etag),
+            ('Cache-Control', 'public, no-cache'),
+            ('Access-Control-Allow-Origin', '*'),
+        ]
+        if self._not_modified(etag):
+            return request.make_response(b'', headers=headers, status=304)
+
+        body = self._cached_tile(layer, version, category, zoom, x, y,
+                                 lambda: Company._get_vector_tile(zoom, x, y, category=category or None))
+        return request.make_response(body, headers=headers + [('Content-Type', TILE_CONTENT_TYPE)])
+
+    def _cached_tile(self, layer, version, category, zoom, x, y, build):
+        """Return the tile from the disk cache, or build() it and store it there.
+
+        `version` is the snapshot version build() reads its rows at. The first
+        tile written for a version removes the tiles of older versions of the
+        same layer; newer ones, written by workers already past this version,
+        are kept. Cache errors only cost the caching.
+        """
+        root = os.path.join(config['data_dir'], TILE_CACHE_DIR, request.env.cr.dbname, layer)
+        # Versions are UTC timestamps: their digits sort like the versions
+        version_key = int(re.sub(r'\D', '', version) or 0)
+        version_dir = os.path.join(root, str(version_key))
+        path = os.path.join(version_dir, category or 'all', str(zoom), str(x), f'{y}.pbf')
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        except OSError:
+            pass
+
+        body = build()
+        try:
+            if not os.path.isdir(version_dir) and os.path.isdir(root):
+                for name in os.listdir(root):
+                    if name.isdigit() and int(name) < version_key:
+                        shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f'{path}.{os.getpid()}-{threading.get_ident()}.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(body)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            _logger.warning("Could not cache vector tile %s/%s/%s: %s", zoom, x, y, e)
+        return body
+
+    @http.route('/techmap/api/search', type='http', auth='public', methods=['GET'], cors='*')
+    def api_search(self, **kwargs):
+        """JSON API - companies matching a text query, best match first.
+
+        Query parameters:
+            q: words to find in the company name or activity description
+            limit: page size (default 20, at most 100)
+            offset: number of hits to skip
+        """
+        query = (kwargs.get('q') or '').strip()
+        if not query:
+            return self._api_error('q is required')
+        try:
+            limit = int(kwargs.get('limit', SEARCH_DEFAULT_LIMIT))
+            offset = int(kwargs.get('offset', 0))
+        except ValueError:
+            return self._api_error('limit and offset must be integers')
+        limit = max(1, min(limit, SEARCH_MAX_LIMIT))
+        offset = max(0, offset)
+
+        total, results = request.env['tech.company'].sudo()._search_companies(query, limit=limit, offset=offset)
+        return request.make_json_response({
+            'query': query,
+            'total': total,
+            'limit': limit,
+            'offset': offset,
+            'results': results,
+        }, headers=[('Access-Control-Allow-Origin', '*')])
+
+    @http.route('/techmap/api/companies/nearest', type='http', auth='public', methods=['GET'], cors='*')
+    def api_companies_nearest(self, **kwargs):
+        """JSON API - the companies closest to a point, nearest first.
+
+        Query parameters:
+            lat, lng: the point in degrees
+            limit: number of companies (default 10, at most 50)
+        """
+        try:
+            lat, lng = float(kwargs['lat']), float(kwargs['lng'])
+            limit = int(kwargs.get('limit', NEAREST_DEFAULT_LIMIT))
+        except (KeyError, ValueError):
+            return self._api_error('lat and lng are required numbers and limit an integer')
+        if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+            return self._api_error('lat/lng out of range')
+        limit = max(1, min(limit, NEAREST_MAX_LIMIT))
+        Company = request.env['tech.company'].sudo()
+        distances = Company._nearest_distances(lat, lng, limit)
+        companies = Company.browse([company_id for company_id, _km in distances])
+        data = [dict(company.get_map_marker_data(), distance_km=round(km, 3))
+                for company, (_company_id, km) in zip(companies, distances)]
+        return request.make_json_response(data, headers=[('Access-Control-Allow-Origin', '*')])
+
+    @http.route('/techmap/api/v2/companies', type='http', auth='public', methods=['GET'], cors='*')
+    def api_v2_companies(self, **kwargs):
+        """JSON API v2 - active companies, one page at a time.
+
+        Query parameters:
+            cursor: return companies with id > cursor (the previous page's next_cursor)
+            limit: page size (default 100, at most 1000)
+            fields: comma-separated subset of API_V2_FIELDS
+            city, legal_form, category: exact-match filters
+            is_tech: true / false
+
+        Returns {"data": [...], "next_cursor": <id or null>}.
+        """
+        try:
+            cursor = int(kwargs.get('cursor') or 0)
+            limit = int(kwargs.get('limit') or API_V2_DEFAULT_LIMIT)
+        except ValueError:
+            return self._api_error('cursor and limit must be integers')
+        limit = max(1, min(limit, API_V2_MAX_LIMIT))
+
+        fields = [f.strip() for f in (kwargs.get('fields') or '').split(',') if f.strip()]
+        fields = fields or API_V2_DEFAULT_FIELDS
+        unknown = [f for f in fields if f not in API_V2_FIELDS]
+        if unknown:
+            return self._api_error('unknown fields: %s' % ', '.join(unknown))
+
+        domain = [('active', '=', True), ('id', '>', cursor)]
+        if kwargs.get('city'):
+            # City keys are the folded names ('Tiranë' -> 'tirane')
+            domain.append(('city', '=', fold_text(kwargs['city'].strip())))
+        for param in ('legal_form', 'category'):
+            if kwargs.get(param):
+                domain.append((param, '=', kwargs[param]))
+        if kwargs.get('is_tech'):
+            domain.append(('is_tech', '=', kwargs['is_tech'].lower() in ('1', 'true', 'yes')))
+
+        # One extra row tells whether another page exists. search_read reads
+        # every field for an empty list, so it always asks for at least 'id'.
+        read_fields = [API_V2_FIELDS[f] for f in fields if f != 'id'] or ['id']
+        rows = request.env['tech.company'].sudo().search_read(
+            domain, read_fields, order='id', limit=limit + 1)
+        next_cursor = rows[limit - 1]['id'] if len(rows) > limit else None
+
+        data = []
+        for row in rows[:limit]:
+            item = {}
+            for f in fields:
+                value = row[API_V2_FIELDS[f]]
+                item[f] = '' if value is False and f != 'is_tech' else value
+            data.append(item)
+
+        return request.make_json_response(
+            {'data': data, 'next_cursor': next_cursor},
+            headers=[('Access-Control-Allow-Origin', '*')],
+        )
+
+    def _api_error(self, message, status=400):
+        return request.make_json_response(
+            {'error': message}, headers=[('Access-Control-Allow-Origin', '*')], status=status)
@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+"""
+The QKB scrape cron now runs daily (delta mode). Its record is noupdate, so
+upgraded databases still carry the old 6-day interval; move them to 1 day,
+unless an administrator already changed it.
+"""
+
+
+def migrate(cr, version):
+    cr.execute("""
+        UPDATE ir_cron
+           SET interval_number = 1
+         WHERE id = (SELECT res_id FROM ir_model_data
+                      WHERE module = 'albanian_tech_map' AND name = 'ir_cron_update_tech_companies'
+                        AND model = 'ir.cron')
+           AND interval_type = 'days'
+           AND interval_number = 6
+    """)
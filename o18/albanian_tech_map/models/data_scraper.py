@@ -54,6 +54,12 @@ class TechCompanyScraper(models.TransientModel):
         except ImportError:
             missing.append('psycopg2 (Python package)')
 
+        # Check BeautifulSoup (HTTP backend parses QKB result pages)
+        try:
+            import bs4
+        except ImportError:
+            missing.append('beautifulsoup4 (Python package)')
+
         if missing:
             module_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
             install_script = os.path.join(module_dir, 'scripts', 'install_deps.sh')
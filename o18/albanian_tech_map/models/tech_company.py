@@ -1,12 +1,148 @@
 # -*- coding: utf-8 -*-
 
-from odoo import models, fields, api, _
+from odoo import models, fields, api, tools, _
 from odoo.exceptions import UserError, ValidationError
+from odoo.tools.sql import create_index
+import gzip
+import hashlib
+import io
 import logging
+import math
+import os
+import re
+import psycopg2
 import requests
 
+from .vector_tile import TILE_EXTENT, encode_tile, project
+
 _logger = logging.getLogger(__name__)
 
+# Bumped on every change to tech.company (and by the standalone scraper when a
+# run ends); the public API caches its JSON snapshot per version.
+SNAPSHOT_VERSION_PARAM = 'albanian_tech_map.snapshot_version'
+
+# Seed companies, loaded on install and upgrade (see _load_seed_data). The
+# param holds the md5 of the seed file last loaded.
+SEED_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                         'data', 'tech_company_seed.csv.gz')
+SEED_COLUMNS = ['nipt', 'name', 'city', 'legal_form', 'registration_date', 'email', 'phone']
+SEED_HASH_PARAM = 'albanian_tech_map.seed_hash'
+
+# Public API payloads: JSON key -> SQL expression over tech_company
+MAP_API_COLUMNS = [
+    ('id', 'id'),
+    ('name', "COALESCE(name, '')"),
+    ('lat', 'COALESCE(latitude, 0)::float8'),
+    ('lng', 'COALESCE(longitude, 0)::float8'),
+    ('city', "COALESCE(city, '')"),
+    ('website', "COALESCE(website, '')"),
+    ('email', "COALESCE(email, '')"),
+    ('phone', "COALESCE(phone, '')"),
+    ('category', "COALESCE(NULLIF(category, ''), 'other')"),
+    ('nipt', "COALESCE(nipt, '')"),
+    ('is_tech', 'COALESCE(is_tech, false)'),
+    ('activity_description', "COALESCE(activity_description, '')"),
+]
+ALL_API_COLUMNS = [
+    ('id', 'id'),
+    ('name', "COALESCE(name, '')"),
+    ('nipt', "COALESCE(nipt, '')"),
+    ('city', "COALESCE(city, '')"),
+    ('email', "COALESCE(email, '')"),
+    ('phone', "COALESCE(phone, '')"),
+    ('legal_form', "COALESCE(legal_form, '')"),
+    ('lat', 'COALESCE(latitude, 0)::float8'),
+    ('lng', 'COALESCE(longitude, 0)::float8'),
+    ('is_tech', 'COALESCE(is_tech, false)'),
+    ('activity_description', "COALESCE(activity_description, '')"),
+]
+# Markers and sidebar of the viewport API - no long activity text
+VIEWPORT_API_COLUMNS = [col for col in MAP_API_COLUMNS if col[0] != 'activity_description']
+
+# Viewport API: below this zoom, or with more than MAP_POINT_LIMIT companies in
+# view, the map gets grid cluster counts instead of individual markers. A
+# cluster cell is 1/MAP_CLUSTER_CELLS_PER_TILE of a 256px web map tile.
+MAP_CLUSTER_BELOW_ZOOM = 14
+MAP_POINT_LIMIT = 500
+MAP_CLUSTER_CELLS_PER_TILE = 4
+# Cluster cells are precomputed for zooms 0..MAP_CLUSTER_MAX_ZOOM into
+# tech_company_map_cluster by a cron job, once the snapshot version moves on;
+# readers only ever see a committed rebuild. Each zoom's cells are exactly four
+# cells of the next zoom.
+MAP_CLUSTER_MAX_ZOOM = 16
+MAP_CLUSTER_VERSION_PARAM = 'albanian_tech_map.cluster_version'
+MAP_CLUSTER_LOCK = 460192517  # pg advisory lock key for the rebuild
+# Vector tiles: features this far past the tile edge (in tile extent units)
+# are included too, so markers and bubbles on the border are drawn whole
+MAP_TILE_MAX_ZOOM = 22
+MAP_TILE_BUFFER = 256
+
+# Spatial index over the companies the map can show. Geo queries must repeat
+# GEO_INDEX_WHERE and use the indexed expression verbatim for Postgres to pick
+# the index: GEO_POINT_SQL (built-in GiST point index, always present) or
+# GEO_GEOGRAPHY_SQL (PostGIS, only when the extension is installed).
+GEO_INDEX_WHERE = 'active AND latitude != 0 AND longitude != 0'
+GEO_POINT_SQL = 'point(longitude, latitude)'
+GEO_GEOGRAPHY_SQL = 'ST_SetSRID(ST_MakePoint(longitude, latitude), 4326)::geography'
+# Great-circle distance in km from %(lat)s, %(lng)s
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+GEO_DISTANCE_KM_SQL = f"""(2 * {EARTH_RADIUS_KM} * asin(sqrt(
+    sin(radians(latitude - %(lat)s) / 2) ^ 2
+    + cos(radians(%(lat)s)) * cos(radians(latitude)) * sin(radians(longitude - %(lng)s) / 2) ^ 2)))"""
+
+
+def _json_object_sql(columns):
+    """json_build_object(...) expression for [(key, SQL expression)]."""
+    return 'json_build_object(%s)' % ', '.join(f"'{key}', {expr}" for key, expr in columns)
+
+
+# Albanian accent folding for search - same rules as foldText() in
+# static/src/js/search_index.js. Accents are mapped before lowercasing, so the
+# result does not depend on the database's LC_CTYPE.
+FOLD_FROM = 'ëçËÇ'
+FOLD_TO = 'ecec'
+_FOLD_TABLE = str.maketrans(FOLD_FROM, FOLD_TO)
+
+
+def fold_text(text):
+    """Accent-folded, lowercased text ('Tiranë' -> 'tirane')."""
+    return (text or '').translate(_FOLD_TABLE).lower()
+
+
+def fold_sql(expr):
+    """SQL expression folding `expr` like fold_text()."""
+    return f"lower(translate({expr}, '{FOLD_FROM}', '{FOLD_TO}'))"
+
+
+# Company search (/techmap/api/search). Postgres ships no Albanian text search
+# configuration: SEARCH_TS_CONFIG is a copy of 'simple' (no stemming - query
+# words match as prefixes instead), with the unaccent dictionary in front when
+# that extension is installed. Text is folded before parsing either way. The
+# GIN indexes are on these exact expressions.
+SEARCH_TS_CONFIG = 'albanian_tech_map'
+SEARCH_NAME_SQL = fold_sql("COALESCE(name, '')")
+SEARCH_ACTIVITY_SQL = fold_sql("COALESCE(activity_description, '')")
+SEARCH_VECTOR_SQL = (
+    f"setweight(to_tsvector('{SEARCH_TS_CONFIG}', {SEARCH_NAME_SQL}), 'A') || "
+    f"setweight(to_tsvector('{SEARCH_TS_CONFIG}', {SEARCH_ACTIVITY_SQL}), 'B')"
+)
+SEARCH_COLUMNS = [col for col in VIEWPORT_API_COLUMNS if col[0] not in ('website', 'email', 'phone')]
+
+
+def map_cell_size(zoom):
+    """Side of a cluster grid cell at `zoom`, in degrees."""
+    return 360.0 / (2 ** zoom) / MAP_CLUSTER_CELLS_PER_TILE
+
+
+def tile_bbox(zoom, x, y):
+    """(west, south, east, north) in degrees of web map tile zoom/x/y."""
+    n = 2 ** zoom
+
+    def lat(tile_y):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * tile_y / n))))
+    return x / n * 360 - 180, lat(y + 1), (x + 1) / n * 360 - 180, lat(y)
+
 
 class TechCompany(models.Model):
     _name = 'tech.company'
@@ -49,6 +185,26 @@ class TechCompany(models.Model):
         string='Category',
         default='other',
     )
+    category_confidence = fields.Float(
+        string='Category Confidence',
+        readonly=True,
+        help='1.0 = set by hand, otherwise how clearly the activity description points to the category '
+             '(set by scripts/classifier.py)',
+    )
+    category_source = fields.Selection(
+        selection=[
+            ('manual', 'Manual'),
+            ('classifier', 'Classifier'),
+        ],
+        string='Category Source',
+        readonly=True,
+    )
+    classifier_hash = fields.Char(
+        string='Classifier Hash',
+        readonly=True,
+        copy=False,
+        help='Rules signature + description the category was computed from',
+    )
 
     # Location
     city = fields.Selection(
@@ -85,6 +241,28 @@ class TechCompany(models.Model):
         string='Longitude',
         digits=(10, 7),
     )
+    geo_confidence = fields.Float(
+        string='Geocode Confidence',
+        readonly=True,
+        help='1.0 = placed by hand, ~0.7 street, ~0.6 neighbourhood, 0.3 city centre, '
+             '0 = not found (set by scripts/geocoder.py)',
+    )
+    geo_source = fields.Selection(
+        selection=[
+            ('manual', 'Manual'),
+            ('gazetteer', 'Gazetteer'),
+            ('nominatim', 'Nominatim'),
+            ('centroid', 'City centre (approximate)'),
+        ],
+        string='Geocode Source',
+        readonly=True,
+    )
+    geo_input_hash = fields.Char(
+        string='Geocoded Address Hash',
+        readonly=True,
+        copy=False,
+        help='md5 of the address and city last geocoded; the geocoder skips the row until they change',
+    )
 
     # Contact Information
     phone = fields.Char(string='Phone')
@@ -107,6 +285,12 @@ class TechCompany(models.Model):
         default='manual',
     )
     last_scraped = fields.Datetime(string='Last Scraped')
+    seed_hash = fields.Char(
+        string='Seed Hash',
+        readonly=True,
+        copy=False,
+        help='Content hash of the seed row this company was last loaded from',
+    )
     active = fields.Boolean(string='Active', default=True)
     notes = fields.Text(string='Notes')
     activity_description = fields.Text(
@@ -118,6 +302,20 @@ class TechCompany(models.Model):
         default=False,
         help='True if activity description contains IT/tech keywords',
     )
+    tech_keywords = fields.Char(
+        string='Matched Tech Keywords',
+        readonly=True,
+        help='Tech keywords found in the activity description by scripts/classifier.py '
+             '(empty = none found, so not tech)',
+    )
+    tech_source = fields.Selection(
+        selection=[
+            ('manual', 'Manual'),
+            ('classifier', 'Classifier'),
+        ],
+        string='Tech Verdict Source',
+        readonly=True,
+    )
 
     # Computed
     has_coordinates = fields.Boolean(
@@ -138,6 +336,516 @@ class TechCompany(models.Model):
         ('nipt_unique', 'unique(nipt)', 'A company with this NIPT already exists!'),
     ]
 
+    def init(self):
+        super().init()
+        create_index(self.env.cr, 'tech_company_geo_point_idx', self._table,
+                     [f'({GEO_POINT_SQL})'], method='gist', where=GEO_INDEX_WHERE)
+        if self._has_extension('postgis'):
+            create_index(self.env.cr, 'tech_company_geo_geography_idx', self._table,
+                         [f'({GEO_GEOGRAPHY_SQL})'], method='gist', where=GEO_INDEX_WHERE)
+        self.env.cr.execute("""
+            CREATE TABLE IF NOT EXISTS tech_company_map_cluster (
+                zoom smallint NOT NULL,
+                cell_x integer NOT NULL,
+                cell_y integer NOT NULL,
+                category varchar NOT NULL,
+                company_count integer NOT NULL,
+                lat_sum float8 NOT NULL,
+                lng_sum float8 NOT NULL,
+                PRIMARY KEY (zoom, cell_x, cell_y, category)
+            )
+        """)
+        self._init_search()
+        # Runs on install and on every upgrade; a no-op while the file is unchanged
+        self._load_seed_data()
+        self._rebuild_map_clusters()
+
+    def _init_search(self):
+        """Text search configuration and indexes behind _search_companies()."""
+        cr = self.env.cr
+        for extension in ('unaccent', 'pg_trgm'):
+            try:
+                with cr.savepoint():
+                    cr.execute(f'CREATE EXTENSION IF NOT EXISTS {extension}')
+            except psycopg2.Error as e:
+                _logger.warning("PostgreSQL extension %s not available, company search works without it: %s",
+                                extension, e)
+        self.env.registry.clear_cache()
+
+        cr.execute("SELECT 1 FROM pg_ts_config WHERE cfgname = %s", (SEARCH_TS_CONFIG,))
+        if not cr.fetchone():
+            cr.execute(f"CREATE TEXT SEARCH CONFIGURATION {SEARCH_TS_CONFIG} (COPY = simple)")
+        if self._has_extension('unaccent'):
+            cr.execute("""
+                SELECT 1 FROM pg_ts_config_map m
+                JOIN pg_ts_config c ON c.oid = m.mapcfg
+                JOIN pg_ts_dict d ON d.oid = m.mapdict
+                WHERE c.cfgname = %s AND d.dictname = 'unaccent'
+            """, (SEARCH_TS_CONFIG,))
+            if not cr.fetchone():
+                cr.execute(f"ALTER TEXT SEARCH CONFIGURATION {SEARCH_TS_CONFIG} "
+                           f"ALTER MAPPING FOR hword, hword_part, word WITH unaccent, simple")
+                # Indexed vectors were parsed without unaccent - rebuild below
+                cr.execute("DROP INDEX IF EXISTS tech_company_search_fts_idx")
+        create_index(cr, 'tech_company_search_fts_idx', self._table, [f'({SEARCH_VECTOR_SQL})'], method='gin')
+        if self._has_extension('pg_trgm'):
+            create_index(cr, 'tech_company_name_trgm_idx', self._table,
+                         [f'({SEARCH_NAME_SQL}) gin_trgm_ops'], method='gin')
+            create_index(cr, 'tech_company_activity_trgm_idx', self._table,
+                         [f'({SEARCH_ACTIVITY_SQL}) gin_trgm_ops'], method='gin')
+
+    @api.model
+    @tools.ormcache('name')
+    def _has_extension(self, name):
+        """True if the PostgreSQL extension `name` (postgis, pg_trgm, unaccent) is installed."""
+        self.env.cr.execute("SELECT 1 FROM pg_extension WHERE extname = %s", (name,))
+        return bool(self.env.cr.fetchone())
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self._bump_snapshot_version()
+        return records
+
+    def write(self, vals):
+        if ('latitude' in vals or 'longitude' in vals) and 'geo_source' not in vals:
+            if not vals.get('latitude', True) or not vals.get('longitude', True):
+                # Coordinates cleared by hand hand the row back to the geocoder
+                vals = dict(vals, geo_source=False, geo_confidence=0.0, geo_input_hash=False)
+            else:
+                # Coordinates edited by hand outrank anything the geocoder found
+                vals = dict(vals, geo_source='manual', geo_confidence=1.0)
+        if 'category' in vals and 'category_source' not in vals:
+            vals = dict(vals, category_source='manual', category_confidence=1.0)
+        if 'is_tech' in vals and 'tech_source' not in vals:
+            vals = dict(vals, tech_source='manual')
+        res = super().write(vals)
+        self._bump_snapshot_version()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self._bump_snapshot_version()
+        return res
+
+    @api.model
+    def _load_seed_data(self, path=SEED_PATH):
+        """Bulk-load the seed companies (gzip CSV, SEED_COLUMNS) with COPY and
+        one INSERT ... ON CONFLICT. Returns the number of rows written.
+
+        Nothing is read when the file is the one loaded last time. Otherwise
+        only rows whose content hash differs from seed_hash are written, and
+        existing companies keep their non-empty values, like the scraper's
+        upsert.
+        """
+        with open(path, 'rb') as f:
+            raw = f.read()
+        file_hash = hashlib.md5(raw).hexdigest()
+        ICP = self.env['ir.config_parameter'].sudo()
+        if ICP.get_param(SEED_HASH_PARAM) == file_hash:
+            return 0
+
+        self.flush_model()
+        cr = self.env.cr
+        cr.execute(f"""
+            CREATE TEMP TABLE tech_company_seed ({', '.join(f'{col} VARCHAR' for col in SEED_COLUMNS)})
+        """)
+        cr.copy_expert(
+            f"COPY tech_company_seed ({', '.join(SEED_COLUMNS)}) FROM STDIN WITH (FORMAT csv, HEADER true)",
+            gzip.GzipFile(fileobj=io.BytesIO(raw)),
+        )
+        cities = tuple(key for key, _label in self._fields['city'].selection)
+        cr.execute(f"""
+            INSERT INTO {self._table} AS t (nipt, name, city, legal_form, registration_date, email, phone,
+                                           seed_hash, data_source, category, active, is_tech, has_coordinates,
+                                           create_uid, create_date, write_uid, write_date)
+            SELECT s.nipt, s.name,
+                   CASE WHEN s.city IN %(cities)s THEN s.city WHEN COALESCE(s.city, '') = '' THEN 'tirane'
+                        ELSE 'other' END,
+                   NULLIF(s.legal_form, ''), NULLIF(s.registration_date, ''),
+                   NULLIF(s.email, ''), NULLIF(s.phone, ''),
+                   md5(concat_ws(E'\\x1f', {', '.join(f's.{col}' for col in SEED_COLUMNS)})),
+                   'qkb', 'other', true, false, false,
+                   %(uid)s, now() at time zone 'utc', %(uid)s, now() at time zone 'utc'
+              FROM (SELECT DISTINCT ON (nipt) * FROM tech_company_seed
+                     WHERE COALESCE(nipt, '') != '' AND COALESCE(name, '') != ''
+                     ORDER BY nipt) s
+            ON CONFLICT (nipt) DO UPDATE SET
+                name = COALESCE(NULLIF(t.name, ''), EXCLUDED.name),
+                legal_form = COALESCE(NULLIF(t.legal_form, ''), EXCLUDED.legal_form),
+                registration_date = COALESCE(NULLIF(t.registration_date, ''), EXCLUDED.registration_date),
+                email = COALESCE(NULLIF(t.email, ''), EXCLUDED.email),
+                phone = COALESCE(NULLIF(t.phone, ''), EXCLUDED.phone),
+                seed_hash = EXCLUDED.seed_hash,
+                write_date = EXCLUDED.write_date
+            WHERE t.seed_hash IS DISTINCT FROM EXCLUDED.seed_hash
+        """, {'cities': cities, 'uid': self.env.uid})
+        written = cr.rowcount
+        cr.execute("DROP TABLE tech_company_seed")
+        self.invalidate_model()
+        ICP.set_param(SEED_HASH_PARAM, file_hash)
+        self._bump_snapshot_version()
+        _logger.info("Seed data %s: %d companies written", os.path.basename(path), written)
+        return written
+
+    @api.model
+    def _bump_snapshot_version(self):
+        """Mark cached API snapshots stale when the transaction commits.
+
+        Plain SQL on purpose: set_param() would clear the registry caches of
+        every worker on each write, and the scraper bumps the same row from
+        outside Odoo. The upsert runs once, as a precommit hook, however many
+        writes the transaction makes, so concurrent writers only hold the
+        row lock while committing. Bulk writers set the
+        `tech_company_defer_snapshot` context key and bump once when they are
+        done.
+        """
+        if self.env.context.get('tech_company_defer_snapshot'):
+            return
+        cr = self.env.cr
+        if cr.precommit.data.get(SNAPSHOT_VERSION_PARAM):
+            return
+        cr.precommit.data[SNAPSHOT_VERSION_PARAM] = True
+        uid = self.env.uid
+
+        @cr.precommit.add
+        def bump_snapshot_version():
+            cr.execute("""
+                INSERT INTO ir_config_parameter (key, value, create_uid, create_date, write_uid, write_date)
+                VALUES (%s, to_char(now() at time zone 'utc', 'YYYY-MM-DD HH24:MI:SS.US'),
+                        %s, now() at time zone 'utc', %s, now() at time zone 'utc')
+                ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value, write_date = EXCLUDED.write_date
+            """, (SNAPSHOT_VERSION_PARAM, uid, uid))
+
+    @api.model
+    def _get_api_companies_json(self, columns, with_coordinates=False, city=None):
+        """Return active companies as encoded JSON, built by Postgres in one query.
+
+        The public endpoints only serialize these rows, so they skip the ORM
+        (recordsets, prefetch, cache, per-field conversion) entirely. Filters
+        mirror the domains the endpoints used before, ordered like _order.
+        """
+        self.flush_model()
+        where = ['active']
+        params = []
+        if with_coordinates:
+            # Same as the ('latitude', '!=', 0) domain, which also keeps NULLs
+            where += ['(latitude != 0 OR latitude IS NULL)', '(longitude != 0 OR longitude IS NULL)']
+        if city:
+            where.append(f"{fold_sql('city')} LIKE %s")
+            params.append(f'%{fold_text(city)}%')
+        self.env.cr.execute(f"""
+            SELECT COALESCE(json_agg({_json_object_sql(columns)} ORDER BY name, id), '[]')::text
+            FROM tech_company
+            WHERE {' AND '.join(where)}
+        """, params)
+        return self.env.cr.fetchone()[0].encode('utf-8')
+
+    @api.model
+    def _get_map_viewport(self, west, south, east, north, zoom, category=None):
+        """Companies with coordinates inside a bounding box, for one map view.
+
+        Returns {'total', 'clustered', 'clusters', 'companies'}. When clustered
+        (low zoom or too many points), 'clusters' holds grid cells
+        [{'lat', 'lng', 'count'}] sized to the zoom level and 'companies' the
+        first MAP_POINT_LIMIT companies by name (for the sidebar); otherwise
+        'companies' holds every company in view.
+        """
+        self.flush_model()
+        where, params = self._geo_bbox_where(west, south, east, north)
+        if category:
+            where += ' AND category = %s'
+            params.append(category)
+        cr = self.env.cr
+
+        cr.execute(f"SELECT count(*) FROM tech_company WHERE {where}", params)
+        total = cr.fetchone()[0]
+        clustered = zoom < MAP_CLUSTER_BELOW_ZOOM or total > MAP_POINT_LIMIT
+
+        clusters = []
+        if clustered and zoom <= MAP_CLUSTER_MAX_ZOOM:
+            clusters = self._get_map_clusters(west, south, east, north, zoom, category=category)
+        elif clustered:
+            # Crowded view past the precomputed zooms - group on the fly
+            cell = map_cell_size(zoom)
+            cr.execute(f"""
+                SELECT avg(latitude)::float8, avg(longitude)::float8, count(*)
+                FROM tech_company
+                WHERE {where}
+                GROUP BY floor(latitude / %s), floor(longitude / %s)
+            """, params + [cell, cell])
+            clusters = [{'lat': lat, 'lng': lng, 'count': count} for lat, lng, count in cr.fetchall()]
+
+        cr.execute(f"""
+            SELECT COALESCE(json_agg({_json_object_sql(VIEWPORT_API_COLUMNS)} ORDER BY name, id), '[]')
+            FROM (
+                SELECT * FROM tech_company WHERE {where}
+                ORDER BY name, id LIMIT %s
+            ) tech_company
+        """, params + [MAP_POINT_LIMIT])
+        return {
+            'total': total,
+            'clustered': clustered,
+            'clusters': clusters,
+            'companies': cr.fetchone()[0],
+        }
+
+    @api.model
+    def _get_map_clusters(self, west, south, east, north, zoom, category=None, centroid_inside=False):
+        """Precomputed cluster cells of `zoom` overlapping a bounding box.
+
+        Returns [{'lat', 'lng', 'count'}] at each cell's centroid, as of the
+        last rebuild (_get_map_cluster_version()). With centroid_inside, only
+        cells whose centroid lies in the box are kept, so adjacent tiles never
+        return the same cluster twice.
+        """
+        cell = map_cell_size(zoom)
+        where = ['zoom = %s', 'cell_x BETWEEN %s AND %s', 'cell_y BETWEEN %s AND %s']
+        params = [zoom, math.floor(west / cell), math.floor(east / cell),
+                  math.floor(south / cell), math.floor(north / cell)]
+        if category:
+            where.append('category = %s')
+            params.append(category)
+        self.env.cr.execute(f"""
+            SELECT sum(lat_sum) / sum(company_count), sum(lng_sum) / sum(company_count), sum(company_count)::int
+            FROM tech_company_map_cluster
+            WHERE {' AND '.join(where)}
+            GROUP BY cell_x, cell_y
+        """, params)
+        return [{'lat': lat, 'lng': lng, 'count': count}
+                for lat, lng, count in self.env.cr.fetchall()
+                if not centroid_inside or (south <= lat < north and west <= lng < east)]
+
+    @api.model
+    def _get_vector_tile(self, zoom, x, y, category=None):
+        """Mapbox Vector Tile of web map tile zoom/x/y, as bytes.
+
+        Below MAP_CLUSTER_BELOW_ZOOM it has a 'clusters' layer (precomputed
+        cells, property count); from there on a 'companies' layer with one
+        point per company (id, name, category, city, is_tech, approximate =
+        only placed near its city centre).
+        """
+        west, south, east, north = tile_bbox(zoom, x, y)
+        pad = MAP_TILE_BUFFER / TILE_EXTENT
+        pad_x, pad_y = (east - west) * pad, (north - south) * pad
+        west, south, east, north = west - pad_x, south - pad_y, east + pad_x, north + pad_y
+
+        if zoom < MAP_CLUSTER_BELOW_ZOOM:
+            clusters = self._get_map_clusters(west, south, east, north, zoom,
+                                              category=category, centroid_inside=True)
+            return encode_tile({'clusters': [
+                (None, *project(c['lat'], c['lng'], zoom, x, y), {'count': c['count']})
+                for c in clusters
+            ]})
+
+        self.flush_model(['active', 'latitude', 'longitude', 'name', 'category', 'city', 'is_tech', 'geo_source'])
+        where, params = self._geo_bbox_where(west, south, east, north)
+        if category:
+            where += ' AND category = %s'
+            params.append(category)
+        self.env.cr.execute(f"""
+            SELECT id, latitude::float8, longitude::float8, COALESCE(name, ''),
+                   COALESCE(NULLIF(category, ''), 'other'), COALESCE(city, ''), COALESCE(is_tech, false),
+                   geo_source IS NOT DISTINCT FROM 'centroid'
+            FROM tech_company
+            WHERE {where}
+        """, params)
+        return encode_tile({'companies': [
+            (company_id, *project(lat, lng, zoom, x, y),
+             {'id': company_id, 'name': name, 'category': company_category, 'city': city, 'is_tech': is_tech,
+              'approximate': approximate})
+            for company_id, lat, lng, name, company_category, city, is_tech, approximate in self.env.cr.fetchall()
+        ]})
+
+    @api.model
+    def _get_map_cluster_version(self):
+        """Snapshot version the committed cluster cells were built from ('' before the first rebuild)."""
+        self.env.cr.execute("SELECT value FROM ir_config_parameter WHERE key = %s", (MAP_CLUSTER_VERSION_PARAM,))
+        row = self.env.cr.fetchone()
+        return row[0] if row else ''
+
+    @api.model
+    def _cron_rebuild_map_clusters(self):
+        """Cron job: rebuild the cluster cells if they predate the current snapshot version.
+
+        Runs in its own transaction, so map requests keep reading the previous
+        cells until the new ones are committed. Skipped while another
+        rebuild holds the lock.
+        """
+        version = self._get_snapshot_version()
+        if self._get_map_cluster_version() == version:
+            return
+        self.env.cr.execute("SELECT pg_try_advisory_xact_lock(%s)", (MAP_CLUSTER_LOCK,))
+        if self.env.cr.fetchone()[0]:
+            self._rebuild_map_clusters(version)
+
+    @api.model
+    def _rebuild_map_clusters(self, version=None):
+        """Recompute the cluster cells of every zoom from the company coordinates.
+
+        The finest zoom is grouped from tech_company, each coarser one from the
+        zoom below it (cell indexes halved), per category.
+        """
+        self.flush_model(['active', 'latitude', 'longitude', 'category'])
+        cr = self.env.cr
+        cr.execute("DELETE FROM tech_company_map_cluster")
+        cr.execute(f"""
+            INSERT INTO tech_company_map_cluster (zoom, cell_x, cell_y, category, company_count, lat_sum, lng_sum)
+            SELECT %(zoom)s, floor(longitude / %(cell)s), floor(latitude / %(cell)s), COALESCE(category, ''),
+                   count(*), sum(latitude), sum(longitude)
+            FROM tech_company
+            WHERE {GEO_INDEX_WHERE}
+            GROUP BY 2, 3, 4
+        """, {'zoom': MAP_CLUSTER_MAX_ZOOM, 'cell': map_cell_size(MAP_CLUSTER_MAX_ZOOM)})
+        for zoom in range(MAP_CLUSTER_MAX_ZOOM - 1, -1, -1):
+            cr.execute("""
+                INSERT INTO tech_company_map_cluster (zoom, cell_x, cell_y, category, company_count, lat_sum, lng_sum)
+                SELECT %s, cell_x >> 1, cell_y >> 1, category, sum(company_count), sum(lat_sum), sum(lng_sum)
+                FROM tech_company_map_cluster
+                WHERE zoom = %s
+                GROUP BY 2, 3, 4
+            """, (zoom, zoom + 1))
+        cr.execute("""
+            INSERT INTO ir_config_parameter (key, value, create_uid, create_date, write_uid, write_date)
+            VALUES (%s, %s, %s, now() at time zone 'utc', %s, now() at time zone 'utc')
+            ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value, write_date = EXCLUDED.write_date
+        """, (MAP_CLUSTER_VERSION_PARAM, version if version is not None else self._get_snapshot_version(),
+              self.env.uid, self.env.uid))
+
+    @api.model
+    def _geo_bbox_where(self, west, south, east, north):
+        """(SQL condition, params) for mapped companies inside a bounding box, on the spatial index."""
+        return (f'{GEO_INDEX_WHERE} AND {GEO_POINT_SQL} <@ box(point(%s, %s), point(%s, %s))',
+                [west, south, east, north])
+
+    @api.model
+    def search_bbox(self, west, south, east, north, domain=None, limit=None):
+        """Companies with coordinates inside a bounding box (degrees), in _order.
+
+        The box is resolved on the spatial index; `domain` further filters it.
+        """
+        self.flush_model(['active', 'latitude', 'longitude'])
+        where, params = self._geo_bbox_where(west, south, east, north)
+        self.env.cr.execute(f"SELECT id FROM tech_company WHERE {where}", params)
+        ids = [row[0] for row in self.env.cr.fetchall()]
+        return self.search([('id', 'in', ids)] + list(domain or []), limit=limit)
+
+    @api.model
+    def search_nearest(self, lat, lng, limit=10):
+        """The `limit` companies with coordinates closest to (lat, lng), nearest first."""
+        return self.browse([company_id for company_id, _km in self._nearest_distances(lat, lng, limit)])
+
+    @api.model
+    def _nearest_distances(self, lat, lng, limit=10):
+        """[(id, distance_km)] of the `limit` mapped companies closest to (lat, lng).
+
+        With PostGIS the geography index orders by true distance directly. The
+        built-in point index orders by planar degrees, where a degree of
+        longitude is shorter than one of latitude: its `limit` nearest only
+        bound the search radius, and every company inside that circle is then
+        ranked by great-circle distance.
+        """
+        self.flush_model(['active', 'latitude', 'longitude'])
+        cr = self.env.cr
+        params = {'lat': lat, 'lng': lng, 'limit': limit}
+        if self._has_extension('postgis'):
+            cr.execute(f"""
+                SELECT id, ST_Distance({GEO_GEOGRAPHY_SQL}, ST_MakePoint(%(lng)s, %(lat)s)::geography) / 1000
+                FROM tech_company
+                WHERE {GEO_INDEX_WHERE}
+                ORDER BY {GEO_GEOGRAPHY_SQL} <-> ST_MakePoint(%(lng)s, %(lat)s)::geography, id
+                LIMIT %(limit)s
+            """, params)
+            return cr.fetchall()
+
+        cr.execute(f"""
+            SELECT max({GEO_DISTANCE_KM_SQL})
+            FROM (
+                SELECT latitude, longitude FROM tech_company
+                WHERE {GEO_INDEX_WHERE}
+                ORDER BY {GEO_POINT_SQL} <-> point(%(lng)s, %(lat)s)
+                LIMIT %(limit)s
+            ) tech_company
+        """, params)
+        max_km = cr.fetchone()[0]
+        if max_km is None:
+            return []
+        # Anything within max_km lies inside this many degrees of the point
+        lat_degrees = max_km / KM_PER_DEGREE
+        params['radius'] = 1.01 * lat_degrees / math.cos(math.radians(min(abs(lat) + lat_degrees, 89.0)))
+        cr.execute(f"""
+            SELECT id, {GEO_DISTANCE_KM_SQL} AS distance_km
+            FROM tech_company
+            WHERE {GEO_INDEX_WHERE} AND {GEO_POINT_SQL} <@ circle(point(%(lng)s, %(lat)s), %(radius)s)
+            ORDER BY distance_km, id
+            LIMIT %(limit)s
+        """, params)
+        return cr.fetchall()
+
+    @api.model
+    def _search_companies(self, query, limit=20, offset=0):
+        """Full-text search over name and activity description, best match first.
+
+        Every word of the query must match, as a word prefix ("kibernet"
+        finds "kibernetike"), after accent folding; a name containing the
+        query also matches, and with pg_trgm installed so do names and
+        descriptions containing it anywhere, or names within typo distance.
+        Returns (total, [company dicts with a 'score']).
+        """
+        words = re.findall(r'[^\W_]+', fold_text(query))
+        if not words:
+            return 0, []
+        self.flush_model(['active', 'name', 'activity_description'])
+        trigram = self._has_extension('pg_trgm')
+        params = {
+            'tsquery': ' & '.join(f'{word}:*' for word in words),
+            'query': ' '.join(words),
+            'like': '%%%s%%' % ' '.join(words),
+            'prefix': '%s%%' % ' '.join(words),
+            'limit': limit,
+            'offset': offset,
+        }
+        # One branch per index, so no branch turns into a scan computing every vector
+        match = [
+            f"SELECT id FROM tech_company WHERE {SEARCH_VECTOR_SQL} @@ to_tsquery('{SEARCH_TS_CONFIG}', %(tsquery)s)",
+            f"SELECT id FROM tech_company WHERE {SEARCH_NAME_SQL} LIKE %(like)s",
+        ]
+        score = [
+            f'ts_rank_cd({SEARCH_VECTOR_SQL}, q)',
+            f"CASE WHEN {SEARCH_NAME_SQL} LIKE %(prefix)s THEN 1 WHEN {SEARCH_NAME_SQL} LIKE %(like)s THEN 0.5 ELSE 0 END",
+        ]
+        if trigram:
+            match += [
+                f"SELECT id FROM tech_company WHERE {SEARCH_ACTIVITY_SQL} LIKE %(like)s",
+                f"SELECT id FROM tech_company WHERE {SEARCH_NAME_SQL} %% %(query)s",
+            ]
+            score.append(f'similarity({SEARCH_NAME_SQL}, %(query)s)')
+        hits = f"({' UNION '.join(match)}) hits JOIN tech_company USING (id)"
+        self.env.cr.execute(f"""
+            SELECT count(*) OVER (), {', '.join(f'{expr} AS "{key}"' for key, expr in SEARCH_COLUMNS)},
+                   ({' + '.join(score)})::float8 AS score
+            FROM {hits}, to_tsquery('{SEARCH_TS_CONFIG}', %(tsquery)s) q
+            WHERE active
+            ORDER BY score DESC, name, id
+            LIMIT %(limit)s OFFSET %(offset)s
+        """, params)
+        rows = self.env.cr.fetchall()
+        if not rows:
+            if not offset:
+                return 0, []
+            # Past the last page the window count has no row to ride on
+            self.env.cr.execute(f"SELECT count(*) FROM {hits} WHERE active", params)
+            return self.env.cr.fetchone()[0], []
+        keys = [key for key, _expr in SEARCH_COLUMNS] + ['score']
+        return rows[0][0], [dict(zip(keys, row[1:])) for row in rows]
+
+    @api.model
+    def _get_snapshot_version(self):
+        """Return the current snapshot version (UTC timestamp string of the last change)."""
+        self.env.cr.execute("SELECT value FROM ir_config_parameter WHERE key = %s", (SNAPSHOT_VERSION_PARAM,))
+        row = self.env.cr.fetchone()
+        return row[0] if row else ''
+
     def get_map_marker_data(self):
         self.ensure_one()
         return {
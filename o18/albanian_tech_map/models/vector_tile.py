@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+Minimal Mapbox Vector Tile (MVT 2.1) encoder for point layers.
+
+Just enough protobuf to write Tile / Layer / Feature / Value messages, so the
+map tiles need no extra Python dependency. Only POINT features are supported.
+"""
+
+import math
+import struct
+
+TILE_EXTENT = 4096
+POINT = 1
+MOVE_TO = 1
+
+
+def _varint(value):
+    out = bytearray()
+    while True:
+        bits = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(bits | 0x80)
+        else:
+            out.append(bits)
+            return bytes(out)
+
+
+def _zigzag(value):
+    return (value << 1) ^ (value >> 63)
+
+
+def _field(number, wire_type, payload):
+    """Encode one field: varint (0), 64-bit (1) or length-delimited (2) payload."""
+    key = _varint((number << 3) | wire_type)
+    if wire_type == 0:
+        return key + _varint(payload)
+    if wire_type == 2:
+        return key + _varint(len(payload)) + payload
+    return key + payload
+
+
+def _packed(number, values):
+    return _field(number, 2, b''.join(_varint(v) for v in values))
+
+
+def _value(value):
+    """Layer Value message for a str / bool / int / float property."""
+    if isinstance(value, bool):
+        return _field(7, 0, int(value))
+    if isinstance(value, int):
+        return _field(5, 0, value) if value >= 0 else _field(6, 0, _zigzag(value))
+    if isinstance(value, float):
+        return _field(3, 1, struct.pack('<d', value))
+    return _field(1, 2, str(value).encode('utf-8'))
+
+
+def project(lat, lng, zoom, x, y, extent=TILE_EXTENT):
+    """Web Mercator position of (lat, lng) in the coordinate space of tile zoom/x/y."""
+    n = 2 ** zoom
+    world_x = (lng + 180.0) / 360.0 * n
+    world_y = (1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n
+    return round((world_x - x) * extent), round((world_y - y) * extent)
+
+
+def encode_layer(name, features, extent=TILE_EXTENT):
+    """Layer message from [(feature_id or None, px, py, {property: value})]."""
+    keys, values = {}, {}
+    encoded = []
+    for feature_id, px, py, properties in features:
+        tags = []
+        for key, value in properties.items():
+            if value is None:
+                continue
+            tags.append(keys.setdefault(key, len(keys)))
+            tags.append(values.setdefault((type(value), value), len(values)))
+        feature = b''
+        if feature_id is not None:
+            feature += _field(1, 0, feature_id)
+        if tags:
+            feature += _packed(2, tags)
+        feature += _field(3, 0, POINT)
+        feature += _packed(4, [MOVE_TO | (1 << 3), _zigzag(px), _zigzag(py)])
+        encoded.append(_field(2, 2, feature))
+    return b''.join([
+        _field(15, 0, 2),
+        _field(1, 2, name.encode('utf-8')),
+        *encoded,
+        *(_field(3, 2, key.encode('utf-8')) for key in keys),
+        *(_field(4, 2, _value(value)) for _type, value in values),
+        _field(5, 0, extent),
+    ])
+
+
+def encode_tile(layers, extent=TILE_EXTENT):
+    """Tile message from {layer name: features}; empty layers are left out."""
+    return b''.join(_field(3, 2, encode_layer(name, features, extent))
+                    for name, features in layers.items() if features)
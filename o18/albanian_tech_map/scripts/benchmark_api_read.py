@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark the read paths behind the public companies API at 1k / 10k / 100k rows.
+
+Compares the former per-record ORM loop (search + attribute access +
+json.dumps(indent=2)) with the single json_agg query now used by
+/techmap/api/companies and /techmap/api/companies/all. Synthetic companies
+are inserted inside the shell's transaction and rolled back afterwards.
+
+Usage (inside the Odoo container):
+    odoo shell -d <db> --no-http < /mnt/custom-addons/albanian_tech_map/scripts/benchmark_api_read.py
+    BENCH_SIZES=1000,10000 odoo shell -d <db> --no-http < .../benchmark_api_read.py
+"""
+
+import json
+import os
+import statistics
+import sys
+import time
+
+from odoo.addons.albanian_tech_map.models.tech_company import MAP_API_COLUMNS
+
+SIZES = [int(n) for n in os.environ.get('BENCH_SIZES', '1000,10000,100000').split(',')]
+REPEAT = int(os.environ.get('BENCH_REPEAT', '3'))
+
+MAP_DOMAIN = [
+    ('active', '=', True),
+    ('latitude', '!=', 0),
+    ('longitude', '!=', 0),
+]
+
+
+def orm_loop(Company):
+    """The read path the controller used before: one recordset, ~12 descriptors per row."""
+    data = []
+    for c in Company.search(MAP_DOMAIN):
+        data.append({
+            'id': c.id,
+            'name': c.name,
+            'lat': c.latitude,
+            'lng': c.longitude,
+            'city': c.city or '',
+            'website': c.website or '',
+            'email': c.email or '',
+            'phone': c.phone or '',
+            'category': c.category or 'other',
+            'nipt': c.nipt or '',
+            'is_tech': c.is_tech,
+            'activity_description': c.activity_description or '',
+        })
+    return json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')
+
+
+def sql_json(Company):
+    return Company._get_api_companies_json(MAP_API_COLUMNS, with_coordinates=True)
+
+
+def insert_synthetic(cr, count):
+    """Add `count` active companies with coordinates around Tirana."""
+    cr.execute("""
+        INSERT INTO tech_company (name, nipt, city, category, legal_form, latitude, longitude,
+                                  has_coordinates, is_tech, active, data_source, activity_description,
+                                  create_uid, create_date, write_uid, write_date)
+        SELECT 'Bench Company ' || g, 'BENCH' || lpad(g::text, 7, '0'), 'tirane', 'software', 'SHPK',
+               41.30 + random() * 0.05, 19.78 + random() * 0.08,
+               true, true, true, 'import',
+               'Zhvillim software, programim dhe konsulence ne fushen e teknologjise se informacionit.',
+               1, now() at time zone 'utc', 1, now() at time zone 'utc'
+        FROM generate_series(1, %s) g
+    """, (count,))
+
+
+def timed(func, Company):
+    """Median wall time (ms) and output size over REPEAT cold-cache calls."""
+    timings = []
+    body = b''
+    for _ in range(REPEAT):
+        Company.env.invalidate_all()
+        t0 = time.perf_counter()
+        body = func(Company)
+        timings.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(timings), len(body)
+
+
+if 'env' not in globals():
+    sys.exit('Run this inside `odoo shell` (it needs `env`).')
+
+Company = env['tech.company'].sudo()  # noqa: F821 - provided by odoo shell
+cr = Company.env.cr
+print(f"{'rows':>8} | {'ORM loop':>10} | {'SQL json':>10} | {'speedup':>7} | {'ORM bytes':>10} | {'SQL bytes':>10}")
+print('-' * 70)
+try:
+    for size in SIZES:
+        cr.execute('SAVEPOINT bench_api_read')
+        insert_synthetic(cr, size)
+        orm_ms, orm_bytes = timed(orm_loop, Company)
+        sql_ms, sql_bytes = timed(sql_json, Company)
+        print(f"{size:>8} | {orm_ms:>8.0f}ms | {sql_ms:>8.0f}ms | {orm_ms / sql_ms:>6.1f}x | {orm_bytes:>10} | {sql_bytes:>10}")
+        cr.execute('ROLLBACK TO SAVEPOINT bench_api_read')
+finally:
+    cr.rollback()
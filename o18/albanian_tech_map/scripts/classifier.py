@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Rule-based category classifier and is_tech verifier for activity descriptions.
+
+Every keyword of CATEGORY_RULES and TECH_KEYWORDS is compiled into one
+KeywordMatcher, so a description is scanned once for both:
+
+- category: each category scores the weights of the distinct keywords the
+  description contains and the best one wins. The confidence is the winner's
+  share of all matched weight, damped while the evidence is thin (a single
+  weak keyword).
+- is_tech: QKB's activity search matches substrings ("IT" in "kapital"), so
+  a search hit is only a candidate. A company is tech when its description
+  contains a TECH_KEYWORDS keyword as a word; the keywords found are kept in
+  tech_keywords.
+
+The stage runs over tech_company in id-ordered batches and only touches rows
+whose description changed since they were last classified: classifier_hash
+holds md5(rules signature || description), so editing the rules (or the
+matcher's MATCHER_VERSION) re-classifies everything once (--full re-verifies every row regardless). Categories and
+is_tech verdicts set by hand (category_source / tech_source = 'manual') are
+kept; descriptions still waiting for enrichment are left alone.
+
+run_scraper_docker.py runs it after every scrape. Standalone:
+    python3 classifier.py --dsn "host=db dbname=odoo user=odoo password=odoo" [--full]
+    python3 classifier.py --text "Zhvillim software dhe aplikacionesh mobile"
+"""
+
+import hashlib
+import logging
+import os
+
+import psycopg2
+from psycopg2.extras import execute_values
+
+from keyword_matcher import MATCHER_VERSION, KeywordMatcher
+from snapshot_version import bump_snapshot_version
+
+_logger = logging.getLogger(__name__)
+
+# Companies read and updated per transaction
+CLASSIFIER_BATCH = max(1, int(os.environ.get('CLASSIFIER_BATCH', '2000')))
+
+# category -> {keyword: weight}; keyword syntax in keyword_matcher.py.
+# Dict order breaks ties.
+CATEGORY_RULES = {
+    'software': {
+        'software': 3, 'softuer*': 3, 'program*': 2, 'saas': 3,
+        'erp': 2, 'crm': 2, 'aplikacion*': 1,
+    },
+    'mobile': {
+        'mobile': 2, 'android': 3, 'ios': 3, 'iphone': 2, 'aplikacion*': 1,
+    },
+    'security': {
+        'siguri kibernetike': 3, 'sigurise kibernetike': 3, 'kibernetik*': 3, 'cyber*': 3,
+        'security': 2, 'sigurise se informacionit': 3, 'antivirus': 2, 'pentest*': 3,
+    },
+    'data': {
+        'te dhena*': 3, 'databaz*': 3, 'database': 3, 'big data': 3,
+        'machine learning': 3, 'inteligjence artificiale': 3, 'inteligjenca artificiale': 3,
+        'artificial intelligence': 3, 'business intelligence': 3,
+        'analiz*': 1, 'statistik*': 1,
+    },
+    'ecommerce': {
+        'e commerce': 3, 'ecommerce': 3, 'tregti elektronike': 3, 'tregti online': 3,
+        'shitje online': 3, 'dyqan online': 3, 'online': 1,
+    },
+    'digital_agency': {
+        'marketing dixhital': 3, 'marketing digital': 3, 'marketing*': 2, 'reklam*': 2,
+        'branding': 2, 'seo': 2, 'rrjete sociale': 2, 'social media': 2, 'web design': 2,
+        'krijim faqe*': 2, 'webfaqe*': 2, 'faqe* web*': 2, 'dizajn*': 1, 'grafik*': 1,
+    },
+    'consulting': {
+        'konsulenc*': 3, 'konsult*': 2, 'consulting': 3, 'keshillim*': 2, 'auditim*': 1,
+    },
+    'it_services': {
+        'sherbime it': 3, 'sherbime informatike': 3, 'kompjuter*': 2, 'harduer*': 2,
+        'hardware': 2, 'hosting': 2, 'server*': 2, 'cloud': 2, 'telekomunikacion*': 2,
+        'rrjet*': 1, 'instalim*': 1, 'riparim*': 1, 'internet': 1,
+    },
+}
+# A description containing any of these (as words, see keyword_matcher.py) is
+# tech. Mirrors run_scraper_docker.ACTIVITY_KEYWORDS, without the substrings
+# that are common inside unrelated words or too generic on their own
+# ('development', 'automatizim').
+TECH_KEYWORDS = [
+    'software', 'softuer*', 'programim*', 'programues*', 'program* kompjuterik*', 'kodim*',
+    'it', 'informatik*', 'web*', 'faqe* interneti', 'internet*', 'hosting', 'server*', 'cloud',
+    'aplikacion*', 'app', 'apps', 'android', 'ios',
+    'kompjuter*', 'computer*', 'teknologji* informacion*', 'information technology',
+    'dixhital*', 'digital*', 'cyber*', 'siguri* kibernetik*',
+    'databaz*', 'database*', 'e commerce', 'ecommerce',
+    'software development', 'web development', 'erp', 'crm', 'saas',
+    'artificial intelligence', 'inteligjenc* artificial*', 'machine learning', 'blockchain',
+    'sistem* informacion*', 'telekomunikacion*', 'perpunim* te dhena*', 'data processing',
+]
+
+DEFAULT_CATEGORY = 'other'
+# Matched weight a category needs at all - a lone weak keyword ('online') is no evidence
+MIN_CATEGORY_WEIGHT = 2
+# Matched weight at which a lone category reaches full confidence
+FULL_CONFIDENCE_WEIGHT = 4
+
+# Descriptions the enrichment stage has not filled in yet
+PLACEHOLDER_PREFIX = '[matched:'
+
+
+class CategoryClassifier:
+    """Compiled CATEGORY_RULES + TECH_KEYWORDS."""
+
+    def __init__(self, rules=CATEGORY_RULES, tech_keywords=TECH_KEYWORDS):
+        self.categories = list(rules)
+        self.weights = {}  # keyword -> [(category, weight)]
+        for category, keywords in rules.items():
+            for keyword, weight in keywords.items():
+                self.weights.setdefault(keyword, []).append((category, weight))
+        self.tech_keywords = set(tech_keywords)
+        self.matcher = KeywordMatcher(dict.fromkeys([*self.weights, *tech_keywords]))
+        self.signature = hashlib.md5(repr((
+            MATCHER_VERSION,
+            sorted((category, sorted(keywords.items())) for category, keywords in rules.items()),
+            sorted(self.tech_keywords),
+        )).encode()).hexdigest()[:12]
+
+    def classify(self, text):
+        """(category, confidence, tech keywords found)."""
+        keywords = self.matcher.findall(text)
+        tech = [keyword for keyword in keywords if keyword in self.tech_keywords]
+        scores = dict.fromkeys(self.categories, 0)
+        for keyword in keywords:
+            for category, weight in self.weights.get(keyword, ()):
+                scores[category] += weight
+        total = sum(scores.values())
+        category = max(self.categories, key=scores.get)  # first maximum
+        best = scores[category]
+        if best < MIN_CATEGORY_WEIGHT:
+            return DEFAULT_CATEGORY, 0.0, tech
+        confidence = best / total * min(1.0, best / FULL_CONFIDENCE_WEIGHT)
+        return category, round(confidence, 2), tech
+
+    def text_hash(self, text):
+        """Same value as SQL md5(signature || text)."""
+        return hashlib.md5((self.signature + text).encode('utf-8')).hexdigest()
+
+
+# =============================================================================
+# DATABASE
+# =============================================================================
+def ensure_classifier_columns(cur):
+    # Same columns the Odoo model declares, for databases not upgraded yet
+    for col, coltype in [('category_confidence', 'DOUBLE PRECISION'), ('category_source', 'VARCHAR'),
+                         ('classifier_hash', 'VARCHAR'), ('tech_keywords', 'VARCHAR'), ('tech_source', 'VARCHAR')]:
+        cur.execute(f"ALTER TABLE tech_company ADD COLUMN IF NOT EXISTS {col} {coltype}")
+
+
+def fetch_changed(cur, signature, after_id, limit, full=False):
+    """Rows whose description changed since they were classified (every
+    enriched row if full), in id order."""
+    changed = '' if full else 'AND classifier_hash IS DISTINCT FROM md5(%(signature)s || activity_description)'
+    cur.execute(f"""
+        SELECT id, activity_description
+          FROM tech_company
+         WHERE id > %(after_id)s
+           AND COALESCE(activity_description, '') != ''
+           AND activity_description NOT LIKE %(placeholder)s
+           {changed}
+         ORDER BY id
+         LIMIT %(limit)s
+    """, {'after_id': after_id, 'placeholder': PLACEHOLDER_PREFIX + '%', 'signature': signature, 'limit': limit})
+    return cur.fetchall()
+
+
+def update_categories(cur, rows):
+    """rows: [(id, category, confidence, is_tech, tech keywords, hash)]"""
+    execute_values(cur, """
+        UPDATE tech_company AS t
+        SET category = CASE WHEN t.category_source = 'manual' THEN t.category ELSE v.category END,
+            category_confidence = CASE WHEN t.category_source = 'manual' THEN t.category_confidence
+                                       ELSE v.confidence END,
+            category_source = CASE WHEN t.category_source = 'manual' THEN 'manual' ELSE 'classifier' END,
+            is_tech = CASE WHEN t.tech_source = 'manual' THEN t.is_tech ELSE v.is_tech END,
+            tech_source = CASE WHEN t.tech_source = 'manual' THEN 'manual' ELSE 'classifier' END,
+            tech_keywords = v.keywords, classifier_hash = v.hash,
+            write_date = (now() at time zone 'utc')
+        FROM (VALUES %s) AS v (id, category, confidence, is_tech, keywords, hash)
+        WHERE t.id = v.id
+          AND (t.classifier_hash IS DISTINCT FROM v.hash
+               OR (t.is_tech IS DISTINCT FROM v.is_tech AND t.tech_source IS DISTINCT FROM 'manual'))
+    """, rows, template='(%s, %s, %s::float8, %s, %s, %s)')
+
+
+def classify_companies(conn, classifier=None, full=False):
+    """Classify every changed description (every description if full).
+    Commits per batch.
+
+    Returns {'rows', 'categorised', 'tech'} (categorised = matched a category,
+    tech = verified as tech).
+    """
+    classifier = classifier or CategoryClassifier()
+    stats = {'rows': 0, 'categorised': 0, 'tech': 0}
+    cur = conn.cursor()
+    try:
+        ensure_classifier_columns(cur)
+        conn.commit()
+        after_id = 0
+        while True:
+            rows = fetch_changed(cur, classifier.signature, after_id, CLASSIFIER_BATCH, full)
+            if not rows:
+                break
+            after_id = rows[-1][0]
+            updates = []
+            for company_id, text in rows:
+                category, confidence, tech = classifier.classify(text)
+                updates.append((company_id, category, confidence, bool(tech), ', '.join(tech),
+                                classifier.text_hash(text)))
+                if confidence:
+                    stats['categorised'] += 1
+                if tech:
+                    stats['tech'] += 1
+            update_categories(cur, updates)
+            conn.commit()
+            stats['rows'] += len(rows)
+    finally:
+        cur.close()
+    return stats
+
+
+if __name__ == '__main__':
+    import argparse
+    import sys
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--dsn', help='libpq connection string of the Odoo database')
+    parser.add_argument('--text', help='classify one description without a database')
+    parser.add_argument('--full', action='store_true', help='re-verify every row, changed or not')
+    args = parser.parse_args()
+
+    if args.text:
+        print(*CategoryClassifier().classify(args.text))
+        sys.exit(0)
+    if not args.dsn:
+        parser.error('--dsn or --text is required')
+
+    conn = psycopg2.connect(args.dsn)
+    stats = classify_companies(conn, full=args.full)
+    bump_snapshot_version(conn.cursor())  # map caches are stale
+    conn.commit()
+    conn.close()
+    _logger.info(f"Classified {stats['rows']} descriptions: {stats['categorised']} matched a category, "
+                 f"{stats['tech']} verified as tech")
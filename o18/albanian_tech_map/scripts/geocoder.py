@@ -0,0 +1,434 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Batch geocoder for tech_company rows without coordinates.
+
+Scraped companies are inserted at (0, 0) and stay off the map until they have
+a position. The scraper's enrichment step stores the address QKB shows in the
+detail modal; this stage resolves `address` + `city` to coordinates:
+
+1. the persistent cache (tech_company_geocode_cache, keyed by the normalised
+   address), so an address is resolved once however many companies share it;
+2. the local gazetteer (gazetteer_al.csv, plus GEOCODER_GAZETTEER files in the
+   same format): known streets and neighbourhoods, then the city centroid;
+3. optionally a self-hosted Nominatim (GEOCODER_NOMINATIM_URL) for addresses
+   the gazetteer only places at city level, queried by a bounded worker pool.
+
+Each row gets a confidence score (1.0 = manually placed, ~0.7 street, ~0.6
+neighbourhood, 0.3 city centroid, 0 = not found). Rows below
+GEOCODER_MIN_CONFIDENCE keep (0, 0) but still record their score. Companies
+only placed at city level (no address, or none the gazetteer knows) are
+spread around the centroid - a fixed offset per company, so a city's
+companies do not stack on one point - and marked geo_source = 'centroid', so
+the map can draw them as approximate. A city the gazetteer does not know is
+left unresolved rather than matched against other towns' streets.
+
+geo_input_hash holds md5(address || city) of the last resolution, so a row is
+only resolved again when its address or city changes (--full resolves every
+row regardless). Rows placed by hand (geo_source = 'manual') or imported with
+coordinates are never touched; rows this stage placed below the current
+threshold go back to (0, 0).
+
+run_scraper_docker.py runs it after every scrape. Standalone:
+    python3 geocoder.py --dsn "host=db dbname=odoo user=odoo password=odoo" [--full]
+    python3 geocoder.py --lookup "Rr. e Kavajës, Pallati 5" tirane
+"""
+
+import csv
+import hashlib
+import logging
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import psycopg2
+import requests
+from psycopg2.extras import execute_values
+
+from keyword_matcher import fold
+from snapshot_version import bump_snapshot_version
+
+_logger = logging.getLogger(__name__)
+
+GAZETTEER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gazetteer_al.csv')
+# Extra gazetteer files (same columns), e.g. an OSM/GeoNames extract - os.pathsep separated
+GEOCODER_GAZETTEER = os.environ.get('GEOCODER_GAZETTEER', '')
+# Self-hosted Nominatim search endpoint, e.g. http://nominatim:8080/search (empty = gazetteer only)
+GEOCODER_NOMINATIM_URL = os.environ.get('GEOCODER_NOMINATIM_URL', '')
+# Parallel Nominatim lookups, and the shared cap on lookups per second (0 = no cap)
+GEOCODER_WORKERS = max(1, int(os.environ.get('GEOCODER_WORKERS', '4')))
+GEOCODER_MAX_RATE = float(os.environ.get('GEOCODER_MAX_RATE', '0'))
+# Companies read and updated per transaction
+GEOCODER_BATCH = max(1, int(os.environ.get('GEOCODER_BATCH', '500')))
+# Rows resolved below this score are not placed on the map (0.5 = street or
+# neighbourhood only, no city-centroid placements)
+GEOCODER_MIN_CONFIDENCE = float(os.environ.get('GEOCODER_MIN_CONFIDENCE', '0.3'))
+# Radius (metres) city-level placements are spread over around the centroid
+GEOCODER_CENTROID_SPREAD = float(os.environ.get('GEOCODER_CENTROID_SPREAD', '1500'))
+# Cached results coarser than street level are looked up again after this many days
+GEOCODER_RETRY_DAYS = int(os.environ.get('GEOCODER_RETRY_DAYS', '30'))
+
+# Score of a gazetteer match, by entry kind
+KIND_CONFIDENCE = {'street': 0.7, 'area': 0.6, 'city': 0.3}
+STREET_CONFIDENCE = KIND_CONFIDENCE['street']
+# geo_source of rows this stage placed; 'centroid' = spread around a city centre
+AUTO_SOURCES = ('gazetteer', 'nominatim', 'centroid')
+CENTROID_SOURCE = 'centroid'
+# Mean metres per degree of latitude
+METRES_PER_DEGREE = 111320.0
+
+# Common abbreviations in Albanian addresses, expanded before matching
+ABBREVIATIONS = {
+    'rr': 'rruga', 'rrg': 'rruga',
+    'bul': 'bulevardi', 'bulv': 'bulevardi', 'blv': 'bulevardi',
+    'lagj': 'lagjja', 'lgj': 'lagjja',
+}
+
+
+def normalize(text):
+    """Accent-folded, lowercased words with abbreviations expanded."""
+    return ' '.join(ABBREVIATIONS.get(word, word) for word in fold(text).split())
+
+
+def address_key(address, city):
+    """Cache key: city selection key + normalised address."""
+    return f"{city or ''}|{normalize(address)}"
+
+
+# =============================================================================
+# GAZETTEER
+# =============================================================================
+class Gazetteer:
+    """Place names per city, matched as whole words inside an address."""
+
+    def __init__(self, paths):
+        self.places = {}  # city -> [(padded name, kind, lat, lng)], most precise first
+        self.centroids = {}  # city -> (lat, lng, display name)
+        for path in paths:
+            self._load(path)
+        rank = {kind: i for i, kind in enumerate(KIND_CONFIDENCE)}
+        for entries in self.places.values():
+            entries.sort(key=lambda entry: (rank[entry[1]], -len(entry[0])))
+
+    def _load(self, path):
+        with open(path, encoding='utf-8', newline='') as f:
+            rows = csv.DictReader(line for line in f if not line.startswith('#'))
+            for row in rows:
+                city, kind = row['city'].strip(), row['kind'].strip()
+                if kind not in KIND_CONFIDENCE:
+                    continue
+                lat, lng = float(row['latitude']), float(row['longitude'])
+                names = [name.strip() for name in row['names'].split('|') if name.strip()]
+                if kind == 'city':
+                    self.centroids.setdefault(city, (lat, lng, names[0]))
+                for name in names:
+                    self.places.setdefault(city, []).append((f' {normalize(name)} ', kind, lat, lng))
+
+    def city_name(self, city):
+        centroid = self.centroids.get(city)
+        return centroid[2] if centroid else ''
+
+    def lookup(self, address, city):
+        """(lat, lng, confidence) of the most precise place of `city` named in
+        the address, else the city centroid. None for a city the gazetteer
+        does not know - a street name alone does not tell which town it is in."""
+        if city not in self.places:
+            return None
+        padded = f' {normalize(address)} '
+        for name, kind, lat, lng in self.places[city]:  # most precise first
+            if name in padded:
+                return lat, lng, KIND_CONFIDENCE[kind]
+        if city in self.centroids:
+            lat, lng, _name = self.centroids[city]
+            return lat, lng, KIND_CONFIDENCE['city']
+        return None
+
+
+def is_placed(result, min_confidence=None):
+    """Whether a (lat, lng, confidence, source) result goes on the map."""
+    if min_confidence is None:
+        min_confidence = GEOCODER_MIN_CONFIDENCE
+    return result[0] is not None and result[2] >= min_confidence
+
+
+def spread(lat, lng, company_id, radius=None):
+    """Fixed point within `radius` metres of (lat, lng) for one company, so
+    companies placed on the same centroid do not stack on one point."""
+    if radius is None:
+        radius = GEOCODER_CENTROID_SPREAD
+    digest = hashlib.md5(str(company_id).encode()).digest()
+    angle = int.from_bytes(digest[:4], 'big') / 2 ** 32 * 2 * math.pi
+    distance = math.sqrt(int.from_bytes(digest[4:8], 'big') / 2 ** 32) * radius  # uniform over the disc
+    lat_offset = distance * math.cos(angle) / METRES_PER_DEGREE
+    lng_offset = distance * math.sin(angle) / (METRES_PER_DEGREE * math.cos(math.radians(lat)))
+    return round(lat + lat_offset, 7), round(lng + lng_offset, 7)
+
+
+def placement(company_id, result):
+    """(lat, lng, confidence, source) written for a company from a resolved
+    (lat, lng, confidence, source): (0, 0) below the threshold, spread around
+    the centroid for city-level results."""
+    lat, lng, confidence, source = result
+    if not is_placed(result):
+        return 0.0, 0.0, confidence, source
+    if confidence < KIND_CONFIDENCE['area']:
+        return (*spread(lat, lng, company_id), confidence, CENTROID_SOURCE)
+    return lat, lng, confidence, source
+
+
+def load_gazetteer():
+    paths = [GAZETTEER_PATH] + [p for p in GEOCODER_GAZETTEER.split(os.pathsep) if p]
+    return Gazetteer(paths)
+
+
+# =============================================================================
+# NOMINATIM
+# =============================================================================
+class NominatimClient:
+    """Nominatim /search over a shared session, paced to max_rate lookups/second."""
+
+    def __init__(self, url, max_rate=0.0, timeout=10):
+        self.url = url
+        self.timeout = timeout
+        self.interval = 1.0 / max_rate if max_rate > 0 else 0.0
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = 'albanian_tech_map geocoder'
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def _pace(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+    def lookup(self, address, city_name):
+        """(lat, lng, confidence) or None; raises on transport errors so the
+        address is not cached as unresolvable."""
+        self._pace()
+        query = ', '.join(part for part in (address, city_name, 'Albania') if part)
+        resp = self.session.get(self.url, timeout=self.timeout, params={
+            'q': query, 'format': 'jsonv2', 'limit': 1, 'countrycodes': 'al',
+        })
+        resp.raise_for_status()
+        results = resp.json()
+        if not results:
+            return None
+        place = results[0]
+        return float(place['lat']), float(place['lon']), rank_confidence(int(place.get('place_rank') or 0))
+
+    def close(self):
+        self.session.close()
+
+
+def rank_confidence(place_rank):
+    """Confidence of a Nominatim result from its place_rank (30 = building, 26 = street)."""
+    if place_rank >= 30:
+        return 0.9
+    if place_rank >= 26:
+        return STREET_CONFIDENCE
+    if place_rank >= 17:
+        return KIND_CONFIDENCE['area']
+    return KIND_CONFIDENCE['city']
+
+
+# =============================================================================
+# DATABASE
+# =============================================================================
+def ensure_geocode_tables(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS tech_company_geocode_cache (
+            address_key TEXT PRIMARY KEY,
+            latitude DOUBLE PRECISION,
+            longitude DOUBLE PRECISION,
+            confidence DOUBLE PRECISION NOT NULL DEFAULT 0,
+            source VARCHAR NOT NULL,
+            resolved_at TIMESTAMP NOT NULL DEFAULT (now() at time zone 'utc')
+        )
+    """)
+    # Same columns the Odoo model declares, for databases not upgraded yet
+    for col, coltype in [('geo_confidence', 'DOUBLE PRECISION'), ('geo_source', 'VARCHAR'),
+                         ('geo_input_hash', 'VARCHAR')]:
+        cur.execute(f"ALTER TABLE tech_company ADD COLUMN IF NOT EXISTS {col} {coltype}")
+
+
+def load_cached(cur, keys):
+    """{key: (lat, lng, confidence, source)} for cache entries still trusted."""
+    cur.execute("""
+        SELECT address_key, latitude, longitude, confidence, source
+          FROM tech_company_geocode_cache
+         WHERE address_key = ANY(%s)
+           AND (confidence >= %s OR resolved_at > (now() at time zone 'utc') - make_interval(days => %s))
+    """, (list(keys), STREET_CONFIDENCE, GEOCODER_RETRY_DAYS))
+    return {key: tuple(rest) for key, *rest in cur.fetchall()}
+
+
+def save_cached(cur, results):
+    execute_values(cur, """
+        INSERT INTO tech_company_geocode_cache (address_key, latitude, longitude, confidence, source)
+        VALUES %s
+        ON CONFLICT (address_key) DO UPDATE
+        SET latitude = EXCLUDED.latitude, longitude = EXCLUDED.longitude,
+            confidence = EXCLUDED.confidence, source = EXCLUDED.source,
+            resolved_at = (now() at time zone 'utc')
+    """, [(key, lat, lng, confidence, source) for key, (lat, lng, confidence, source) in results.items()])
+
+
+def fetch_pending(cur, after_id, limit, full=False):
+    """(id, address, city, input hash) of the active companies to resolve, in
+    id order after after_id: those still at (0, 0) or placed by this stage
+    whose address/city changed since (all of them if full), and those this
+    stage placed below GEOCODER_MIN_CONFIDENCE."""
+    changed = '' if full else 'AND geo_input_hash IS DISTINCT FROM {input_hash}'
+    input_hash = "md5(COALESCE(address, '') || '|' || COALESCE(city, ''))"
+    cur.execute(f"""
+        SELECT id, COALESCE(address, ''), COALESCE(city, ''), {input_hash}
+          FROM tech_company
+         WHERE active
+           AND id > %(after_id)s
+           AND COALESCE(geo_source, '') != 'manual'
+           AND (((COALESCE(latitude, 0) = 0 OR COALESCE(longitude, 0) = 0 OR geo_source IN %(auto)s)
+                 {changed.format(input_hash=input_hash)})
+                OR (geo_source IN %(auto)s AND geo_confidence < %(min_confidence)s
+                    AND COALESCE(latitude, 0) != 0))
+         ORDER BY id
+         LIMIT %(limit)s
+    """, {'after_id': after_id, 'auto': AUTO_SOURCES, 'min_confidence': GEOCODER_MIN_CONFIDENCE,
+          'limit': limit})
+    return cur.fetchall()
+
+
+def update_companies(cur, rows):
+    """rows: [(id, lat, lng, confidence, source, input hash)] - lat/lng 0 leaves the row unplaced."""
+    execute_values(cur, """
+        UPDATE tech_company AS t
+        SET latitude = v.lat, longitude = v.lng,
+            has_coordinates = (v.lat != 0 AND v.lng != 0),
+            geo_confidence = v.confidence, geo_source = v.source, geo_input_hash = v.hash,
+            write_date = (now() at time zone 'utc')
+        FROM (VALUES %s) AS v (id, lat, lng, confidence, source, hash)
+        WHERE t.id = v.id
+          AND (t.latitude IS DISTINCT FROM v.lat OR t.longitude IS DISTINCT FROM v.lng
+               OR t.geo_confidence IS DISTINCT FROM v.confidence OR t.geo_source IS DISTINCT FROM v.source
+               OR t.geo_input_hash IS DISTINCT FROM v.hash)
+    """, rows, template='(%s, %s::float8, %s::float8, %s::float8, %s, %s)')
+
+
+# =============================================================================
+# STAGE
+# =============================================================================
+def resolve(keys, gazetteer, nominatim=None):
+    """{key: (lat, lng, confidence, source)} for (key, address, city) tuples.
+
+    Only addresses the gazetteer places at city level or not at all go to
+    Nominatim; a failed request leaves the key out so it is retried later.
+    """
+    results = {}
+    remote = []
+    for key, address, city in keys:
+        local = gazetteer.lookup(address, city)
+        results[key] = (*local, 'gazetteer') if local else (None, None, 0.0, 'gazetteer')
+        if nominatim and address.strip() and results[key][2] < STREET_CONFIDENCE:
+            remote.append((key, address, city))
+
+    def remote_lookup(item):
+        key, address, city = item
+        try:
+            return key, nominatim.lookup(address, gazetteer.city_name(city))
+        except (requests.RequestException, ValueError, KeyError) as e:
+            _logger.warning(f"Nominatim lookup failed for {address!r}: {e}")
+            return key, False
+
+    if remote:
+        with ThreadPoolExecutor(max_workers=GEOCODER_WORKERS, thread_name_prefix='geocode') as pool:
+            for key, found in pool.map(remote_lookup, remote):
+                if found is False:
+                    results.pop(key)
+                elif found and found[2] > results[key][2]:
+                    results[key] = (*found, 'nominatim')
+    return results
+
+
+def geocode_companies(conn, gazetteer=None, nominatim=None, full=False):
+    """Place every active company still at (0, 0) whose address or city
+    changed since it was last resolved (every one if full). Commits per batch.
+
+    Returns {'rows', 'placed', 'unresolved', 'lookups'}.
+    """
+    gazetteer = gazetteer or load_gazetteer()
+    own_client = nominatim is None and GEOCODER_NOMINATIM_URL
+    if own_client:
+        nominatim = NominatimClient(GEOCODER_NOMINATIM_URL, GEOCODER_MAX_RATE)
+    stats = {'rows': 0, 'placed': 0, 'unresolved': 0, 'lookups': 0}
+    cur = conn.cursor()
+    try:
+        ensure_geocode_tables(cur)
+        conn.commit()
+        after_id = 0
+        while True:
+            rows = fetch_pending(cur, after_id, GEOCODER_BATCH, full)
+            if not rows:
+                break
+            after_id = rows[-1][0]
+            keys = {address_key(address, city): (address, city) for _id, address, city, _hash in rows}
+            known = load_cached(cur, keys)
+            missing = [(key, *keys[key]) for key in keys if key not in known]
+            resolved = resolve(missing, gazetteer, nominatim)
+            if resolved:
+                save_cached(cur, resolved)
+            known.update(resolved)
+            stats['lookups'] += len(missing)
+
+            updates = []
+            for company_id, address, city, input_hash in rows:
+                found = known.get(address_key(address, city))
+                if not found:
+                    continue  # remote lookup failed - retried next run
+                lat, lng, confidence, source = placement(company_id, found)
+                stats['placed' if lat else 'unresolved'] += 1
+                updates.append((company_id, lat, lng, confidence, source, input_hash))
+            if updates:
+                update_companies(cur, updates)
+            conn.commit()
+            stats['rows'] += len(rows)
+    finally:
+        cur.close()
+        if own_client:
+            nominatim.close()
+    return stats
+
+
+if __name__ == '__main__':
+    import argparse
+    import sys
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--dsn', help='libpq connection string of the Odoo database')
+    parser.add_argument('--lookup', nargs=2, metavar=('ADDRESS', 'CITY'),
+                        help='resolve one address against the gazetteer (and Nominatim) without a database')
+    parser.add_argument('--full', action='store_true', help='resolve every row, changed or not')
+    args = parser.parse_args()
+
+    if args.lookup:
+        address, city = args.lookup
+        client = NominatimClient(GEOCODER_NOMINATIM_URL, GEOCODER_MAX_RATE) if GEOCODER_NOMINATIM_URL else None
+        key = address_key(address, city)
+        print(key, resolve([(key, address, city)], load_gazetteer(), client).get(key))
+        sys.exit(0)
+    if not args.dsn:
+        parser.error('--dsn or --lookup is required')
+
+    conn = psycopg2.connect(args.dsn)
+    stats = geocode_companies(conn, full=args.full)
+    bump_snapshot_version(conn.cursor())  # map caches are stale
+    conn.commit()
+    conn.close()
+    _logger.info(f"Geocoded {stats['rows']} rows: {stats['placed']} placed, "
+                 f"{stats['unresolved']} unresolved ({stats['lookups']} addresses looked up)")
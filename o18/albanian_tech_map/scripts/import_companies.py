@@ -3,118 +3,246 @@
 """
 Import scraped QKB companies into Odoo tech.company model.
 
+The input is streamed, so memory stays flat however large the file is: a JSON
+array is decoded one record at a time, NDJSON (.ndjson / .jsonl) line by line
+and CSV row by row; any of them may be gzipped (.gz). Records are imported in
+chunks of IMPORT_BATCH: one query prefetches the chunk's existing NIPTs, new
+companies go through one batched create(), existing ones are only written
+when a value changed - one write() per distinct set of changed values - and
+mail tracking / chatter messages are off for the whole import. Each chunk is
+committed.
+
 Usage (from Odoo shell):
     python odoo-bin shell -d your_database < albanian_tech_map/scripts/import_companies.py
+    IMPORT_FILE=/data/companies.ndjson.gz python odoo-bin shell -d your_database < .../import_companies.py
 
-Or run standalone to generate XML data file:
-    python albanian_tech_map/scripts/import_companies.py
+Or run standalone to regenerate the seed file loaded on install and upgrade:
+    python albanian_tech_map/scripts/import_companies.py [companies.json|.ndjson|.csv]
 """
 
+import csv
+import gzip
+import io
+import itertools
 import json
 import os
 import sys
 
 
-def import_to_odoo(env):
-    """Import companies directly into Odoo database via ORM"""
-    json_path = os.path.join(os.path.dirname(__file__), '..', '..', 'qkb_companies_comprehensive_with_contacts.json')
-
-    if not os.path.exists(json_path):
-        print(f"[ERROR] JSON file not found: {json_path}")
-        return
-
-    with open(json_path, 'r', encoding='utf-8') as f:
-        companies = json.load(f)
-
-    print(f"[INFO] Loaded {len(companies)} companies from JSON")
-
-    Company = env['tech.company']
-    created = 0
-    updated = 0
-    skipped = 0
-
-    for company_data in companies:
-        nipt = company_data.get('nipt')
-        name = company_data.get('name')
-
-        if not nipt or not name:
-            skipped += 1
+def _script_dir():
+    try:
+        return os.path.dirname(os.path.abspath(__file__))
+    except NameError:  # piped into odoo-bin shell
+        from odoo.modules.module import get_module_path
+        return os.path.join(get_module_path('albanian_tech_map'), 'scripts')
+
+
+SCRIPT_DIR = _script_dir()
+if SCRIPT_DIR not in sys.path:
+    sys.path.insert(0, SCRIPT_DIR)
+
+from keyword_matcher import fold  # noqa: E402
+
+DEFAULT_JSON_PATH = os.path.join(SCRIPT_DIR, '..', '..', 'qkb_companies_comprehensive_with_contacts.json')
+# Records per prefetch / create / commit
+IMPORT_BATCH = max(1, int(os.environ.get('IMPORT_BATCH', '1000')))
+READ_CHUNK = 1 << 16
+
+# Columns of data/tech_company_seed.csv.gz (models/tech_company.py SEED_COLUMNS)
+SEED_COLUMNS = ['nipt', 'name', 'city', 'legal_form', 'registration_date', 'email', 'phone']
+# Fields set from the input, compared against the stored values on update
+IMPORT_FIELDS = ['name', 'nipt', 'city', 'legal_form', 'registration_date', 'email', 'phone', 'data_source']
+CITY_ALIASES = {'tirana': 'tirane'}
+
+
+# =============================================================================
+# STREAMING READERS
+# =============================================================================
+def _open_text(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8', newline='')
+    return open(path, 'r', encoding='utf-8', newline='')
+
+
+def _format(path):
+    base = path[:-3] if path.endswith('.gz') else path
+    ext = os.path.splitext(base)[1].lower()
+    if ext in ('.ndjson', '.jsonl'):
+        return 'ndjson'
+    if ext == '.csv':
+        return 'csv'
+    return 'json'
+
+
+def iter_json_array(f, chunk_size=READ_CHUNK):
+    """Yield the objects of a top-level JSON array, reading chunk_size
+    characters at a time."""
+    decoder = json.JSONDecoder()
+    buf = f.read(chunk_size).lstrip()
+    if not buf.startswith('['):
+        raise ValueError('expected a JSON array')
+    pos, eof = 1, False
+    while True:
+        while True:
+            while pos < len(buf) and buf[pos] in ' \t\r\n,':
+                pos += 1
+            if pos < len(buf) or eof:
+                break
+            buf, pos = f.read(chunk_size), 0
+            eof = not buf
+        if pos >= len(buf) or buf[pos] == ']':
+            return
+        try:
+            item, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            # Object cut at the end of the buffer - read on (or fail at EOF)
+            if eof:
+                raise
+            more = f.read(chunk_size)
+            buf, pos, eof = buf[pos:] + more, 0, not more
             continue
-
-        vals = {
-            'name': name,
-            'nipt': nipt,
-            'city': company_data.get('city', 'Tirane'),
-            'legal_form': company_data.get('type', ''),
-            'registration_date': company_data.get('registration_date', ''),
-            'email': company_data.get('email') or False,
-            'phone': company_data.get('phone') or False,
-            'data_source': 'qkb',
-        }
-
-        existing = Company.search([('nipt', '=', nipt)], limit=1)
-        if existing:
-            existing.write(vals)
-            updated += 1
+        yield item
+        pos = end
+
+
+def iter_records(path):
+    """Records of a JSON / NDJSON / CSV file (optionally .gz), one at a time."""
+    fmt = _format(path)
+    with _open_text(path) as f:
+        if fmt == 'json':
+            yield from iter_json_array(f)
+        elif fmt == 'ndjson':
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
         else:
-            Company.create(vals)
-            created += 1
+            yield from csv.DictReader(f)
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
+
+
+# =============================================================================
+# IMPORT
+# =============================================================================
+def city_key(city):
+    """Folded city name as the city selection keys are written ('Tiranë' -> 'tirane')."""
+    city = fold(city)
+    return CITY_ALIASES.get(city, city)
+
+
+def company_vals(record, cities):
+    """tech.company values for one input record, or None without NIPT/name.
+    Empty values are False, as the ORM reads them back."""
+    nipt = (record.get('nipt') or '').strip()
+    name = (record.get('name') or '').strip()
+    if not nipt or not name:
+        return None
+    city = city_key(record.get('city'))
+    return {
+        'name': name,
+        'nipt': nipt,
+        'city': city if city in cities else ('other' if city else 'tirane'),
+        'legal_form': record.get('type') or record.get('legal_form') or False,
+        'registration_date': record.get('registration_date') or False,
+        'email': record.get('email') or False,
+        'phone': record.get('phone') or False,
+        'data_source': 'qkb',
+    }
+
+
+def import_to_odoo(env, path=None):
+    """Import companies directly into Odoo database via ORM"""
+    path = path or os.environ.get('IMPORT_FILE') or DEFAULT_JSON_PATH
+    if not os.path.exists(path):
+        print(f"[ERROR] File not found: {path}")
+        return
 
+    Company = env['tech.company'].with_context(
+        active_test=False,  # archived companies still own their NIPT
+        tracking_disable=True,
+        mail_create_nolog=True,
+        mail_create_nosubscribe=True,
+        mail_notrack=True,
+        tech_company_defer_snapshot=True,
+    )
+    cities = dict(Company._fields['city'].selection)
+    created = updated = unchanged = skipped = 0
+
+    for chunk in chunked(iter_records(path), IMPORT_BATCH):
+        by_nipt = {}  # a NIPT repeated within the chunk: the last record wins
+        for record in chunk:
+            vals = company_vals(record, cities)
+            if vals is None:
+                skipped += 1
+            else:
+                by_nipt[vals['nipt']] = vals
+
+        existing = {row['nipt']: row for row in
+                    Company.search_read([('nipt', 'in', list(by_nipt))], IMPORT_FIELDS)}
+        to_create = []
+        to_write = {}  # changed values -> ids; records with the same changes share one write()
+        for nipt, vals in by_nipt.items():
+            row = existing.get(nipt)
+            if not row:
+                to_create.append(vals)
+                continue
+            changed = tuple(sorted((field, value) for field, value in vals.items() if row[field] != value))
+            if changed:
+                to_write.setdefault(changed, []).append(row['id'])
+                updated += 1
+            else:
+                unchanged += 1
+        for changed, ids in to_write.items():
+            Company.browse(ids).write(dict(changed))
+        if to_create:
+            Company.create(to_create)
+            created += len(to_create)
+
+        env.cr.commit()
+        env.invalidate_all()
+        print(f"[INFO] {created + updated + unchanged + skipped} records read: "
+              f"{created} created, {updated} updated, {unchanged} unchanged")
+
+    env['tech.company']._bump_snapshot_version()
     env.cr.commit()
-    print(f"[OK] Import complete: {created} created, {updated} updated, {skipped} skipped")
-
+    print(f"[OK] Import complete: {created} created, {updated} updated, {unchanged} unchanged, {skipped} skipped")
 
-def generate_xml_data():
-    """Generate Odoo XML data file from JSON (alternative to shell import)"""
-    json_path = os.path.join(os.path.dirname(__file__), '..', '..', 'qkb_companies_comprehensive_with_contacts.json')
 
-    if not os.path.exists(json_path):
-        print(f"[ERROR] JSON file not found: {json_path}")
+def generate_seed_data(path=None):
+    """Write the seed file the module loads on install and upgrade (data/tech_company_seed.csv.gz)"""
+    path = path or os.environ.get('IMPORT_FILE') or DEFAULT_JSON_PATH
+    if not os.path.exists(path):
+        print(f"[ERROR] File not found: {path}")
         return
 
-    with open(json_path, 'r', encoding='utf-8') as f:
-        companies = json.load(f)
-
-    xml_lines = ['<?xml version="1.0" encoding="utf-8"?>', '<odoo>', '    <data noupdate="1">']
-
-    for i, c in enumerate(companies, 1):
-        nipt = c.get('nipt', '')
-        name = c.get('name', '').replace('&', '&amp;').replace('"', '&quot;').replace('<', '&lt;').replace('>', '&gt;')
-        city = c.get('city', 'Tirane')
-        legal_form = (c.get('type') or '').replace('&', '&amp;')
-        reg_date = c.get('registration_date', '')
-        email = c.get('email') or ''
-        phone = c.get('phone') or ''
-
-        xml_id = f"company_{nipt.lower()}"
-
-        xml_lines.append(f'')
-        xml_lines.append(f'        <record id="{xml_id}" model="tech.company">')
-        xml_lines.append(f'            <field name="name">{name}</field>')
-        xml_lines.append(f'            <field name="nipt">{nipt}</field>')
-        xml_lines.append(f'            <field name="city">{city}</field>')
-        xml_lines.append(f'            <field name="legal_form">{legal_form}</field>')
-        xml_lines.append(f'            <field name="registration_date">{reg_date}</field>')
-        if email:
-            xml_lines.append(f'            <field name="email">{email}</field>')
-        if phone:
-            xml_lines.append(f'            <field name="phone">{phone}</field>')
-        xml_lines.append(f'            <field name="data_source">qkb</field>')
-        xml_lines.append(f'        </record>')
-
-    xml_lines.append('    </data>')
-    xml_lines.append('</odoo>')
-
-    output_path = os.path.join(os.path.dirname(__file__), '..', 'data', 'tech_company_data.xml')
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.write('\n'.join(xml_lines))
-
-    print(f"[OK] Generated XML data file with {len(companies)} companies: {output_path}")
+    output_path = os.path.join(SCRIPT_DIR, '..', 'data', 'tech_company_seed.csv.gz')
+    count = 0
+    # mtime=0 keeps the file byte-identical for identical data, so the
+    # seed loader's file hash only changes with the content
+    with open(output_path, 'wb') as raw, \
+            gzip.GzipFile(filename='', mode='wb', fileobj=raw, mtime=0) as gz, \
+            io.TextIOWrapper(gz, encoding='utf-8', newline='') as f:
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerow(SEED_COLUMNS)
+        for record in iter_records(path):
+            nipt, name = record.get('nipt'), record.get('name')
+            if not nipt or not name:
+                continue
+            writer.writerow([nipt, name, city_key(record.get('city') or 'tirane'),
+                             record.get('type') or record.get('legal_form') or '',
+                             record.get('registration_date') or '', record.get('email') or '', record.get('phone') or ''])
+            count += 1
+
+    print(f"[OK] Generated seed file with {count} companies: {output_path}")
 
 
 if __name__ == '__main__':
-    # When run standalone, generate XML data file
-    generate_xml_data()
+    # When run standalone, generate the seed file
+    generate_seed_data(sys.argv[1] if len(sys.argv) > 1 else None)
 else:
     # When run via Odoo shell, import directly
     try:
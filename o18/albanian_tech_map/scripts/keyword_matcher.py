@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""
+Single-pass multi-keyword matcher for activity descriptions.
+
+Keywords are folded like the text (accents stripped, lowercased, punctuation
+to spaces) and merged into a character trie, which is compiled into ONE
+regular expression - the trie's branches become nested alternations, so the
+C regex engine walks the automaton once over the text instead of trying every
+keyword at every position.
+
+Keyword syntax:
+    'web'            whole word only (not "webfaqe", not "uebi")
+    'program*'       word prefix: "programim", "programeve"
+    'faqe interneti' phrase, words separated by any punctuation/whitespace
+    'siguri* kibernetik*'  any word of a phrase can be a prefix
+
+Albanian links a noun to its genitive or adjective with an article, so phrase
+words may have one of LINK_ARTICLES between them: 'sistem* informacion*'
+matches "sistemi i informacionit", 'teknologji* informacion*' matches
+"teknologjise se informacionit".
+
+Matches never start or end inside a word, so two matches starting at the same
+word differ only in how many words they cover. Python's alternation takes the
+first branch that matches, not the longest, so at every trie node the
+branches that can still reach more words come first: a phrase wins over a
+word it starts with ("programimi kompjuterik" -> 'program* kompjuterik*'
+rather than just 'programim*'). A span reports every keyword it or a run of
+its words satisfies: "programim" -> 'programim', 'program*'; "marketing
+digital" -> 'marketing digital', 'marketing*', 'digital*'.
+"""
+
+import re
+import unicodedata
+
+NON_WORD = re.compile(r'[^a-z0-9]+')
+WORD_CHAR = '[a-z0-9]'
+STAR = '*'
+END = ''  # trie key marking the end of a keyword
+# Folded linking articles (i, e, të, së) allowed between the words of a phrase
+LINK_ARTICLES = ('i', 'e', 'te', 'se')
+PHRASE_SEP = ' (?:(?:%s) )?' % '|'.join(LINK_ARTICLES)
+# Part of the classifier signature: bump when the same keywords match differently
+MATCHER_VERSION = 3
+
+
+def fold(text):
+    """Accent-folded, lowercased text with single spaces between words."""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch)).lower()
+    return ' '.join(NON_WORD.split(text)).strip()
+
+
+def _tokens(keyword):
+    """Trie path of a keyword: folded characters, STAR after prefix words."""
+    tokens = []
+    for word in keyword.split():
+        folded = fold(word.rstrip(STAR))
+        if not folded:
+            continue
+        if tokens:
+            tokens.append(' ')
+        tokens.extend(folded)
+        if word.endswith(STAR):
+            tokens.append(STAR)
+    return tokens
+
+
+def _trie_regex(node):
+    """(regex source, most words a keyword below it still adds) for a trie
+    node; branches reaching more words are tried first, the keyword end last."""
+    branches = []  # (words still ahead, source)
+    for ch, child in sorted(node.items()):
+        if ch in (STAR, END):
+            continue
+        source, words = _trie_regex(child)
+        if ch == ' ':
+            branches.append((words + 1, PHRASE_SEP + source))
+        else:
+            branches.append((words, re.escape(ch) + source))
+    if STAR in node:
+        source, words = _trie_regex(node[STAR])
+        branches.append((words, f'{WORD_CHAR}*' + source))
+    branches.sort(key=lambda branch: -branch[0])  # stable: same order within a word count
+    if END in node:
+        branches.append((0, f'(?!{WORD_CHAR})'))
+    depth = branches[0][0]
+    if len(branches) == 1:
+        return branches[0][1], depth
+    return '(?:' + '|'.join(source for _words, source in branches) + ')', depth
+
+
+class KeywordMatcher:
+    """Compiled matcher over a fixed keyword list."""
+
+    def __init__(self, keywords):
+        self.exact = {}  # folded single word without STAR -> [keywords]
+        self.prefixes = {}  # folded single-word prefix -> [keywords]
+        self.phrases = []  # (full-match regex, keyword) for phrases
+        trie = {}
+        for keyword in keywords:
+            tokens = _tokens(keyword)
+            if not tokens:
+                continue
+            node = trie
+            for token in tokens:
+                node = node.setdefault(token, {})
+            node[END] = True
+            text = ''.join(tokens)
+            if ' ' in tokens:
+                pattern = ''.join(f'{WORD_CHAR}*' if t == STAR else PHRASE_SEP if t == ' ' else re.escape(t)
+                                  for t in tokens)
+                self.phrases.append((re.compile(pattern), keyword))
+            elif STAR in tokens:
+                self.prefixes.setdefault(text[:-1], []).append(keyword)
+            else:
+                self.exact.setdefault(text, []).append(keyword)
+        self.lengths = sorted({len(p) for p in self.prefixes}, reverse=True)
+        self.regex = re.compile(f'(?<!{WORD_CHAR})' + _trie_regex(trie)[0]) if trie else None
+
+    def _word_keywords(self, word):
+        found = list(self.exact.get(word, ()))
+        for n in self.lengths:
+            if n <= len(word):
+                found += self.prefixes.get(word[:n], ())
+        return found
+
+    def keywords(self, match):
+        """Every keyword the matched (folded) span or a run of its words satisfies."""
+        words = match.split()
+        found = []
+        for i in range(len(words)):
+            found += self._word_keywords(words[i])
+            for j in range(i + 2, len(words) + 1):
+                span = ' '.join(words[i:j])
+                found += [keyword for pattern, keyword in self.phrases if pattern.fullmatch(span)]
+        return found
+
+    def findall(self, text, folded=False):
+        """Keywords found in text, in order of first occurrence, each once."""
+        if not self.regex:
+            return []
+        found = {}
+        for match in self.regex.findall(text if folded else fold(text)):
+            for keyword in self.keywords(match):
+                found.setdefault(keyword, None)
+        return list(found)
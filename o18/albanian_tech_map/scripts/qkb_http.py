@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Direct HTTP backend for the QKB search - no Chrome.
+
+Replays the form submission the "Kerko per subjekt" page makes with a plain
+requests session and parses the result cards (or a JSON payload) directly.
+Exposes the same interface as the Chrome backend in run_scraper_docker.py:
+search(), get_detail(), close().
+
+Try it against the offline stand-in server:
+    python3 qkb_standin_server.py --port 8765 &
+    python3 qkb_http.py --url http://127.0.0.1:8765/kerko-per-subjekt/ software
+"""
+
+import calendar
+import logging
+import re
+from urllib.parse import urljoin
+
+import requests
+try:
+    from bs4 import BeautifulSoup
+except ImportError:  # only QkbHttpClient parses HTML; the Chrome scraper just uses the text parsers
+    BeautifulSoup = None
+
+from search_planner import SearchResult
+
+_logger = logging.getLogger(__name__)
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+# Form fields, by the element ids the Chrome backend fills in
+FIELD_DATE_FROM = 'dataNga'
+FIELD_DATE_TO = 'dataNe'
+FIELD_QARKU = 'qarku'
+FIELD_LEGAL_FORM = 'formeLigjore'
+FIELD_ACTIVITY = 'sektoriIVeprimtarise'
+FIELD_NIPT = 'nipt'
+DATE_FORMAT = '{d:02d}/{m:02d}/{y}'  # flatpickr altInput format used by QKB
+
+MAX_PAGES = 10
+
+# Sections that follow "Objekti i aktivitetit" in the detail modal
+ACTIVITY_STOP_LINES = ['Administrator/ Ortak/ Aksionar', 'Qyteti',
+                       'Pronësia', 'Ekstrakt RPP', 'Ekstrakt i thjeshtë',
+                       'Ekstrakt historik', '']
+# Label of the registered address in the detail modal ("Adresa", "Adresa e selisë")
+ADDRESS_LABEL = re.compile(r'^Adresa(?: e selis[eë])?\s*:?\s*(.*)$', re.IGNORECASE)
+
+
+def extract_activity(text):
+    """Return the "Objekti i aktivitetit" paragraph from detail modal text."""
+    lines = text.split('\n')
+    for i, line in enumerate(lines):
+        if 'Objekti i aktivitetit' in line:
+            activity_lines = []
+            for j in range(i + 1, len(lines)):
+                stripped = lines[j].strip()
+                if stripped in ACTIVITY_STOP_LINES or ADDRESS_LABEL.match(stripped):
+                    break
+                activity_lines.append(stripped)
+            return ' '.join(activity_lines)
+    return ''
+
+
+def extract_address(text):
+    """Return the registered address from detail modal text ('' if absent):
+    the rest of the "Adresa" line, else the line after it."""
+    lines = [line.strip() for line in text.split('\n')]
+    for i, line in enumerate(lines):
+        match = ADDRESS_LABEL.match(line)
+        if match:
+            value = match.group(1) or (lines[i + 1] if i + 1 < len(lines) else '')
+            return '' if value in ACTIVITY_STOP_LINES or value == '-' else value
+    return ''
+
+
+def extract_detail(text):
+    """(activity, address) from detail modal text."""
+    return extract_activity(text), extract_address(text)
+
+
+class QkbHttpClient:
+    """QKB search over a plain HTTP session."""
+
+    name = 'http'
+
+    def __init__(self, search_url, city_map=None, timeout=15):
+        if BeautifulSoup is None:
+            raise ImportError('the HTTP backend needs beautifulsoup4 (pip install beautifulsoup4)')
+        self.search_url = search_url
+        self.city_map = city_map or {}
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = USER_AGENT
+        self._form = None  # (method, action, hidden fields)
+
+    def close(self):
+        self.session.close()
+
+    # -------------------------------------------------------------------------
+    # Form replay
+    # -------------------------------------------------------------------------
+    def _load_form(self):
+        """GET the search page once per session: cookies, action, hidden/CSRF inputs."""
+        resp = self.session.get(self.search_url, timeout=self.timeout)
+        resp.raise_for_status()
+        soup = BeautifulSoup(resp.text, 'html.parser')
+        field = soup.find(id=FIELD_ACTIVITY) or soup.find(attrs={'name': FIELD_ACTIVITY})
+        form = field.find_parent('form') if field else soup.find('form')
+        if not form:
+            raise ValueError('search form not found on QKB page')
+        method = (form.get('method') or 'get').lower()
+        action = urljoin(resp.url, form.get('action') or resp.url)
+        hidden = {inp['name']: inp.get('value', '')
+                  for inp in form.find_all('input', type='hidden') if inp.get('name')}
+        self._form = (method, action, hidden)
+        return self._form
+
+    def _submit(self, fields):
+        method, action, hidden = self._form or self._load_form()
+        data = dict(hidden, **fields)
+        if method == 'post':
+            resp = self.session.post(action, data=data, timeout=self.timeout,
+                                     headers={'Referer': self.search_url})
+        else:
+            resp = self.session.get(action, params=data, timeout=self.timeout,
+                                    headers={'Referer': self.search_url})
+        resp.raise_for_status()
+        return resp
+
+    # -------------------------------------------------------------------------
+    # Result parsing
+    # -------------------------------------------------------------------------
+    def _company(self, nipt, name, city, lf, reg_date):
+        nipt, name = (nipt or '').strip(), (name or '').strip()
+        lf = (lf or '').strip()
+        if not nipt or not name or 'fizik' in lf.lower():
+            return None
+        return {
+            'nipt': nipt, 'name': name,
+            'city': self.city_map.get((city or '').strip().lower(), 'tirane'),
+            'legal_form': lf, 'registration_date': (reg_date or '').strip(),
+        }
+
+    def parse_results(self, resp):
+        """Return (companies, next_page_url, raw_row_count) from a result page (HTML or JSON)."""
+        if 'json' in resp.headers.get('Content-Type', ''):
+            payload = resp.json()
+            rows = payload.get('data', payload) if isinstance(payload, dict) else payload
+            companies = [self._company(r.get('nipti') or r.get('nipt'),
+                                       r.get('emriISubjektit') or r.get('name'),
+                                       r.get('qyteti') or r.get('city'),
+                                       r.get('formaLigjore') or r.get('legal_form'),
+                                       r.get('dataERegjistrimit') or r.get('registration_date'))
+                         for r in rows]
+            next_url = payload.get('next') if isinstance(payload, dict) else None
+            return [c for c in companies if c], next_url, len(rows)
+
+        soup = BeautifulSoup(resp.text, 'html.parser')
+
+        def text(card, cls):
+            el = card.select_one(cls)
+            return el.get_text(strip=True) if el else ''
+
+        companies = []
+        cards = soup.select('ul.list li .card.responsive-card-text')
+        for card in cards:
+            c = self._company(text(card, '.nipti'), text(card, '.emriISubjektit'),
+                              text(card, '.qyteti'), text(card, '.formaLigjore'),
+                              text(card, '.dataERegjistrimit'))
+            if c:
+                companies.append(c)
+
+        # Server-side pagination only; List.js pagination ('#' links) is all in this page
+        next_url = None
+        active = soup.select_one('ul.pagination li.active')
+        current = active.get_text(strip=True) if active else '1'
+        for link in soup.select('ul.pagination li a[href]'):
+            href = link['href']
+            if (current.isdigit() and link.get_text(strip=True) == str(int(current) + 1)
+                    and not href.startswith(('#', 'javascript'))):
+                next_url = urljoin(resp.url, href)
+                break
+        return companies, next_url, len(cards)
+
+    # -------------------------------------------------------------------------
+    # Backend interface
+    # -------------------------------------------------------------------------
+    def search(self, keyword, legal_form='', date_from=None, date_to=None):
+        """Same contract as search_qkb_activity(): SearchResult of company dicts, None on error."""
+        fields = {FIELD_ACTIVITY: keyword, FIELD_QARKU: 'tirane'}
+        if legal_form:
+            fields[FIELD_LEGAL_FORM] = legal_form
+        if date_from and date_to:
+            fields[FIELD_DATE_FROM] = DATE_FORMAT.format(d=1, m=date_from[1], y=date_from[0])
+            last_day = calendar.monthrange(date_to[0], date_to[1])[1]
+            fields[FIELD_DATE_TO] = DATE_FORMAT.format(d=last_day, m=date_to[1], y=date_to[0])
+        try:
+            resp = self._submit(fields)
+            companies, next_url, raw_count = self.parse_results(resp)
+            page = 1
+            while next_url and page < MAX_PAGES:
+                resp = self.session.get(next_url, timeout=self.timeout)
+                resp.raise_for_status()
+                more, next_url, more_count = self.parse_results(resp)
+                companies.extend(more)
+                raw_count += more_count
+                page += 1
+            seen = set()
+            return SearchResult([c for c in companies if not (c['nipt'] in seen or seen.add(c['nipt']))],
+                                raw_count=raw_count, truncated=bool(next_url))
+        except Exception as e:
+            _logger.error(f"HTTP search error: {e}")
+            self._form = None  # reload cookies/CSRF on the next search
+            return None
+
+    def get_detail(self, nipt):
+        """Same contract as get_detail_from_modal(): (activity, address), the
+        activity '' if the company has none and None on error."""
+        try:
+            resp = self._submit({FIELD_NIPT: nipt})
+            soup = BeautifulSoup(resp.text, 'html.parser')
+            modal = soup.find(id='detailModal')
+            if modal and 'Objekti i aktivitetit' in modal.get_text():
+                return extract_detail(modal.get_text('\n', strip=True))
+            btn = soup.select_one('.btn-info-local')
+            if not btn:
+                return '', ''
+            url = btn.get('data-url') or btn.get('data-href') or btn.get('href')
+            if not url or url.startswith(('#', 'javascript')):
+                # Detail is only reachable through page JS - let the caller use Chrome
+                return None, ''
+            detail = self.session.get(urljoin(resp.url, url), timeout=self.timeout)
+            detail.raise_for_status()
+            if 'json' in detail.headers.get('Content-Type', ''):
+                data = detail.json()
+                return ((data.get('objektiIAktivitetit') or data.get('activity_description') or '').strip(),
+                        (data.get('adresa') or data.get('address') or '').strip())
+            return extract_detail(BeautifulSoup(detail.text, 'html.parser').get_text('\n', strip=True))
+        except Exception as e:
+            _logger.error(f"HTTP detail error for {nipt}: {e}")
+            self._form = None
+            return None, ''
+
+
+if __name__ == '__main__':
+    import argparse
+    import json
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description='Run one QKB activity search over HTTP.')
+    parser.add_argument('keyword')
+    parser.add_argument('--url', default='https://format.qkb.gov.al/kerko-per-subjekt/')
+    parser.add_argument('--legal-form', default='')
+    parser.add_argument('--from', dest='date_from', default='2000-1', help='YYYY-M')
+    parser.add_argument('--to', dest='date_to', default='2026-12', help='YYYY-M')
+    parser.add_argument('--detail', action='store_true', help='also fetch activity and address for the first hit')
+    args = parser.parse_args()
+
+    def ym(value):
+        y, m = re.match(r'(\d{4})-(\d{1,2})$', value).groups()
+        return int(y), int(m)
+
+    client = QkbHttpClient(args.url)
+    results = client.search(args.keyword, args.legal_form, ym(args.date_from), ym(args.date_to))
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+    if args.detail and results:
+        print(client.get_detail(results[0]['nipt']))
+    client.close()
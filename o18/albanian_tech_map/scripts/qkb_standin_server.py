@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Offline stand-in for the QKB "Kerko per subjekt" page, served from fixtures.
+
+Mimics what the scrapers rely on: the search form (same field ids, a hidden
+CSRF token, POST submit), result cards in `ul.list li .card.responsive-card-text`,
+server-side pagination (10 per page, capped like QKB) and a detail page behind
+the `.btn-info-local` button with the "Objekti i aktivitetit" and "Adresa"
+sections.
+
+Usage:
+    python3 qkb_standin_server.py --port 8765
+    QKB_SEARCH_URL=http://127.0.0.1:8765/kerko-per-subjekt/ SCRAPER_BACKEND=http \\
+        python3 run_scraper_docker.py
+"""
+
+import argparse
+import html
+import json
+import os
+import secrets
+from datetime import date
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs, urlencode
+
+FIXTURE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'qkb_companies.json')
+SEARCH_PATH = '/kerko-per-subjekt/'
+DETAIL_PATH = '/kerko-per-subjekt/detaje/'
+PAGE_SIZE = 10
+
+# Value submitted by the legal form <select> -> label shown on the cards
+LEGAL_FORMS = {
+    'Shoqeri me pergjegjesi te kufizuar': 'SHPK',
+    'Shoqeri aksionare': 'SHA',
+    'Dege e Shoqerise se huaj': 'Dege/Zyre',
+}
+
+FORM_PAGE = """<!DOCTYPE html>
+<html><head><title>Kërko Për Subjekt</title></head><body>
+<form method="post" action="{action}">
+  <input type="hidden" name="csrf_token" value="{token}"/>
+  <input type="text" id="nipt" name="nipt"/>
+  <input type="text" id="dataNga" name="dataNga"/>
+  <input type="text" id="dataNe" name="dataNe"/>
+  <div data-bs-target="#locationCollapse" aria-expanded="true">Vendndodhja</div>
+  <select id="qarku" name="qarku"><option value=""></option><option value="tirane">Tiranë</option></select>
+  <select id="formeLigjore" name="formeLigjore"><option value=""></option>{legal_options}</select>
+  <div data-bs-target="#sectorCollapse" aria-expanded="true">Sektori</div>
+  <input type="text" id="sektoriIVeprimtarise" name="sektoriIVeprimtarise"/>
+  <button type="submit">Kërko</button>
+</form>
+{results}
+</body></html>
+"""
+
+CARD = """<li><div class="card responsive-card-text">
+  <span class="emriISubjektit">{name}</span>
+  <span class="nipti">{nipt}</span>
+  <span class="qyteti">{city}</span>
+  <span class="formaLigjore">{legal_form}</span>
+  <span class="dataERegjistrimit">{registration_date}</span>
+  <button class="btn-info-local" data-url="{detail_url}">Info</button>
+</div></li>"""
+
+DETAIL_PAGE = """<!DOCTYPE html>
+<html><body><div id="detailModal">
+<h5>{name}</h5>
+<p>NIPT</p>
+<p>{nipt}</p>
+<p>Objekti i aktivitetit</p>
+<p>{activity}</p>
+<p>Adresa</p>
+<p>{address}</p>
+<p>Administrator/ Ortak/ Aksionar</p>
+<p>-</p>
+</div></body></html>
+"""
+
+
+def parse_date(value):
+    """dd/mm/yyyy -> date, None if empty or malformed."""
+    try:
+        d, m, y = (int(p) for p in value.split('/'))
+        return date(y, m, d)
+    except (ValueError, AttributeError):
+        return None
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    companies = []
+    cap = 50
+    token = secrets.token_hex(8)
+
+    def log_message(self, fmt, *args):
+        if self.server.verbose:
+            super().log_message(fmt, *args)
+
+    def _send(self, body, status=200, content_type='text/html; charset=utf-8'):
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _form_page(self, results=''):
+        options = ''.join(f'<option value="{v}">{v}</option>' for v in LEGAL_FORMS)
+        return FORM_PAGE.format(action=SEARCH_PATH, token=self.token,
+                                legal_options=options, results=results)
+
+    def _search(self, params):
+        nipt = params.get('nipt', '').strip().upper()
+        keyword = params.get('sektoriIVeprimtarise', '').strip().lower()
+        legal_form = LEGAL_FORMS.get(params.get('formeLigjore', ''))
+        qarku = params.get('qarku', '')
+        d1, d2 = parse_date(params.get('dataNga')), parse_date(params.get('dataNe'))
+        hits = []
+        for c in self.companies:
+            reg = parse_date(c['registration_date'])
+            if nipt and c['nipt'] != nipt:
+                continue
+            if keyword and keyword not in c['activity'].lower():
+                continue
+            if legal_form and c['legal_form'] != legal_form:
+                continue
+            if qarku and c['city'] != qarku:
+                continue
+            if (d1 and reg and reg < d1) or (d2 and reg and reg > d2):
+                continue
+            hits.append(c)
+        return hits[:self.cap]
+
+    def _results(self, params):
+        try:
+            page = max(1, int(params.get('page', '1')))
+        except ValueError:
+            page = 1
+        hits = self._search(params)
+        pages = max(1, -(-len(hits) // PAGE_SIZE))
+        cards = ''.join(CARD.format(detail_url=DETAIL_PATH + html.escape(c['nipt']),
+                                    **{k: html.escape(v) for k, v in c.items()})
+                        for c in hits[(page - 1) * PAGE_SIZE:page * PAGE_SIZE])
+        query = {k: v for k, v in params.items() if k not in ('page', 'csrf_token')}
+        links = ''.join(
+            f'<li class="{"active" if n == page else ""}">'
+            f'<a href="{SEARCH_PATH}?{html.escape(urlencode(dict(query, page=n)))}">{n}</a></li>'
+            for n in range(1, pages + 1))
+        return f'<ul class="list">{cards}</ul><ul class="pagination">{links}</ul>'
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        if url.path.startswith(DETAIL_PATH):
+            nipt = url.path[len(DETAIL_PATH):]
+            company = next((c for c in self.companies if c['nipt'] == nipt), None)
+            if not company:
+                return self._send('Not found', status=404, content_type='text/plain')
+            values = dict({'address': '-'}, **company)
+            return self._send(DETAIL_PAGE.format(**{k: html.escape(v) for k, v in values.items()}))
+        if url.path == SEARCH_PATH:
+            # Pagination links carry the search in the query string
+            return self._send(self._form_page(self._results(params) if 'page' in params else ''))
+        self._send('Not found', status=404, content_type='text/plain')
+
+    def do_POST(self):
+        if urlparse(self.path).path != SEARCH_PATH:
+            return self._send('Not found', status=404, content_type='text/plain')
+        length = int(self.headers.get('Content-Length') or 0)
+        params = {k: v[0] for k, v in parse_qs(self.rfile.read(length).decode('utf-8')).items()}
+        if params.get('csrf_token') != self.token:
+            return self._send('CSRF token missing', status=403, content_type='text/plain')
+        self._send(self._form_page(self._results(params)))
+
+
+def make_server(host='127.0.0.1', port=8765, fixture=FIXTURE_PATH, cap=50, verbose=False):
+    with open(fixture, encoding='utf-8') as f:
+        StandinHandler.companies = json.load(f)
+    StandinHandler.cap = cap
+    server = HTTPServer((host, port), StandinHandler)
+    server.verbose = verbose
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve a fixture-based stand-in for the QKB search page.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--fixture', default=FIXTURE_PATH)
+    parser.add_argument('--cap', type=int, default=50, help='max results per search, like QKB')
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.fixture, args.cap, args.verbose)
+    print(f"QKB stand-in serving {len(StandinHandler.companies)} companies on "
+          f"http://{args.host}:{args.port}{SEARCH_PATH}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
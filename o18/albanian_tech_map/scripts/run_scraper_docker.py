@@ -5,7 +5,16 @@ with IT keywords. Every result is a tech company by definition.
 
 Then clicks info modal for each result to get the full activity description.
 
+Searches can run on a pool of sessions (SCRAPER_WORKERS), each taking
+(keyword, legal_form, date_range) cells from a shared queue. A global rate cap
+(SCRAPER_MAX_RATE searches/minute) is shared by all workers.
+
+SCRAPER_BACKEND selects how QKB is queried: 'http' replays the form submission
+with a plain HTTP session (scripts/qkb_http.py), 'chrome' drives headless
+Chrome, 'auto' (default) probes HTTP first and falls back to Chrome.
+
 Usage: docker exec -d o17-odoo-1 python3 /mnt/custom-addons/albanian_tech_map/scripts/run_scraper_docker.py
+       docker exec -d -e SCRAPER_WORKERS=4 o17-odoo-1 python3 .../run_scraper_docker.py
 """
 
 # CRITICAL: Fix inherited resource limits from Odoo process.
@@ -34,11 +43,12 @@ sys.stdout = os.fdopen(sys.stdout.fileno(), 'w', buffering=1)
 sys.stderr = os.fdopen(sys.stderr.fileno(), 'w', buffering=1)
 
 import time
-import random
 import logging
-from datetime import datetime
+import queue
+import threading
+from datetime import datetime, timedelta
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s', force=True)
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(threadName)s - %(message)s', force=True)
 for handler in logging.root.handlers:
     handler.flush = lambda h=handler: (h.stream.flush() if hasattr(h, 'stream') else None)
 _logger = logging.getLogger(__name__)
@@ -47,9 +57,20 @@ from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import Select
+from selenium.webdriver.support.ui import Select, WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
 
 import psycopg2
+from psycopg2.extras import execute_values
+
+from qkb_http import QkbHttpClient, extract_detail
+from throttle import Throttle, merge_stats, format_stats, OK, EMPTY, TIMEOUT
+from search_planner import (SearchResult, cell_key, root_cells, months_before, children,
+                            pending_cells, is_saturated, redundant_keywords)
+from geocoder import geocode_companies
+from classifier import classify_companies
+from snapshot_version import bump_snapshot_version
 
 # =============================================================================
 # CONFIG
@@ -109,7 +130,54 @@ def detect_db_name():
 
 DB_NAME = detect_db_name()
 
-QKB_SEARCH_URL = "https://format.qkb.gov.al/kerko-per-subjekt/"
+QKB_SEARCH_URL = os.environ.get('QKB_SEARCH_URL', "https://format.qkb.gov.al/kerko-per-subjekt/")
+
+# Search backend: auto | http | chrome
+SCRAPER_BACKEND = os.environ.get('SCRAPER_BACKEND', 'auto').lower()
+
+# Worker pool: number of parallel Chrome sessions taking cells from the queue
+SCRAPER_WORKERS = max(1, int(os.environ.get('SCRAPER_WORKERS', '1')))
+# Global cap shared by all workers, in searches started per minute (0 = no cap)
+SCRAPER_MAX_RATE = float(os.environ.get('SCRAPER_MAX_RATE', '30'))
+# Enrichment stage: sessions fetching activity descriptions from the queue
+# table while the search is still running
+SCRAPER_ENRICH_WORKERS = max(1, int(os.environ.get('SCRAPER_ENRICH_WORKERS', '1')))
+# A queued NIPT is given up after this many failed detail lookups
+ENRICH_MAX_ATTEMPTS = 3
+# Adaptive per-session pacing between two requests (seconds): starts at
+# THROTTLE_START_DELAY, shrinks towards SCRAPER_MIN_DELAY while QKB answers
+# healthily, backs off exponentially up to THROTTLE_MAX_DELAY
+SCRAPER_MIN_DELAY = float(os.environ.get('SCRAPER_MIN_DELAY', '1'))
+THROTTLE_START_DELAY = 4.0
+THROTTLE_MAX_DELAY = 120.0
+# Max time to wait for a DOM/network readiness condition (seconds)
+READY_TIMEOUT = 15
+# An empty result is assumed once the network has been quiet this long (seconds)
+NETWORK_QUIET = 2.0
+# Chrome session recycling: a browser is replaced after this many page loads,
+# or when Chrome + chromedriver RSS exceeds SCRAPER_RECYCLE_RSS_MB (checked
+# every RSS_CHECK_EVERY loads). Sessions are health-checked before each load.
+SCRAPER_RECYCLE_LOADS = int(os.environ.get('SCRAPER_RECYCLE_LOADS', '300'))
+SCRAPER_RECYCLE_RSS_MB = float(os.environ.get('SCRAPER_RECYCLE_RSS_MB', '1500'))
+RSS_CHECK_EVERY = 10
+HEALTH_CHECK_TIMEOUT = 5
+# Sub-resources Chrome does not fetch (comma-separated: images, fonts, css)
+SCRAPER_BLOCK_ASSETS = [a.strip() for a in os.environ.get('SCRAPER_BLOCK_ASSETS', 'images,fonts,css').split(',') if a.strip()]
+BLOCKED_URL_PATTERNS = {
+    'images': ['*.png', '*.jpg', '*.jpeg', '*.gif', '*.svg', '*.webp', '*.ico'],
+    'fonts': ['*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot'],
+    'css': ['*.css'],
+}
+# Resume the last unfinished run from its checkpoints (set to 0 to force a fresh run)
+SCRAPER_RESUME = os.environ.get('SCRAPER_RESUME', '1') != '0'
+# Buffered DB writes: flush (and commit) after this many rows or seconds
+SCRAPER_FLUSH_ROWS = int(os.environ.get('SCRAPER_FLUSH_ROWS', '200'))
+SCRAPER_FLUSH_SECONDS = float(os.environ.get('SCRAPER_FLUSH_SECONDS', '30'))
+# Geocode companies still at (0, 0) after the scrape (scripts/geocoder.py)
+SCRAPER_GEOCODE = os.environ.get('SCRAPER_GEOCODE', '1') != '0'
+# Categorise and verify is_tech on new/changed activity descriptions after the
+# scrape (scripts/classifier.py)
+SCRAPER_CLASSIFY = os.environ.get('SCRAPER_CLASSIFY', '1') != '0'
 
 # IT-specific keywords to search in the ACTIVITY field only.
 # QKB searches "Objekti i aktivitetit" - so every result already has the keyword.
@@ -135,21 +203,31 @@ LEGAL_FORMS = [
     'Dege e Shoqerise se huaj',
 ]
 
-DATE_RANGES = [
-    (2026, 1, 2026, 12),
-    (2025, 10, 2025, 12), (2025, 7, 2025, 9), (2025, 4, 2025, 6), (2025, 1, 2025, 3),
-    (2024, 10, 2024, 12), (2024, 7, 2024, 9), (2024, 4, 2024, 6), (2024, 1, 2024, 3),
-    (2023, 10, 2023, 12), (2023, 7, 2023, 9), (2023, 4, 2023, 6), (2023, 1, 2023, 3),
-    (2022, 10, 2022, 12), (2022, 7, 2022, 9), (2022, 4, 2022, 6), (2022, 1, 2022, 3),
-    (2021, 10, 2021, 12), (2021, 7, 2021, 9), (2021, 4, 2021, 6), (2021, 1, 2021, 3),
-    (2020, 10, 2020, 12), (2020, 7, 2020, 9), (2020, 4, 2020, 6), (2020, 1, 2020, 3),
-    (2019, 10, 2019, 12), (2019, 7, 2019, 9), (2019, 4, 2019, 6), (2019, 1, 2019, 3),
-    (2018, 7, 2018, 12), (2018, 1, 2018, 6),
-    (2017, 7, 2017, 12), (2017, 1, 2017, 6),
-    (2016, 1, 2016, 12), (2015, 1, 2015, 12),
-    (2013, 1, 2014, 12), (2010, 1, 2012, 12),
-    (2000, 1, 2009, 12),
-]
+# Whole registration date span searched. The planner starts with one coarse
+# cell per keyword and only splits (by legal form, then by halving the date
+# range) cells whose results hit QKB's ceiling - see search_planner.py.
+SEARCH_SPAN = (2000, 1, datetime.now().year, 12)
+# Run mode: 'delta' searches each keyword only from its registration-date
+# high-water mark on, 'full' sweeps the whole SEARCH_SPAN, 'auto' runs a full
+# sweep when the last finished one is older than SCRAPER_FULL_SWEEP_DAYS and
+# delta otherwise. Delta cells start DELTA_OVERLAP_MONTHS before the mark to
+# catch registrations entered late.
+SCRAPER_MODE = os.environ.get('SCRAPER_MODE', 'auto').lower()
+SCRAPER_FULL_SWEEP_DAYS = float(os.environ.get('SCRAPER_FULL_SWEEP_DAYS', '30'))
+DELTA_OVERLAP_MONTHS = 1
+# QKB returns at most this many rows per search; a result this large may be truncated
+QKB_RESULT_CAP = int(os.environ.get('QKB_RESULT_CAP', '50'))
+# Result pages read per search before the cell counts as truncated
+MAX_PAGES = 10
+
+# Keyword pruning from past full sweeps: keywords that found no NIPT the other
+# keywords didn't also find, over their last SCRAPER_KEYWORD_HISTORY finished
+# sweeps, are skipped ('skip'), searched last ('demote') or kept ('off').
+# Every KEYWORD_REPROBE_EVERY-th sweep searches all keywords again. Delta
+# runs always search all keywords.
+SCRAPER_KEYWORD_PRUNE = os.environ.get('SCRAPER_KEYWORD_PRUNE', 'skip').lower()
+SCRAPER_KEYWORD_HISTORY = int(os.environ.get('SCRAPER_KEYWORD_HISTORY', '3'))
+KEYWORD_REPROBE_EVERY = 5
 
 CITY_MAP = {
     'tirane': 'tirane', 'tirana': 'tirane',
@@ -166,12 +244,14 @@ CITY_MAP = {
 # =============================================================================
 # CHROME DRIVER
 # =============================================================================
-def start_driver():
+def start_driver(block=SCRAPER_BLOCK_ASSETS):
     # MINIMAL config - same as working test script
     opts = Options()
     opts.add_argument("--headless")
     opts.add_argument("--no-sandbox")
     opts.add_argument("--disable-dev-shm-usage")
+    if 'images' in block:
+        opts.add_experimental_option('prefs', {'profile.managed_default_content_settings.images': 2})
 
     import shutil
     chromedriver = shutil.which('chromedriver') or '/usr/local/bin/chromedriver'
@@ -180,16 +260,97 @@ def start_driver():
 
     # Set page load timeout (15 seconds - same as working test)
     driver.set_page_load_timeout(15)
+    driver.set_script_timeout(HEALTH_CHECK_TIMEOUT)
+
+    # Fonts/CSS have no content setting - block them (and images) at the network layer
+    patterns = [p for kind in block for p in BLOCKED_URL_PATTERNS.get(kind, [])]
+    if patterns:
+        try:
+            driver.execute_cdp_cmd('Network.enable', {})
+            driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': patterns})
+        except Exception as e:
+            _logger.warning(f"Could not block {', '.join(block)}: {e}")
 
-    _logger.info(f"[OK] Chrome started (minimal config, 15s timeout)")
+    _logger.info(f"[OK] Chrome started (minimal config, 15s timeout, blocking: {', '.join(block) or 'nothing'})")
     return driver
 
 
+def chrome_rss_mb(driver):
+    """Resident memory of chromedriver and every process below it (Chrome,
+    renderers), in MB. None where /proc is not available."""
+    try:
+        root = driver.service.process.pid
+        children = {}
+        for entry in os.listdir('/proc'):
+            if entry.isdigit():
+                try:
+                    with open(f'/proc/{entry}/stat') as f:
+                        # comm may contain spaces; ppid is the 2nd field after ')'
+                        ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+                except (OSError, IndexError, ValueError):
+                    continue
+                children.setdefault(ppid, []).append(int(entry))
+        total_kb = 0
+        stack = [root]
+        while stack:
+            pid = stack.pop()
+            stack.extend(children.get(pid, []))
+            try:
+                with open(f'/proc/{pid}/status') as f:
+                    for line in f:
+                        if line.startswith('VmRSS:'):
+                            total_kb += int(line.split()[1])
+                            break
+            except OSError:
+                pass
+        return total_kb / 1024
+    except Exception:
+        return None
+
+
+# =============================================================================
+# READINESS CONDITIONS - explicit waits instead of fixed sleeps
+# =============================================================================
+RESULT_CARDS = 'ul.list li .card.responsive-card-text'
+
+
+def wait_for(driver, condition, throttle=None, timeout=READY_TIMEOUT):
+    """WebDriverWait on condition, accounted as a readiness wait. None on timeout."""
+    if throttle is None:
+        throttle = Throttle()
+    with throttle.track('wait'):
+        try:
+            return WebDriverWait(driver, timeout, poll_frequency=0.25).until(condition)
+        except TimeoutException:
+            return None
+
+
+def content_or_quiet(selector, quiet=NETWORK_QUIET):
+    """Condition: `selector` is rendered ('found'), or the page finished loading
+    and fetched no new resources for `quiet` seconds ('empty')."""
+    state = {'count': None, 'since': time.monotonic()}
+
+    def condition(driver):
+        if driver.find_elements(By.CSS_SELECTOR, selector):
+            return 'found'
+        count = driver.execute_script(
+            "return document.readyState === 'complete' ? performance.getEntriesByType('resource').length : -1")
+        now = time.monotonic()
+        if count != state['count']:
+            state['count'], state['since'] = count, now
+            return False
+        return 'empty' if count >= 0 and now - state['since'] >= quiet else False
+    return condition
+
+
 # =============================================================================
 # QKB ACTIVITY SEARCH - returns companies whose activity matches keyword
 # =============================================================================
-def search_qkb_activity(driver, keyword, legal_form='', date_from=None, date_to=None):
-    """Search QKB by activity field. Returns list of {nipt, name, city, legal_form, registration_date}."""
+def search_qkb_activity(driver, keyword, legal_form='', date_from=None, date_to=None, throttle=None):
+    """Search QKB by activity field. Returns list of {nipt, name, city, legal_form, registration_date}.
+
+    Returns None (not []) when the search itself failed, so the cell is retried.
+    """
     try:
         _logger.info(f"[DEBUG] About to load page for keyword='{keyword}', legal_form='{legal_form}'")
         try:
@@ -198,10 +359,16 @@ def search_qkb_activity(driver, keyword, legal_form='', date_from=None, date_to=
             _logger.info(f"[DEBUG] Page loaded successfully!")
         except Exception as e:
             _logger.warning(f"Page load timeout or error: {e}")
-            return []  # Skip this search if page won't load
+            return None  # Skip this search if page won't load (not checkpointed)
 
-        # Longer random delay to avoid bot detection (5-8 seconds)
-        time.sleep(random.uniform(5, 8))
+        # Form is usable once the activity input exists and flatpickr is attached
+        ready = wait_for(driver, lambda d: d.execute_script("""
+            var d1 = document.querySelector('#dataNga');
+            return !!document.querySelector('#sektoriIVeprimtarise') && (!d1 || !!d1._flatpickr);
+        """), throttle)
+        if not ready:
+            _logger.warning("Search form not ready - skipping search")
+            return None
 
         # Set date range
         if date_from and date_to:
@@ -209,7 +376,7 @@ def search_qkb_activity(driver, keyword, legal_form='', date_from=None, date_to=
                 var d1 = document.querySelector('#dataNga');
                 var d2 = document.querySelector('#dataNe');
                 if (d1 && d1._flatpickr) d1._flatpickr.setDate(new Date({date_from[0]}, {date_from[1]-1}, 1), true);
-                if (d2 && d2._flatpickr) d2._flatpickr.setDate(new Date({date_to[0]}, {date_to[1]-1}, 28), true);
+                if (d2 && d2._flatpickr) d2._flatpickr.setDate(new Date({date_to[0]}, {date_to[1]}, 0), true);
             """)
 
         # Set qarku to Tirane
@@ -217,10 +384,9 @@ def search_qkb_activity(driver, keyword, legal_form='', date_from=None, date_to=
             loc = driver.find_element(By.CSS_SELECTOR, 'div[data-bs-target="#locationCollapse"]')
             if loc.get_attribute('aria-expanded') != 'true':
                 driver.execute_script("arguments[0].scrollIntoView(true);", loc)
-                time.sleep(random.uniform(1, 2))  # Random delay 1-2 seconds
                 loc.click()
-                time.sleep(random.uniform(2, 3))  # Random delay 2-3 seconds
-            Select(driver.find_element(By.CSS_SELECTOR, 'select#qarku')).select_by_value('tirane')
+            qarku = wait_for(driver, EC.element_to_be_clickable((By.CSS_SELECTOR, 'select#qarku')), throttle)
+            Select(qarku or driver.find_element(By.CSS_SELECTOR, 'select#qarku')).select_by_value('tirane')
         except Exception as e:
             _logger.warning(f"qarku: {e}")
 
@@ -237,23 +403,18 @@ def search_qkb_activity(driver, keyword, legal_form='', date_from=None, date_to=
             var btn = document.querySelector('div[data-bs-target="#sectorCollapse"]');
             if (btn && btn.getAttribute('aria-expanded') !== 'true') btn.click();
         """)
-        time.sleep(1)
 
         _logger.info(f"[DEBUG] Looking for activity input field...")
         inp = None
         for s in ['#sektoriIVeprimtarise', 'input[name="sektoriIVeprimtarise"]']:
-            try:
-                el = driver.find_element(By.CSS_SELECTOR, s)
-                _logger.info(f"[DEBUG] Found element with selector '{s}', displayed={el.is_displayed()}")
-                if el.is_displayed():
-                    inp = el
-                    break
-            except Exception as ex:
-                _logger.info(f"[DEBUG] Selector '{s}' not found: {ex}")
-                continue
+            inp = wait_for(driver, EC.visibility_of_element_located((By.CSS_SELECTOR, s)), throttle,
+                           timeout=READY_TIMEOUT / 3)
+            _logger.info(f"[DEBUG] Selector '{s}' displayed={bool(inp)}")
+            if inp:
+                break
         if not inp:
             _logger.warning(f"[DEBUG] Activity input field NOT FOUND, skipping search")
-            return []
+            return None
 
         _logger.info(f"[DEBUG] Entering keyword '{keyword}'...")
         inp.clear()
@@ -262,14 +423,17 @@ def search_qkb_activity(driver, keyword, legal_form='', date_from=None, date_to=
         btn = driver.find_element(By.CSS_SELECTOR, 'button[type="submit"]')
         driver.execute_script("arguments[0].click();", btn)
         _logger.info(f"[DEBUG] Waiting for results...")
-        time.sleep(5)  # Increased wait time from 3 to 5 seconds
+        if not wait_for(driver, content_or_quiet(RESULT_CARDS), throttle):
+            _logger.warning("Results did not load in time")
+            return None
 
         # Collect results from all pages
-        companies = []
+        companies = SearchResult()
         page = 1
-        while page <= 10:
-            results = driver.find_elements(By.CSS_SELECTOR, 'ul.list li .card.responsive-card-text')
+        while True:
+            results = driver.find_elements(By.CSS_SELECTOR, RESULT_CARDS)
             _logger.info(f"[DEBUG] Found {len(results)} result cards on page {page}")
+            companies.raw_count += len(results)
             if not results:
                 # Try to debug why no results
                 html_snippet = driver.execute_script("return document.body.innerHTML.substring(0, 500)")
@@ -314,11 +478,16 @@ def search_qkb_activity(driver, keyword, legal_form='', date_from=None, date_to=
                         if link and link[0].text.strip() == str(page + 1):
                             nxt = link[0]
                             break
+                if nxt and page >= MAX_PAGES:
+                    # Pagination ceiling - the planner splits this cell
+                    companies.truncated = True
+                    break
                 if nxt:
                     driver.execute_script("arguments[0].scrollIntoView(true);", nxt)
-                    time.sleep(0.5)
                     nxt.click()
-                    time.sleep(3)
+                    # The old cards are replaced when the next page is rendered
+                    wait_for(driver, EC.staleness_of(results[0]), throttle)
+                    wait_for(driver, EC.presence_of_element_located((By.CSS_SELECTOR, RESULT_CARDS)), throttle)
                     page += 1
                 else:
                     break
@@ -328,52 +497,45 @@ def search_qkb_activity(driver, keyword, legal_form='', date_from=None, date_to=
         return companies
     except Exception as e:
         _logger.error(f"Search error: {e}")
-        return []
+        return None
 
 
 # =============================================================================
-# QKB DETAIL - get activity description from info modal
+# QKB DETAIL - get activity description and address from info modal
 # =============================================================================
-def get_activity_from_modal(driver, nipt):
-    """Search QKB by NIPT, click info button, return activity description text."""
+def get_detail_from_modal(driver, nipt, throttle=None):
+    """Search QKB by NIPT, click info button, return (activity, address):
+    activity '' if the company has none, None on error."""
     try:
         driver.get(QKB_SEARCH_URL)
-        time.sleep(2)
 
-        nipt_field = driver.find_element(By.ID, 'nipt')
+        nipt_field = wait_for(driver, EC.visibility_of_element_located((By.ID, 'nipt')), throttle)
+        if not nipt_field:
+            return None, ''
         nipt_field.clear()
         nipt_field.send_keys(nipt)
 
         btn = driver.find_element(By.CSS_SELECTOR, 'button[type="submit"]')
         driver.execute_script('arguments[0].click();', btn)
-        time.sleep(3)
+        if not wait_for(driver, content_or_quiet('.btn-info-local'), throttle):
+            return None, ''
 
         info_btns = driver.find_elements(By.CSS_SELECTOR, '.btn-info-local')
         if not info_btns:
-            return ''
+            return '', ''
 
         driver.execute_script('arguments[0].click();', info_btns[0])
-        time.sleep(4)
-
-        try:
-            modal = driver.find_element(By.ID, 'detailModal')
-            text = modal.text
-        except:
-            return ''
-
-        # Extract activity description
-        lines = text.split('\n')
-        for i, line in enumerate(lines):
-            if 'Objekti i aktivitetit' in line:
-                activity_lines = []
-                for j in range(i + 1, len(lines)):
-                    stripped = lines[j].strip()
-                    if stripped in ['Administrator/ Ortak/ Aksionar', 'Qyteti',
-                                    'Pronësia', 'Ekstrakt RPP', 'Ekstrakt i thjeshtë',
-                                    'Ekstrakt historik', '']:
-                        break
-                    activity_lines.append(stripped)
-                return ' '.join(activity_lines)
+        modal = wait_for(driver, EC.visibility_of_element_located((By.ID, 'detailModal')), throttle)
+        if not modal:
+            return '', ''
+        # Modal body is filled after it opens
+        wait_for(driver, lambda d: 'Objekti i aktivitetit' in modal.text, throttle, timeout=READY_TIMEOUT / 3)
+        text = modal.text
+
+        # Extract activity description and address
+        activity, address = extract_detail(text)
+        if activity:
+            return activity, address
 
         # Close modal
         try:
@@ -382,10 +544,262 @@ def get_activity_from_modal(driver, nipt):
         except:
             pass
 
-        return ''
+        return '', address
     except Exception as e:
         _logger.error(f"Modal error for {nipt}: {e}")
-        return ''
+        return None, ''
+
+
+# =============================================================================
+# BACKENDS - Chrome (Selenium) or direct HTTP, same interface
+# =============================================================================
+class ChromeBackend:
+    """Selenium backend: one managed Chrome session.
+
+    Before every page load the session is health-checked and recycled when it
+    has served max_loads loads, grown past max_rss_mb, stopped answering or
+    crashed. Callers just see the next search run on a fresh browser.
+    """
+
+    name = 'chrome'
+
+    def __init__(self, throttle=None, max_loads=SCRAPER_RECYCLE_LOADS, max_rss_mb=SCRAPER_RECYCLE_RSS_MB):
+        self.throttle = throttle
+        self.max_loads = max_loads
+        self.max_rss_mb = max_rss_mb
+        self.driver = None
+        self.loads = 0
+        self.recycled = 0
+        self._start()
+
+    def _start(self):
+        self.driver = start_driver()
+        self.loads = 0
+
+    def _quit(self):
+        driver, self.driver = self.driver, None
+        if driver:
+            try:
+                driver.quit()
+            except Exception:
+                # A hung browser may not answer quit - make sure it goes away
+                try:
+                    driver.service.stop()
+                except Exception:
+                    pass
+
+    def healthy(self):
+        """The browser still answers a trivial script within HEALTH_CHECK_TIMEOUT."""
+        try:
+            return self.driver.execute_script('return 1') == 1
+        except Exception:
+            return False
+
+    def _session(self):
+        """Return a usable driver for the next page load, recycling the current one if needed."""
+        reason = None
+        if self.driver is None:
+            reason = 'no session'
+        elif not self.healthy():
+            reason = 'unresponsive or crashed'
+        elif self.max_loads and self.loads >= self.max_loads:
+            reason = f'{self.loads} page loads'
+        elif self.max_rss_mb and self.loads and self.loads % RSS_CHECK_EVERY == 0:
+            rss = chrome_rss_mb(self.driver)
+            if rss and rss > self.max_rss_mb:
+                reason = f'RSS {rss:.0f} MB'
+        if reason:
+            if self.driver is not None:
+                _logger.info(f"Recycling Chrome session: {reason}")
+                self.recycled += 1
+            self._quit()
+            self._start()
+        self.loads += 1
+        return self.driver
+
+    def _run(self, func, *args):
+        try:
+            driver = self._session()
+        except Exception as e:
+            _logger.error(f"Could not start Chrome: {e}")
+            self._quit()
+            return None  # retried by the caller; the next call starts a new browser
+        return func(driver, *args, self.throttle)
+
+    def search(self, keyword, legal_form='', date_from=None, date_to=None):
+        return self._run(search_qkb_activity, keyword, legal_form, date_from, date_to)
+
+    def get_detail(self, nipt):
+        return self._run(get_detail_from_modal, nipt) or (None, '')
+
+    def close(self):
+        if self.recycled:
+            _logger.info(f"Chrome session recycled {self.recycled} times")
+        self._quit()
+
+
+def open_backend(kind, throttle=None):
+    if kind == 'http':
+        return QkbHttpClient(QKB_SEARCH_URL, city_map=CITY_MAP)
+    return ChromeBackend(throttle)
+
+
+def new_throttle():
+    return Throttle(min_delay=SCRAPER_MIN_DELAY, max_delay=THROTTLE_MAX_DELAY,
+                    initial=max(SCRAPER_MIN_DELAY, THROTTLE_START_DELAY))
+
+
+def resolve_backends(backend=SCRAPER_BACKEND):
+    """Return (search backend, enrichment backend) names.
+
+    In 'auto' mode one real search and one detail lookup are replayed over
+    HTTP; whatever does not work there falls back to Chrome.
+    """
+    if backend in ('http', 'chrome'):
+        return backend, backend
+    try:
+        client = open_backend('http')
+    except ImportError as e:
+        _logger.warning(f"HTTP backend unavailable ({e}) - falling back to Chrome")
+        return 'chrome', 'chrome'
+    try:
+        probe = client.search('software', '', SEARCH_SPAN[:2], SEARCH_SPAN[2:])
+        if not probe:
+            _logger.warning("HTTP backend probe returned no results - falling back to Chrome")
+            return 'chrome', 'chrome'
+        activity, _address = client.get_detail(probe[0]['nipt'])
+        if not activity:
+            _logger.warning("HTTP backend cannot open the detail modal - enrichment uses Chrome")
+            return 'http', 'chrome'
+        return 'http', 'http'
+    finally:
+        client.close()
+
+
+# =============================================================================
+# WORKER POOLS - search and enrichment sessions feeding one results queue
+# =============================================================================
+class RateLimiter:
+    """Global cap on search starts, shared by all workers (thread-safe)."""
+
+    def __init__(self, per_minute):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def acquire(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+def search_worker(worker_id, backend, cells, results, limiter, stop, throttle):
+    """Take cells from the queue until stopped; push ('search', cell, companies) to results.
+
+    The queue can be momentarily empty while the planner still has cells in
+    flight, so workers run until the main thread sets `stop`. Each worker owns
+    its backend session and its own adaptive throttle. ('exit', 'search', None)
+    in results signals the worker has exited.
+    """
+    session = None
+    try:
+        # Stagger start-up so N sessions don't hit QKB at the same instant
+        with throttle.track('sleep'):
+            time.sleep(worker_id * throttle.delay)
+        session = open_backend(backend, throttle)
+        while not stop.is_set():
+            try:
+                cell = cells.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            keyword, legal_form, (y1, m1, y2, m2) = cell
+            with throttle.track('sleep'):
+                limiter.acquire()
+            with throttle.track('busy'):
+                companies = session.search(keyword, legal_form, (y1, m1), (y2, m2))
+            throttle.record_result(companies)
+            results.put(('search', cell, companies))
+            throttle.pace()
+    except Exception as e:
+        _logger.error(f"Search worker {worker_id} error: {e}")
+    finally:
+        if session:
+            try:
+                session.close()
+            except Exception:
+                pass
+        results.put(('exit', 'search', None))
+
+
+def enrich_worker(worker_id, backend, nipts, results, stop, throttle):
+    """Take NIPTs from the queue until stopped; push ('enrich', nipt, (activity, address)) to results.
+
+    activity follows get_detail(): the text, '' if the company has none,
+    None on error. ('exit', 'enrich', None) signals the worker has exited.
+    """
+    session = None
+    try:
+        with throttle.track('sleep'):
+            time.sleep(worker_id * throttle.delay)
+        session = open_backend(backend, throttle)
+        while not stop.is_set():
+            try:
+                nipt = nipts.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            with throttle.track('busy'):
+                try:
+                    activity, address = session.get_detail(nipt)
+                except Exception as e:
+                    _logger.error(f"Enrich error {nipt}: {e}")
+                    activity, address = None, ''
+            throttle.record(TIMEOUT if activity is None else OK if activity else EMPTY)
+            results.put(('enrich', nipt, (activity, address)))
+            throttle.pace()
+    except Exception as e:
+        _logger.error(f"Enrich worker {worker_id} error: {e}")
+    finally:
+        if session:
+            try:
+                session.close()
+            except Exception:
+                pass
+        results.put(('exit', 'enrich', None))
+
+
+def start_pool(name, target, backend, workers, results, *args):
+    """Start `workers` threads of `target`. Returns (task queue, stop event, threads, throttles)."""
+    tasks = queue.Queue()
+    stop = threading.Event()
+    threads = []
+    throttles = []
+    for i in range(workers):
+        throttle = new_throttle()
+        t = threading.Thread(target=target, name=f'{name}-{i + 1}',
+                             args=(i, backend, tasks, results) + args + (stop, throttle), daemon=True)
+        t.start()
+        threads.append(t)
+        throttles.append(throttle)
+    return tasks, stop, threads, throttles
+
+
+def start_search_pool(backend, results, workers=SCRAPER_WORKERS, max_rate=SCRAPER_MAX_RATE):
+    """Start the search workers. Returns (cells queue, stop event, threads, throttles)."""
+    pool = start_pool('search', search_worker, backend, workers, results, RateLimiter(max_rate))
+    _logger.info(f"Search pool started: {workers} {backend} sessions, global cap {max_rate or 'none'} searches/min")
+    return pool
+
+
+def start_enrich_pool(backend, results, workers=SCRAPER_ENRICH_WORKERS):
+    """Start the enrichment workers. Returns (NIPT queue, stop event, threads, throttles)."""
+    pool = start_pool('enrich', enrich_worker, backend, workers, results)
+    _logger.info(f"Enrichment pool started: {workers} {backend} sessions")
+    return pool
 
 
 # =============================================================================
@@ -399,6 +813,8 @@ def ensure_columns(cur):
     for col, coltype, default in [
         ('activity_description', 'TEXT', "''"),
         ('is_tech', 'BOOLEAN', 'false'),
+        ('tech_keywords', 'VARCHAR', 'NULL'),
+        ('tech_source', 'VARCHAR', 'NULL'),
     ]:
         cur.execute(f"""
             DO $$
@@ -410,47 +826,382 @@ def ensure_columns(cur):
         """)
 
 
-def upsert_company(cur, data):
-    nipt = data['nipt']
-    cur.execute("SELECT id FROM tech_company WHERE nipt = %s", (nipt,))
-    existing = cur.fetchone()
+def upsert_companies(cur, rows):
+    """Multi-row INSERT ... ON CONFLICT (nipt) DO UPDATE. Returns (created, updated).
+
+    Existing rows keep their non-empty values and are re-stamped; rows the
+    classifier has verified (tech_keywords set) keep its is_tech verdict,
+    since a QKB hit may be a substring match, and so do rows a curator set
+    by hand (tech_source = 'manual'). `xmax = 0` tells freshly
+    inserted rows apart.
+    """
+    if not rows:
+        return 0, 0
     now = datetime.utcnow()
+    values = [(
+        data['name'], data['nipt'],
+        data.get('city', 'tirane'),
+        data.get('legal_form', ''),
+        data.get('registration_date', ''),
+        data.get('activity_description', ''),
+        now, now, now,
+    ) for data in rows]
+    inserted = execute_values(cur, """
+        INSERT INTO tech_company AS t (name, nipt, city, legal_form, registration_date,
+                                       activity_description, is_tech, data_source, last_scraped,
+                                       active, latitude, longitude,
+                                       create_date, write_date, create_uid, write_uid)
+        VALUES %s
+        ON CONFLICT (nipt) DO UPDATE SET
+            city = COALESCE(NULLIF(t.city, ''), EXCLUDED.city),
+            legal_form = COALESCE(NULLIF(t.legal_form, ''), EXCLUDED.legal_form),
+            registration_date = COALESCE(NULLIF(t.registration_date, ''), EXCLUDED.registration_date),
+            activity_description = COALESCE(NULLIF(t.activity_description, ''), EXCLUDED.activity_description),
+            is_tech = CASE WHEN t.tech_keywords IS NULL AND t.tech_source IS DISTINCT FROM 'manual'
+                           THEN true ELSE t.is_tech END,
+            last_scraped = EXCLUDED.last_scraped,
+            write_date = EXCLUDED.write_date
+        RETURNING (xmax = 0)
+    """, values, template="(%s, %s, %s, %s, %s, %s, true, 'qkb', %s, true, 0, 0, %s, %s, 1, 1)",
+        page_size=len(values), fetch=True)
+    created = sum(1 for (is_new,) in inserted if is_new)
+    return created, len(values) - created
+
+
+def update_addresses(cur, rows):
+    """Fill the empty address of many NIPTs in one UPDATE ... FROM (VALUES ...)."""
+    if not rows:
+        return
+    execute_values(cur, """
+        UPDATE tech_company AS t SET address = v.address
+        FROM (VALUES %s) AS v(nipt, address)
+        WHERE t.nipt = v.nipt AND COALESCE(t.address, '') = ''
+    """, rows, page_size=len(rows))
+
+
+def update_activities(cur, rows):
+    """Set activity_description for many NIPTs in one UPDATE ... FROM (VALUES ...)."""
+    if not rows:
+        return
+    execute_values(cur, """
+        UPDATE tech_company AS t SET activity_description = v.activity
+        FROM (VALUES %s) AS v(nipt, activity)
+        WHERE t.nipt = v.nipt
+    """, rows, page_size=len(rows))
 
-    if existing:
-        cur.execute("""
-            UPDATE tech_company SET
-                city = COALESCE(NULLIF(city, ''), %s),
-                legal_form = COALESCE(NULLIF(legal_form, ''), %s),
-                registration_date = COALESCE(NULLIF(registration_date, ''), %s),
-                activity_description = COALESCE(NULLIF(activity_description, ''), %s),
-                is_tech = true,
-                last_scraped = %s,
-                write_date = %s
-            WHERE nipt = %s
-        """, (
-            data.get('city', 'tirane'),
-            data.get('legal_form', ''),
-            data.get('registration_date', ''),
-            data.get('activity_description', ''),
-            now, now, nipt,
-        ))
-        return 'updated'
-    else:
+
+# =============================================================================
+# CHECKPOINTS - finished search cells / enriched NIPTs, per run
+# =============================================================================
+def ensure_checkpoint_tables(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS tech_company_scrape_run (
+            id SERIAL PRIMARY KEY,
+            started_at TIMESTAMP NOT NULL DEFAULT (now() at time zone 'utc'),
+            finished_at TIMESTAMP
+        )
+    """)
+    cur.execute("ALTER TABLE tech_company_scrape_run ADD COLUMN IF NOT EXISTS mode VARCHAR NOT NULL DEFAULT 'full'")
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS tech_company_scrape_checkpoint (
+            run_id INTEGER NOT NULL REFERENCES tech_company_scrape_run(id) ON DELETE CASCADE,
+            kind VARCHAR NOT NULL,
+            key VARCHAR NOT NULL,
+            done_at TIMESTAMP NOT NULL DEFAULT (now() at time zone 'utc'),
+            saturated BOOLEAN NOT NULL DEFAULT false,
+            PRIMARY KEY (run_id, kind, key)
+        )
+    """)
+    cur.execute("ALTER TABLE tech_company_scrape_checkpoint ADD COLUMN IF NOT EXISTS saturated BOOLEAN NOT NULL DEFAULT false")
+    # NIPTs returned per keyword per run (all of them, not only new ones)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS tech_company_keyword_stat (
+            run_id INTEGER NOT NULL REFERENCES tech_company_scrape_run(id) ON DELETE CASCADE,
+            keyword VARCHAR NOT NULL,
+            nipts VARCHAR[] NOT NULL DEFAULT '{}',
+            PRIMARY KEY (run_id, keyword)
+        )
+    """)
+    # Latest registration date seen per keyword, the starting point of delta runs
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS tech_company_keyword_watermark (
+            keyword VARCHAR PRIMARY KEY,
+            registration_date DATE NOT NULL,
+            updated_at TIMESTAMP NOT NULL DEFAULT (now() at time zone 'utc')
+        )
+    """)
+
+
+def choose_mode(cur, mode=SCRAPER_MODE):
+    """'full' or 'delta' for a new run; 'auto' is delta unless a full sweep is due."""
+    if mode in ('full', 'delta'):
+        return mode
+    cur.execute("""
+        SELECT max(finished_at) FROM tech_company_scrape_run
+        WHERE mode = 'full' AND finished_at IS NOT NULL
+    """)
+    last_full = cur.fetchone()[0]
+    if last_full is None or datetime.utcnow() - last_full > timedelta(days=SCRAPER_FULL_SWEEP_DAYS):
+        return 'full'
+    return 'delta'
+
+
+def open_scrape_run(cur, resume=SCRAPER_RESUME):
+    """Return (run_id, started_at, resumed, mode) - the last unfinished run or a new one."""
+    if resume:
         cur.execute("""
-            INSERT INTO tech_company (name, nipt, city, legal_form, registration_date,
-                                      activity_description, is_tech, data_source, last_scraped,
-                                      active, latitude, longitude,
-                                      create_date, write_date, create_uid, write_uid)
-            VALUES (%s, %s, %s, %s, %s, %s, true, 'qkb', %s, true, 0, 0, %s, %s, 1, 1)
-        """, (
-            data['name'], nipt,
-            data.get('city', 'tirane'),
-            data.get('legal_form', ''),
-            data.get('registration_date', ''),
-            data.get('activity_description', ''),
-            now, now, now,
-        ))
-        return 'created'
+            SELECT id, started_at, mode FROM tech_company_scrape_run
+            WHERE finished_at IS NULL ORDER BY id DESC LIMIT 1
+        """)
+        row = cur.fetchone()
+        if row:
+            return row[0], row[1], True, row[2]
+    mode = choose_mode(cur)
+    cur.execute("INSERT INTO tech_company_scrape_run (mode) VALUES (%s) RETURNING id, started_at", (mode,))
+    run_id, started_at = cur.fetchone()
+    return run_id, started_at, False, mode
+
+
+def finish_scrape_run(cur, run_id):
+    advance_watermarks(cur, run_id)
+    cur.execute("UPDATE tech_company_scrape_run SET finished_at = (now() at time zone 'utc') WHERE id = %s",
+                (run_id,))
+
+
+def advance_watermarks(cur, run_id):
+    """Raise each keyword's watermark to the latest registration date it returned in this run.
+
+    Only called for a finished run, so a delta plan never skips months an
+    interrupted run did not actually cover.
+    """
+    cur.execute("""
+        INSERT INTO tech_company_keyword_watermark AS w (keyword, registration_date)
+        SELECT s.keyword, max(to_date(t.registration_date, 'DD/MM/YYYY'))
+        FROM tech_company_keyword_stat s
+        JOIN tech_company t ON t.nipt = ANY(s.nipts)
+        WHERE s.run_id = %s AND t.registration_date ~ '^[0-9]{1,2}/[0-9]{1,2}/[0-9]{4}$'
+        GROUP BY s.keyword
+        ON CONFLICT (keyword) DO UPDATE
+        SET registration_date = GREATEST(w.registration_date, EXCLUDED.registration_date),
+            updated_at = (now() at time zone 'utc')
+    """, (run_id,))
+
+
+def load_watermarks(cur):
+    """Return {keyword: registration date high-water mark}."""
+    cur.execute("SELECT keyword, registration_date FROM tech_company_keyword_watermark")
+    return dict(cur.fetchall())
+
+
+def load_checkpoints(cur, run_id, kind):
+    """Return {key: saturated} of the finished units of a run."""
+    cur.execute("SELECT key, saturated FROM tech_company_scrape_checkpoint WHERE run_id = %s AND kind = %s",
+                (run_id, kind))
+    return dict(cur.fetchall())
+
+
+def mark_checkpoints(cur, run_id, rows):
+    """Record finished units of work [(kind, key, saturated)]. Committed together with their upserts."""
+    if not rows:
+        return
+    execute_values(cur, """
+        INSERT INTO tech_company_scrape_checkpoint (run_id, kind, key, saturated)
+        VALUES %s ON CONFLICT DO NOTHING
+    """, [(run_id, kind, key, saturated) for kind, key, saturated in rows],
+        page_size=len(rows))
+
+
+def record_keyword_hits(cur, run_id, hits):
+    """Merge {keyword: NIPT set} into the keywords' result sets for this run."""
+    if not hits:
+        return
+    execute_values(cur, """
+        INSERT INTO tech_company_keyword_stat AS s (run_id, keyword, nipts)
+        VALUES %s
+        ON CONFLICT (run_id, keyword) DO UPDATE
+        SET nipts = ARRAY(SELECT DISTINCT unnest(s.nipts || EXCLUDED.nipts))
+    """, [(run_id, keyword, sorted(nipts)) for keyword, nipts in hits.items()],
+        template='(%s, %s, %s::varchar[])', page_size=len(hits))
+
+
+class ScrapeWriter:
+    """Buffers everything the main thread writes and flushes it in one transaction.
+
+    Company rows, enrichment results, keyword hits and checkpoints are
+    flushed together on size (SCRAPER_FLUSH_ROWS) or age
+    (SCRAPER_FLUSH_SECONDS) thresholds, so a checkpoint is never committed
+    without the rows it stands for. New placeholder rows are queued for
+    enrichment in the same transaction.
+    """
+
+    def __init__(self, conn, run_id, max_rows=SCRAPER_FLUSH_ROWS, max_age=SCRAPER_FLUSH_SECONDS):
+        self.conn = conn
+        self.run_id = run_id
+        self.max_rows = max_rows
+        self.max_age = max_age
+        self.created = 0
+        self.updated = 0
+        self.flushes = 0
+        self._reset()
+
+    def _reset(self):
+        self.companies = {}  # nipt -> row, so a batch never touches a row twice
+        self.enrichments = {}  # nipt -> activity ('' none, None failed)
+        self.addresses = {}  # nipt -> address found with the activity
+        self.keyword_hits = {}
+        self.checkpoints = []
+        self.since = time.monotonic()
+
+    def add_company(self, data):
+        self.companies[data['nipt']] = data
+
+    def add_enrichment(self, nipt, activity, address=''):
+        self.enrichments[nipt] = activity
+        if address:
+            self.addresses[nipt] = address
+
+    def add_keyword_hits(self, keyword, nipts):
+        self.keyword_hits.setdefault(keyword, set()).update(nipts)
+
+    def add_checkpoint(self, kind, key, saturated=False):
+        self.checkpoints.append((kind, key, saturated))
+
+    def pending(self):
+        return len(self.companies) + len(self.enrichments) + len(self.checkpoints)
+
+    def maybe_flush(self):
+        if self.pending() >= self.max_rows or time.monotonic() - self.since >= self.max_age:
+            self.flush()
+
+    def flush(self):
+        if not (self.pending() or self.keyword_hits):
+            return
+        cur = self.conn.cursor()
+        try:
+            created, updated = upsert_companies(cur, list(self.companies.values()))
+            if self.companies:
+                enqueue_placeholders(cur, self.companies)
+            update_activities(cur, [(nipt, activity) for nipt, activity in self.enrichments.items() if activity])
+            update_addresses(cur, list(self.addresses.items()))
+            settle_enrichments(cur, self.enrichments)
+            record_keyword_hits(cur, self.run_id, self.keyword_hits)
+            mark_checkpoints(cur, self.run_id, self.checkpoints)
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        finally:
+            cur.close()
+        self.created += created
+        self.updated += updated
+        self.flushes += 1
+        self._reset()
+
+
+# =============================================================================
+# ENRICHMENT QUEUE - NIPTs whose activity description is still a placeholder
+# =============================================================================
+def ensure_enrich_queue(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS tech_company_enrich_queue (
+            nipt VARCHAR PRIMARY KEY,
+            queued_at TIMESTAMP NOT NULL DEFAULT (now() at time zone 'utc'),
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_attempt TIMESTAMP
+        )
+    """)
+
+
+def enqueue_placeholders(cur, nipts=None):
+    """Queue rows still carrying a '[matched: ...]' placeholder (all of them, or among `nipts`)."""
+    query = """
+        INSERT INTO tech_company_enrich_queue (nipt)
+        SELECT nipt FROM tech_company WHERE activity_description LIKE '[matched:%%'
+    """
+    params = ()
+    if nipts is not None:
+        query += " AND nipt = ANY(%s)"
+        params = (list(nipts),)
+    cur.execute(query + " ON CONFLICT DO NOTHING", params)
+    return cur.rowcount
+
+
+def claim_enrich_batch(cur, limit, exclude=()):
+    """Return [(nipt, name)] of queued NIPTs to hand to the workers, least-tried first."""
+    cur.execute("""
+        SELECT q.nipt, COALESCE(t.name, '') FROM tech_company_enrich_queue q
+        LEFT JOIN tech_company t ON t.nipt = q.nipt
+        WHERE q.attempts < %s AND q.nipt <> ALL(%s)
+        ORDER BY q.attempts, q.queued_at
+        LIMIT %s
+    """, (ENRICH_MAX_ATTEMPTS, list(exclude), limit))
+    return cur.fetchall()
+
+
+def enrich_backlog(cur):
+    cur.execute("SELECT count(*) FROM tech_company_enrich_queue WHERE attempts < %s", (ENRICH_MAX_ATTEMPTS,))
+    return cur.fetchone()[0]
+
+
+def settle_enrichments(cur, outcomes):
+    """Apply {nipt: activity} lookups to the queue.
+
+    Enriched NIPTs leave the queue. A company without an activity ('') is
+    given up right away and a failed lookup (None) counts one attempt; both
+    stay queued so they are not re-added from their placeholder.
+    """
+    if not outcomes:
+        return
+    done = [nipt for nipt, activity in outcomes.items() if activity]
+    if done:
+        cur.execute("DELETE FROM tech_company_enrich_queue WHERE nipt = ANY(%s)", (done,))
+    retry = [(nipt, ENRICH_MAX_ATTEMPTS if activity == '' else 1)
+             for nipt, activity in outcomes.items() if not activity]
+    if retry:
+        execute_values(cur, f"""
+            UPDATE tech_company_enrich_queue AS q
+            SET attempts = LEAST(q.attempts + v.step, {ENRICH_MAX_ATTEMPTS}),
+                last_attempt = (now() at time zone 'utc')
+            FROM (VALUES %s) AS v(nipt, step)
+            WHERE q.nipt = v.nipt
+        """, retry, page_size=len(retry))
+
+
+def load_keyword_history(cur, runs):
+    """Return {keyword: [NIPT set per run]} over each keyword's last `runs` finished full sweeps.
+
+    Delta runs only see recent registrations, so they say nothing about
+    whether a keyword is covered by the others.
+    """
+    cur.execute("""
+        SELECT keyword, nipts FROM (
+            SELECT s.keyword, s.nipts,
+                   row_number() OVER (PARTITION BY s.keyword ORDER BY s.run_id DESC) AS rn
+            FROM tech_company_keyword_stat s
+            JOIN tech_company_scrape_run r ON r.id = s.run_id
+            WHERE r.finished_at IS NOT NULL AND r.mode = 'full'
+        ) t WHERE rn <= %s
+        ORDER BY keyword, rn
+    """, (runs,))
+    history = {}
+    for keyword, nipts in cur.fetchall():
+        history.setdefault(keyword, []).append(set(nipts))
+    return history
+
+
+def plan_keywords(cur, run_mode, mode=SCRAPER_KEYWORD_PRUNE):
+    """Return (keywords to search in order, redundant keywords)."""
+    if mode == 'off' or run_mode == 'delta':
+        return list(ACTIVITY_KEYWORDS), []
+    cur.execute("SELECT count(*) FROM tech_company_scrape_run WHERE mode = 'full' AND finished_at IS NOT NULL")
+    if (cur.fetchone()[0] + 1) % KEYWORD_REPROBE_EVERY == 0:
+        return list(ACTIVITY_KEYWORDS), []
+    history = load_keyword_history(cur, SCRAPER_KEYWORD_HISTORY)
+    redundant = redundant_keywords(ACTIVITY_KEYWORDS, history, SCRAPER_KEYWORD_HISTORY)
+    kept = [kw for kw in ACTIVITY_KEYWORDS if kw not in redundant]
+    if mode == 'demote':
+        return kept + redundant, redundant
+    return kept, redundant
 
 
 # =============================================================================
@@ -462,108 +1213,227 @@ def main():
     _logger.info("QKB SCRAPER - Activity field search only (IT companies)")
     _logger.info("=" * 80)
 
-    driver = start_driver()
     conn = get_db_connection()
     cur = conn.cursor()
 
     ensure_columns(cur)
+    ensure_checkpoint_tables(cur)
+    ensure_enrich_queue(cur)
+    run_id, run_started, resumed, run_mode = open_scrape_run(cur)
     conn.commit()
+    done_cells = load_checkpoints(cur, run_id, 'search')
+    if resumed:
+        _logger.info(f"Resuming {run_mode} run #{run_id} (started {run_started}): {len(done_cells)} searches already done")
+    else:
+        _logger.info(f"Starting {run_mode} run #{run_id}")
 
-    # Load existing NIPTs
-    cur.execute("SELECT nipt FROM tech_company WHERE nipt IS NOT NULL")
-    existing_nipts = {row[0] for row in cur.fetchall()}
-    _logger.info(f"Loaded {len(existing_nipts)} existing NIPTs from database")
+    writer = ScrapeWriter(conn, run_id)
 
     # ==========================================================================
     # SEARCH: Activity field only with IT keywords
     # All results are tech companies (matched by activity field on QKB)
     # ==========================================================================
-    total = len(ACTIVITY_KEYWORDS) * len(LEGAL_FORMS) * len(DATE_RANGES)
-    _logger.info(f"Searches planned: {total} ({len(ACTIVITY_KEYWORDS)} keywords x {len(LEGAL_FORMS)} legal forms x {len(DATE_RANGES)} date ranges)")
+    # Keywords whose past results were all covered by other keywords
+    keywords, redundant = plan_keywords(cur, run_mode)
+    if redundant:
+        action = 'searched last' if SCRAPER_KEYWORD_PRUNE == 'demote' else 'skipped'
+        _logger.info(f"Keywords {action} (no new NIPTs in their last {SCRAPER_KEYWORD_HISTORY} runs): {', '.join(redundant)}")
+
+    # Delta runs start each keyword at its watermark (watermarks only move when
+    # a run finishes, so a resumed run rebuilds the same plan)
+    since = {}
+    if run_mode == 'delta':
+        watermarks = load_watermarks(cur)
+        since = {kw: months_before(d.year, d.month, DELTA_OVERLAP_MONTHS) for kw, d in watermarks.items()}
+        _logger.info(f"Delta mode: {len([kw for kw in keywords if kw in since])}/{len(keywords)} keywords "
+                     f"searched from their watermark, the rest from {SEARCH_SPAN[0]}")
+
+    # Adaptive plan: coarse cells first, split only when a result set is saturated
+    pending = pending_cells(root_cells(keywords, SEARCH_SPAN, since), done_cells, LEGAL_FORMS)
+    total = len(done_cells) + len(pending)
+    _logger.info(f"Searches planned: {len(pending)} pending, {len(done_cells)} done ({len(keywords)} keywords, "
+                 f"cells split on results >= {QKB_RESULT_CAP} or > {MAX_PAGES} pages)")
 
     found = {}  # nipt -> company data
-    search_count = 0
-    created = 0
-    updated = 0
+    search_count = len(done_cells)
+    failed = 0
+    interrupted = False
+
+    # Search and enrichment workers only talk to QKB; this thread is the single
+    # writer, so every result goes through the buffered upsert once and
+    # `found` deduplicates NIPTs.
+    search_backend, enrich_backend = resolve_backends()
+    _logger.info(f"Backends: search={search_backend}, enrichment={enrich_backend}")
+
+    # Existing rows still waiting for their description join the queue too
+    backfilled = enqueue_placeholders(cur)
+    conn.commit()
+    _logger.info(f"Enrichment queue: {enrich_backlog(cur)} NIPTs waiting ({backfilled} placeholders added)")
+    conn.commit()
+
+    results = queue.Queue()
+    cells, search_stop, search_threads, throttles = start_search_pool(search_backend, results)
+    nipts, enrich_stop, enrich_threads, enrich_throttles = start_enrich_pool(enrich_backend, results)
+    searching = len(search_threads)
+    enriching = len(enrich_threads)
+    for cell in pending:
+        cells.put(cell)
+    outstanding = len(pending)
+
+    in_flight = {}  # nipt -> name, handed to the enrichment workers
+    prefetch = 4 * len(enrich_threads)
+    enriched = 0
+    claimed_at_flush = -1  # writer.flushes when the queue table was last found drained
+
+    def feed_enrichment():
+        """Top up the workers' NIPT queue from the queue table.
+
+        The table only changes on a flush, so once a claim comes back short
+        it is not queried again until the next flush.
+        """
+        nonlocal claimed_at_flush
+        want = prefetch - len(in_flight)
+        if not enriching or want <= 0 or claimed_at_flush == writer.flushes:
+            return
+        rows = claim_enrich_batch(cur, want, set(in_flight) | set(writer.enrichments))
+        conn.commit()
+        for nipt, name in rows:
+            in_flight[nipt] = name
+            nipts.put(nipt)
+        if len(rows) < want:
+            claimed_at_flush = writer.flushes
 
     try:
-        for keyword in ACTIVITY_KEYWORDS:
-            for legal_form in LEGAL_FORMS:
-                for (y1, m1, y2, m2) in DATE_RANGES:
-                    search_count += 1
-                    companies = search_qkb_activity(driver, keyword, legal_form, (y1, m1), (y2, m2))
-
-                    new_in_batch = 0
-                    for c in companies:
-                        nipt = c['nipt']
-                        if nipt in found or nipt in existing_nipts:
-                            continue
-                        found[nipt] = c
-                        new_in_batch += 1
-
-                        # Save immediately - all activity search results are tech companies
-                        c['is_tech'] = True
-                        c['activity_description'] = f'[matched: {keyword}]'  # placeholder
-                        action = upsert_company(cur, c)
-                        if action == 'created':
-                            created += 1
-                        else:
-                            updated += 1
-
-                    if new_in_batch > 0:
-                        _logger.info(f"[{search_count}/{total}] '{keyword}' [{legal_form[:10]}] [{y1}/{m1:02d}-{y2}/{m2:02d}]: +{new_in_batch} (total: {len(found)}, saved: {created})")
-
-                    # Commit every 10 searches
-                    if search_count % 10 == 0:
-                        conn.commit()
-
-                    # Random delay between searches to avoid rate limiting (3-5 seconds)
-                    time.sleep(random.uniform(3, 5))
-
-            # Progress every keyword
-            conn.commit()
-            _logger.info(f"[KEYWORD DONE] '{keyword}' - {search_count}/{total} searches, {len(found)} found, {created} created")
+        while True:
+            search_active = searching and outstanding
+            if not search_active:
+                search_stop.set()
+            feed_enrichment()
+            if not search_active and not (enriching and in_flight):
+                if writer.pending():
+                    # Enrichment results may free queued NIPTs for one more claim
+                    writer.flush()
+                    continue
+                break
+            try:
+                kind, item, value = results.get(timeout=1.0)
+            except queue.Empty:
+                writer.maybe_flush()
+                continue
+
+            if kind == 'exit':
+                if item == 'search':
+                    searching -= 1
+                else:
+                    enriching -= 1
+                continue
+
+            if kind == 'enrich':
+                name = in_flight.pop(item, '')
+                activity, address = value
+                writer.add_enrichment(item, activity, address)
+                if activity:
+                    enriched += 1
+                    if enriched % 10 == 0:
+                        _logger.info(f"[ENRICH] {enriched} enriched - last: {name}")
+                writer.maybe_flush()
+                continue
+
+            cell, companies = item, value
+            outstanding -= 1
+            keyword, legal_form, (y1, m1, y2, m2) = cell
+            if companies is None:
+                # Failed search - left without checkpoint so the next run retries it
+                failed += 1
+                continue
+            search_count += 1
+            writer.add_keyword_hits(keyword, (c['nipt'] for c in companies))
+
+            new_in_batch = 0
+            for c in companies:
+                nipt = c['nipt']
+                if nipt in found:
+                    continue
+                found[nipt] = c
+                new_in_batch += 1
+
+                # Save - all activity search results are tech companies.
+                # Existing rows keep their description; new ones get a placeholder
+                # and are queued for enrichment when the batch is flushed.
+                c['is_tech'] = True
+                c['activity_description'] = f'[matched: {keyword}]'  # placeholder
+                writer.add_company(c)
+
+            # Saturated result sets may be truncated - search their sub-cells
+            saturated = is_saturated(companies, QKB_RESULT_CAP)
+            if saturated:
+                subcells = children(cell, LEGAL_FORMS)
+                if not subcells:
+                    _logger.warning(f"'{keyword}' [{legal_form[:10]}] [{y1}/{m1:02d}]: still saturated at one month - results may be incomplete")
+                for sub in subcells:
+                    cells.put(sub)
+                outstanding += len(subcells)
+                total += len(subcells)
+
+            writer.add_checkpoint('search', cell_key(cell), saturated)
+
+            if new_in_batch > 0:
+                _logger.info(f"[{search_count}/{total}] '{keyword}' [{legal_form[:10] or 'all forms'}] [{y1}/{m1:02d}-{y2}/{m2:02d}]: +{new_in_batch} (total: {len(found)}, created so far: {writer.created})")
+
+            writer.maybe_flush()
+
+            if search_count % 100 == 0:
+                _logger.info(f"[PROGRESS] {search_count}/{total} searches, {len(found)} found, {writer.created} created, {enriched} enriched")
 
     except KeyboardInterrupt:
+        interrupted = True
         _logger.info("Interrupted - saving progress")
     except Exception as e:
-        _logger.error(f"Search error: {e}")
+        interrupted = True
+        _logger.error(f"Scrape error: {e}")
         import traceback
         traceback.print_exc()
-
+    finally:
+        search_stop.set()
+        enrich_stop.set()
+        for t in search_threads + enrich_threads:
+            t.join(timeout=60)
+
+    writer.flush()
+    if failed or outstanding:
+        interrupted = True
+
+    # Only a complete search is closed; otherwise the next run resumes it.
+    # Unfinished enrichments simply stay in the queue table.
+    if not interrupted:
+        finish_scrape_run(cur, run_id)
     conn.commit()
-    _logger.info(f"Search complete: {len(found)} tech companies found")
 
-    # ==========================================================================
-    # ENRICH: Get full activity description from info modal for each company
-    # ==========================================================================
-    _logger.info("=" * 80)
-    _logger.info(f"ENRICHING: Getting activity descriptions for {len(found)} companies")
-    _logger.info("=" * 80)
-
-    enriched = 0
-    for i, (nipt, data) in enumerate(found.items(), 1):
+    # New rows come in at (0, 0) and as 'other' - place and categorise them
+    # before the snapshot is rebuilt
+    geocoded = None
+    if SCRAPER_GEOCODE:
+        try:
+            geocoded = geocode_companies(conn)
+        except Exception as e:
+            conn.rollback()
+            _logger.error(f"Geocoding failed: {e}")
+    classified = None
+    if SCRAPER_CLASSIFY:
         try:
-            activity = get_activity_from_modal(driver, nipt)
-            if activity:
-                cur.execute(
-                    "UPDATE tech_company SET activity_description = %s WHERE nipt = %s",
-                    (activity, nipt)
-                )
-                enriched += 1
-            if i % 10 == 0:
-                conn.commit()
-                _logger.info(f"[ENRICH {i}/{len(found)}] {enriched} enriched - last: {data['name']}")
-            time.sleep(1)
+            classified = classify_companies(conn)
         except Exception as e:
-            _logger.error(f"Enrich error {nipt}: {e}")
+            conn.rollback()
+            _logger.error(f"Classification failed: {e}")
 
+    # The map API serves a cached snapshot - rebuild it with this run's rows
+    bump_snapshot_version(cur)
     conn.commit()
+    backlog = enrich_backlog(cur)
 
     # ==========================================================================
     # SUMMARY
     # ==========================================================================
-    driver.quit()
     cur.close()
     conn.close()
 
@@ -573,8 +1443,16 @@ def main():
     _logger.info(f"Duration: {duration/3600:.1f} hours")
     _logger.info(f"Searches: {search_count}/{total}")
     _logger.info(f"Tech companies found: {len(found)}")
-    _logger.info(f"Created: {created}, Updated: {updated}")
-    _logger.info(f"Enriched with activity: {enriched}")
+    _logger.info(f"Created: {writer.created}, Updated: {writer.updated} ({writer.flushes} batched writes)")
+    _logger.info(f"Enriched with activity: {enriched} ({backlog} still queued)")
+    if geocoded:
+        _logger.info(f"Geocoded: {geocoded['placed']} placed, {geocoded['unresolved']} unresolved "
+                     f"({geocoded['lookups']} addresses looked up)")
+    if classified:
+        _logger.info(f"Classified: {classified['rows']} changed descriptions, {classified['categorised']} matched a category, "
+                     f"{classified['tech']} verified as tech")
+    _logger.info(f"Search time: {format_stats(merge_stats(throttles))}")
+    _logger.info(f"Enrich time: {format_stats(merge_stats(enrich_throttles))}")
     _logger.info("=" * 80)
 
 
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+Adaptive search planner for the QKB activity search.
+
+A cell is (keyword, legal_form, (y1, m1, y2, m2)); legal_form '' means "any".
+Planning starts with one coarse cell per keyword (all legal forms, whole date
+span). A cell is only split when its result set hit QKB's result ceiling:
+first by legal form, then by halving the date range. Cells whose parent came
+back unsaturated - including empty - are never searched.
+
+In delta mode a keyword's root cell starts at its registration-date
+high-water mark instead of the start of the span.
+"""
+
+
+def cell_key(cell):
+    keyword, legal_form, (y1, m1, y2, m2) = cell
+    return f"{keyword}|{legal_form}|{y1}/{m1:02d}-{y2}/{m2:02d}"
+
+
+def _month_index(year, month):
+    return year * 12 + (month - 1)
+
+
+def _from_index(index):
+    return index // 12, index % 12 + 1
+
+
+def split_range(date_range):
+    """Halve (y1, m1, y2, m2) on a month boundary; [] if it is a single month."""
+    y1, m1, y2, m2 = date_range
+    lo, hi = _month_index(y1, m1), _month_index(y2, m2)
+    if lo >= hi:
+        return []
+    mid = (lo + hi) // 2
+    return [_from_index(lo) + _from_index(mid), _from_index(mid + 1) + _from_index(hi)]
+
+
+def months_before(year, month, months):
+    """(year, month) `months` months earlier."""
+    return _from_index(_month_index(year, month) - months)
+
+
+def root_cells(keywords, date_range, since=None):
+    """One coarse cell per keyword: any legal form, the whole date span.
+
+    since: {keyword: (year, month)} - those keywords start at that month
+    instead (never before the span start). Keywords not in it get the span.
+    """
+    since = since or {}
+    y1, m1, y2, m2 = date_range
+    cells = []
+    for keyword in keywords:
+        start = _month_index(y1, m1)
+        if keyword in since:
+            start = min(max(start, _month_index(*since[keyword])), _month_index(y2, m2))
+        cells.append((keyword, '', _from_index(start) + (y2, m2)))
+    return cells
+
+
+def children(cell, legal_forms):
+    """Sub-cells of a saturated cell (empty list if it cannot be split further)."""
+    keyword, legal_form, date_range = cell
+    if not legal_form:
+        return [(keyword, lf, date_range) for lf in legal_forms]
+    return [(keyword, legal_form, sub) for sub in split_range(date_range)]
+
+
+def pending_cells(roots, done, legal_forms):
+    """Cells still to search, given checkpoints `done` = {cell_key: saturated}.
+
+    Walks the tree from the roots: done+saturated cells are expanded into their
+    children, done+unsaturated cells are leaves, anything else is pending.
+    """
+    pending = []
+    stack = list(reversed(roots))
+    while stack:
+        cell = stack.pop()
+        key = cell_key(cell)
+        if key not in done:
+            pending.append(cell)
+        elif done[key]:
+            stack.extend(reversed(children(cell, legal_forms)))
+    return pending
+
+
+class SearchResult(list):
+    """Companies from one search, plus what the planner needs to know about it.
+
+    raw_count: result rows QKB returned, before dropping natural persons.
+    truncated: more pages existed than the backend is allowed to read.
+    """
+
+    def __init__(self, companies=(), raw_count=0, truncated=False):
+        super().__init__(companies)
+        self.raw_count = raw_count
+        self.truncated = truncated
+
+
+def is_saturated(result, cap):
+    """True if a search hit the pagination/result ceiling and may be incomplete."""
+    return bool(getattr(result, 'truncated', False)
+                or getattr(result, 'raw_count', len(result)) >= cap)
+
+
+def redundant_keywords(keywords, history, min_runs):
+    """Keywords whose results added no NIPT the rest of the plan doesn't cover.
+
+    history: {keyword: [set of NIPTs per recent finished run, newest first]}.
+    Only keywords with at least `min_runs` runs of history can be judged; the
+    others (new keywords, or too little evidence) are always searched and seed
+    the cover. Eligible keywords are then added greedily by the number of new
+    NIPTs they bring (set cover); whatever brings none is redundant.
+    """
+    eligible = {kw: set().union(*history[kw][:min_runs])
+                for kw in keywords if len(history.get(kw, ())) >= min_runs}
+    covered = set()
+    for kw in keywords:
+        if kw not in eligible:
+            covered |= set().union(*history.get(kw, [set()]))
+    while eligible:
+        best = max(eligible, key=lambda kw: len(eligible[kw] - covered))
+        if not eligible[best] - covered:
+            break
+        covered |= eligible.pop(best)
+    return [kw for kw in keywords if kw in eligible]
@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+"""
+Snapshot version bump shared by the standalone scripts.
+
+The public map API caches its JSON per version (models/tech_company.py,
+SNAPSHOT_VERSION_PARAM); scripts that write tech_company rows outside the ORM
+bump the same ir.config_parameter row when they are done.
+"""
+
+SNAPSHOT_VERSION_PARAM = 'albanian_tech_map.snapshot_version'
+
+
+def bump_snapshot_version(cur):
+    """Tell Odoo the cached /techmap/api/companies snapshot is stale
+    (same ir.config_parameter row tech.company bumps on ORM writes)."""
+    cur.execute("""
+        INSERT INTO ir_config_parameter (key, value, create_uid, create_date, write_uid, write_date)
+        VALUES (%s, to_char(now() at time zone 'utc', 'YYYY-MM-DD HH24:MI:SS.US'),
+                1, now() at time zone 'utc', 1, now() at time zone 'utc')
+        ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value, write_date = EXCLUDED.write_date
+    """, (SNAPSHOT_VERSION_PARAM,))
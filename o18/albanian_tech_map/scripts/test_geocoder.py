@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for geocoder.py that need no database or network:
+    cd scripts && python3 -m unittest test_geocoder
+"""
+
+import unittest
+
+import math
+
+from geocoder import (CENTROID_SOURCE, GEOCODER_CENTROID_SPREAD, KIND_CONFIDENCE, METRES_PER_DEGREE,
+                      address_key, is_placed, load_gazetteer, placement, resolve)
+
+
+class TestGeocoder(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.gazetteer = load_gazetteer()
+
+    def _resolve(self, address, city):
+        key = address_key(address, city)
+        return resolve([(key, address, city)], self.gazetteer)[key]
+
+    def test_empty_address_is_spread_around_centroid(self):
+        # Without an address only the city centre is known: each company gets
+        # its own fixed point near it instead of all stacking on one
+        result = self._resolve('', 'tirane')
+        self.assertEqual(result[2], KIND_CONFIDENCE['city'])
+        first, second = placement(1, result), placement(2, result)
+        self.assertEqual(first, placement(1, result))
+        self.assertNotEqual(first[:2], second[:2])
+        self.assertEqual(first[3], CENTROID_SOURCE)
+        for lat, lng, _confidence, _source in (first, second):
+            metres = math.hypot((lat - result[0]) * METRES_PER_DEGREE,
+                                (lng - result[1]) * METRES_PER_DEGREE * math.cos(math.radians(lat)))
+            self.assertLessEqual(metres, GEOCODER_CENTROID_SPREAD + 1)
+
+    def test_street_is_placed(self):
+        result = self._resolve('Rr. e Kavajës, Pallati 5', 'tirane')
+        self.assertEqual(result[2], KIND_CONFIDENCE['street'])
+        self.assertTrue(is_placed(result))
+        self.assertEqual(placement(1, result)[:2], result[:2])
+
+    def test_unknown_city_is_not_placed(self):
+        # A Tirana street name must not place a company of an unknown town
+        for address in ('', 'Rr. e Kavajës, Pallati 5'):
+            with self.subTest(address=address):
+                result = self._resolve(address, 'nowhere')
+                self.assertIsNone(result[0])
+                self.assertFalse(is_placed(result))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for keyword_matcher.py and the is_tech verdict of classifier.py:
+    cd scripts && python3 -m unittest test_keyword_matcher
+
+The database test runs against a scratch table when TECHMAP_TEST_DSN is set:
+    TECHMAP_TEST_DSN="dbname=odoo user=odoo" python3 -m unittest test_keyword_matcher
+"""
+
+import os
+import unittest
+
+import psycopg2
+
+from classifier import CategoryClassifier, update_categories
+from keyword_matcher import KeywordMatcher, fold
+
+
+class TestKeywordMatcher(unittest.TestCase):
+
+    def test_fold(self):
+        self.assertEqual(fold('Teknologjisë  së Informacionit!'), 'teknologjise se informacionit')
+
+    def test_whole_words_and_prefixes(self):
+        matcher = KeywordMatcher(['it', 'program*'])
+        self.assertEqual(matcher.findall('Rritje kapitali'), [])
+        self.assertEqual(matcher.findall('Sherbime IT dhe programim'), ['it', 'program*'])
+
+    def test_phrase_with_linking_article(self):
+        matcher = KeywordMatcher(['teknologji* informacion*', 'sistem* informacion*', 'faqe interneti'])
+        cases = {
+            'teknologji informacioni': ['teknologji* informacion*'],
+            'teknologjisë së informacionit': ['teknologji* informacion*'],
+            'teknologjia e informacionit': ['teknologji* informacion*'],
+            'sistemi i informacionit': ['sistem* informacion*'],
+            'sistemeve të informacionit': ['sistem* informacion*'],
+            'faqe interneti': ['faqe interneti'],
+            'faqe te internetit': [],  # last word is not a prefix
+            'sistemi per informacionin': [],  # only articles may sit in between
+        }
+        for text, expected in cases.items():
+            with self.subTest(text=text):
+                self.assertEqual(matcher.findall(text), expected)
+
+    def test_phrase_wins_over_word_it_starts_with(self):
+        # 'programim*' is tried in the trie before 'program*' continues to a phrase
+        matcher = KeywordMatcher(['programim*', 'program* kompjuterik*'])
+        self.assertEqual(matcher.findall('Programimi kompjuterik'), ['programim*', 'program* kompjuterik*'])
+        self.assertEqual(matcher.findall('Programimi i uebit'), ['programim*'])
+
+    def test_phrase_starting_with_article(self):
+        matcher = KeywordMatcher(['perpunim* te dhena*'])
+        self.assertEqual(matcher.findall('Përpunimi i të dhënave'), ['perpunim* te dhena*'])
+
+
+class TestTechVerdict(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.classifier = CategoryClassifier()
+
+    def test_genitive_phrases_are_tech(self):
+        for text in ('Konsulence ne fushen e teknologjisë së informacionit',
+                     'Mirembajtje e sistemit të informacionit për bizneset'):
+            with self.subTest(text=text):
+                self.assertTrue(self.classifier.classify(text)[2])
+
+    def test_substring_hit_is_not_tech(self):
+        self.assertEqual(self.classifier.classify('Rritje e kapitalit dhe shitje mobiljesh')[2], [])
+
+
+@unittest.skipUnless(os.environ.get('TECHMAP_TEST_DSN'), 'TECHMAP_TEST_DSN not set')
+class TestUpdateCategories(unittest.TestCase):
+
+    def setUp(self):
+        self.conn = psycopg2.connect(os.environ['TECHMAP_TEST_DSN'])
+        self.cur = self.conn.cursor()
+        # Shadows any real tech_company for this session; dropped on rollback
+        self.cur.execute("""
+            CREATE TEMP TABLE tech_company (
+                id integer PRIMARY KEY, category varchar, category_confidence float8, category_source varchar,
+                is_tech boolean, tech_source varchar, tech_keywords varchar, classifier_hash varchar,
+                write_date timestamp
+            )
+        """)
+
+    def tearDown(self):
+        self.conn.rollback()
+        self.conn.close()
+
+    def test_manual_verdicts_are_kept(self):
+        self.cur.execute("""
+            INSERT INTO tech_company (id, category, category_source, is_tech, tech_source) VALUES
+                (1, 'other', NULL, true, NULL),
+                (2, 'software', 'manual', true, 'manual')
+        """)
+        update_categories(self.cur, [(1, 'other', 0.0, False, '', 'h1'), (2, 'other', 0.0, False, '', 'h2')])
+        self.cur.execute("SELECT id, category, is_tech, tech_source, classifier_hash FROM tech_company ORDER BY id")
+        self.assertEqual(self.cur.fetchall(), [
+            (1, 'other', False, 'classifier', 'h1'),
+            (2, 'software', True, 'manual', 'h2'),
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+Adaptive, server-aware pacing for the QKB scraper.
+
+One Throttle per worker session. The delay between two requests shrinks while
+QKB answers healthily and backs off exponentially on timeouts or empty pages.
+Time is accounted per bucket so a run can report how much went to sleeping
+(pacing, backoff, global rate cap), to waiting for readiness conditions and to
+everything else.
+"""
+
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+# Outcomes passed to Throttle.record()
+OK = 'ok'
+EMPTY = 'empty'
+TIMEOUT = 'timeout'
+
+
+class Throttle:
+    """Per-session pacing controller (AIMD-style: multiplicative both ways)."""
+
+    def __init__(self, min_delay=1.0, max_delay=60.0, initial=None, recover=0.8,
+                 empty_backoff=1.5, empty_tolerance=3, timeout_backoff=2.0, jitter=0.2):
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.delay = initial if initial is not None else min_delay * 3
+        self.recover = recover
+        self.empty_backoff = empty_backoff
+        self.empty_tolerance = empty_tolerance
+        self.empty_streak = 0
+        self.timeout_backoff = timeout_backoff
+        self.jitter = jitter
+        self.stats = {'sleep': 0.0, 'wait': 0.0, 'busy': 0.0}
+        self.counts = {OK: 0, EMPTY: 0, TIMEOUT: 0}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def track(self, bucket):
+        """Account the wall time of the block to `bucket` (sleep / wait / busy)."""
+        t0 = time.monotonic()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.stats[bucket] += time.monotonic() - t0
+
+    def pace(self):
+        """Sleep the current inter-request delay (with jitter)."""
+        delay = self.delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+        with self.track('sleep'):
+            time.sleep(delay)
+
+    def record(self, outcome):
+        """Adapt the delay to the outcome of the last request.
+
+        Narrow searches are legitimately empty, so only a streak of more than
+        `empty_tolerance` empty pages in a row is treated as a soft block.
+        """
+        self.counts[outcome] += 1
+        self.empty_streak = self.empty_streak + 1 if outcome == EMPTY else 0
+        if outcome == OK:
+            self.delay = max(self.min_delay, self.delay * self.recover)
+        elif outcome == EMPTY:
+            if self.empty_streak > self.empty_tolerance:
+                self.delay = min(self.max_delay, self.delay * self.empty_backoff)
+        else:
+            self.delay = min(self.max_delay, self.delay * self.timeout_backoff)
+
+    def record_result(self, companies):
+        """record() for a search result: None = timeout/error, [] = empty page."""
+        self.record(TIMEOUT if companies is None else EMPTY if not companies else OK)
+
+
+def merge_stats(throttles):
+    """Sum stats/counts of several throttles into one dict."""
+    total = {'sleep': 0.0, 'wait': 0.0, 'busy': 0.0, OK: 0, EMPTY: 0, TIMEOUT: 0}
+    for t in throttles:
+        for k, v in t.stats.items():
+            total[k] += v
+        for k, v in t.counts.items():
+            total[k] += v
+    return total
+
+
+def format_stats(total):
+    """One-line summary: sleeping vs waiting for readiness vs useful work."""
+    useful = max(0.0, total['busy'] - total['wait'])
+    spent = total['sleep'] + total['busy'] or 1.0
+    return (f"sleep {total['sleep'] / 60:.1f} min ({100 * total['sleep'] / spent:.0f}%), "
+            f"readiness waits {total['wait'] / 60:.1f} min ({100 * total['wait'] / spent:.0f}%), "
+            f"useful work {useful / 60:.1f} min ({100 * useful / spent:.0f}%) - "
+            f"{total[OK]} ok, {total[EMPTY]} empty, {total[TIMEOUT]} timeouts")
@@ -0,0 +1,324 @@
+/**
+ * Albanian Tech Map - canvas layer for the company vector tiles
+ *
+ * Decodes the point-only Mapbox Vector Tiles served by /techmap/tiles
+ * (written by models/vector_tile.py) and draws every company as a circle on
+ * a canvas tile, so the page loads no third-party vector tile library.
+ */
+
+var TechMapTiles = (function() {
+    'use strict';
+
+    // Geometry command of a POINT feature
+    const MOVE_TO = 1;
+
+    /**
+     * Just enough protobuf to read Tile / Layer / Feature / Value messages
+     */
+    class Reader {
+        constructor(bytes, start = 0, end = bytes.length) {
+            this.bytes = bytes;
+            this.pos = start;
+            this.end = end;
+        }
+
+        varint() {
+            let value = 0;
+            let factor = 1;
+            let byte;
+            do {
+                byte = this.bytes[this.pos++];
+                value += (byte & 0x7f) * factor;  // no bitwise ops: ids may exceed 31 bits
+                factor *= 128;
+            } while (byte & 0x80);
+            return value;
+        }
+
+        sint() {
+            const value = this.varint();
+            return value % 2 ? -(value + 1) / 2 : value / 2;
+        }
+
+        bytesView() {
+            const length = this.varint();
+            const start = this.pos;
+            this.pos += length;
+            return new Reader(this.bytes, start, this.pos);
+        }
+
+        string() {
+            const view = this.bytesView();
+            return new TextDecoder().decode(this.bytes.subarray(view.pos, view.end));
+        }
+
+        packed() {
+            const view = this.bytesView();
+            const values = [];
+            while (view.pos < view.end) {
+                values.push(view.varint());
+            }
+            return values;
+        }
+
+        skip(wireType) {
+            if (wireType === 0) this.varint();
+            else if (wireType === 1) this.pos += 8;
+            else if (wireType === 2) this.pos += this.varint();
+            else if (wireType === 5) this.pos += 4;
+            else throw new Error(`unsupported wire type ${wireType}`);
+        }
+
+        /**
+         * Call handler(field number, wire type) for every field up to the end
+         */
+        fields(handler) {
+            while (this.pos < this.end) {
+                const key = this.varint();
+                const field = Math.floor(key / 8);
+                const wireType = key & 7;
+                if (handler(field, wireType) === false) {
+                    this.skip(wireType);
+                }
+            }
+        }
+    }
+
+    function readValue(reader) {
+        let value = null;
+        reader.fields((field, wireType) => {
+            const view = new DataView(reader.bytes.buffer, reader.bytes.byteOffset + reader.pos);
+            if (field === 1) value = reader.string();
+            else if (field === 2 && wireType === 5) { value = view.getFloat32(0, true); reader.pos += 4; }
+            else if (field === 3 && wireType === 1) { value = view.getFloat64(0, true); reader.pos += 8; }
+            else if (field === 4 || field === 5) value = reader.varint();
+            else if (field === 6) value = reader.sint();
+            else if (field === 7) value = Boolean(reader.varint());
+            else return false;
+        });
+        return value;
+    }
+
+    function readFeature(reader) {
+        const feature = { id: null, tags: [], geometry: [] };
+        reader.fields(field => {
+            if (field === 1) feature.id = reader.varint();
+            else if (field === 2) feature.tags = reader.packed();
+            else if (field === 4) feature.geometry = reader.packed();
+            else return false;
+        });
+        return feature;
+    }
+
+    function readLayer(reader) {
+        const layer = { name: '', extent: 4096, features: [] };
+        const raw = [];
+        const keys = [];
+        const values = [];
+        reader.fields(field => {
+            if (field === 1) layer.name = reader.string();
+            else if (field === 2) raw.push(readFeature(reader.bytesView()));
+            else if (field === 3) keys.push(reader.string());
+            else if (field === 4) values.push(readValue(reader.bytesView()));
+            else if (field === 5) layer.extent = reader.varint();
+            else return false;
+        });
+        raw.forEach(feature => {
+            const properties = {};
+            for (let i = 0; i + 1 < feature.tags.length; i += 2) {
+                properties[keys[feature.tags[i]]] = values[feature.tags[i + 1]];
+            }
+            // Points only: MoveTo commands, each followed by zigzag dx/dy pairs
+            const geometry = feature.geometry;
+            let x = 0;
+            let y = 0;
+            for (let i = 0; i < geometry.length;) {
+                const command = geometry[i] & 7;
+                const count = Math.floor(geometry[i++] / 8);
+                for (let n = 0; n < count; n++) {
+                    const dx = geometry[i++];
+                    const dy = geometry[i++];
+                    x += dx % 2 ? -(dx + 1) / 2 : dx / 2;
+                    y += dy % 2 ? -(dy + 1) / 2 : dy / 2;
+                    if (command === MOVE_TO) {
+                        layer.features.push({ id: feature.id, x, y, properties });
+                    }
+                }
+            }
+        });
+        return layer;
+    }
+
+    /**
+     * {layer name: {name, extent, features: [{id, x, y, properties}]}} of a tile
+     */
+    function decodeTile(bytes) {
+        const reader = new Reader(bytes);
+        const layers = {};
+        reader.fields(field => {
+            if (field !== 3) return false;
+            const layer = readLayer(reader.bytesView());
+            layers[layer.name] = layer;
+        });
+        return layers;
+    }
+
+    /**
+     * Grid layer drawing one tile layer's points with style(properties):
+     * {radius, fill, fillColor, fillOpacity, stroke, color, weight}. A
+     * radius of 0 hides a point. Fires 'click' with {latlng, properties}.
+     */
+    function createLayer() {
+        return L.GridLayer.extend({
+            options: {
+                layer: 'companies',
+                style: () => ({ radius: 5, fill: true, fillColor: '#3388ff' }),
+                // Extra pixels around a point that still count as a hit
+                hitTolerance: 3,
+            },
+
+            initialize(url, options) {
+                this._url = url;
+                L.GridLayer.prototype.initialize.call(this, options);
+            },
+
+            onAdd(map) {
+                L.GridLayer.prototype.onAdd.call(this, map);
+                map.on('click', this._onClick, this);
+                map.on('mousemove', this._onMouseMove, this);
+                this.on('tileunload', this._onTileUnload, this);
+            },
+
+            onRemove(map) {
+                map.off('click', this._onClick, this);
+                map.off('mousemove', this._onMouseMove, this);
+                this.off('tileunload', this._onTileUnload, this);
+                L.GridLayer.prototype.onRemove.call(this, map);
+            },
+
+            createTile(coords, done) {
+                const size = this.getTileSize();
+                const ratio = window.devicePixelRatio || 1;
+                const tile = L.DomUtil.create('canvas', 'leaflet-tile');
+                tile.width = size.x * ratio;
+                tile.height = size.y * ratio;
+                tile._points = [];
+                tile._request = new AbortController();
+
+                fetch(L.Util.template(this._url, coords), { signal: tile._request.signal })
+                    .then(response => {
+                        if (!response.ok) {
+                            throw new Error(`HTTP ${response.status}`);
+                        }
+                        return response.arrayBuffer();
+                    })
+                    .then(buffer => {
+                        const layer = decodeTile(new Uint8Array(buffer))[this.options.layer];
+                        if (layer) {
+                            const scale = size.x / layer.extent;
+                            tile._points = layer.features.map(feature => ({
+                                x: feature.x * scale,
+                                y: feature.y * scale,
+                                properties: feature.properties,
+                            }));
+                        }
+                        this._drawTile(tile);
+                        done(null, tile);
+                    })
+                    .catch(error => {
+                        if (error.name !== 'AbortError') {
+                            done(error, tile);
+                        }
+                    });
+                return tile;
+            },
+
+            /**
+             * Redraw the loaded tiles with the current style, without refetching
+             */
+            restyle() {
+                Object.values(this._tiles).forEach(tile => this._drawTile(tile.el));
+            },
+
+            _drawTile(tile) {
+                const ctx = tile.getContext('2d');
+                const ratio = tile.width / this.getTileSize().x;
+                ctx.setTransform(1, 0, 0, 1, 0, 0);
+                ctx.clearRect(0, 0, tile.width, tile.height);
+                ctx.setTransform(ratio, 0, 0, ratio, 0, 0);
+                tile._points.forEach(point => {
+                    const style = this.options.style(point.properties);
+                    if (!style.radius) {
+                        return;
+                    }
+                    ctx.beginPath();
+                    ctx.arc(point.x, point.y, style.radius, 0, 2 * Math.PI);
+                    if (style.fill) {
+                        ctx.globalAlpha = style.fillOpacity === undefined ? 1 : style.fillOpacity;
+                        ctx.fillStyle = style.fillColor;
+                        ctx.fill();
+                    }
+                    if (style.stroke !== false && style.weight) {
+                        ctx.globalAlpha = style.opacity === undefined ? 1 : style.opacity;
+                        ctx.lineWidth = style.weight;
+                        ctx.strokeStyle = style.color;
+                        ctx.stroke();
+                    }
+                });
+                ctx.globalAlpha = 1;
+            },
+
+            /**
+             * Topmost visible point under a map position, or null
+             */
+            _hitTest(latlng) {
+                const zoom = this._tileZoom;
+                if (zoom === undefined || zoom < this.options.minZoom || zoom > this.options.maxZoom) {
+                    return null;
+                }
+                const size = this.getTileSize();
+                const pixel = this._map.project(latlng, zoom);
+                const coords = pixel.unscaleBy(size).floor();
+                coords.z = zoom;
+                const tile = this._tiles[this._tileCoordsToKey(coords)];
+                if (!tile || !tile.loaded) {
+                    return null;
+                }
+                const local = pixel.subtract(coords.scaleBy(size));
+                const points = tile.el._points;
+                for (let i = points.length - 1; i >= 0; i--) {
+                    const radius = this.options.style(points[i].properties).radius;
+                    const reach = radius + this.options.hitTolerance;
+                    if (radius && local.distanceTo(L.point(points[i].x, points[i].y)) <= reach) {
+                        return points[i];
+                    }
+                }
+                return null;
+            },
+
+            _onClick(e) {
+                const point = this._hitTest(e.latlng);
+                if (point) {
+                    this.fire('click', { latlng: e.latlng, properties: point.properties });
+                }
+            },
+
+            _onMouseMove(e) {
+                this._map.getContainer().style.cursor = this._hitTest(e.latlng) ? 'pointer' : '';
+            },
+
+            _onTileUnload(e) {
+                e.tile._request.abort();
+            },
+        });
+    }
+
+    let CompanyTileLayer = null;
+
+    return {
+        decodeTile,
+        companyTiles(url, options) {
+            CompanyTileLayer = CompanyTileLayer || createLayer();
+            return new CompanyTileLayer(url, options);
+        },
+    };
+})();
@@ -8,18 +8,52 @@
 
     // Global variables
     let map = null;
-    let markers = [];
-    let companies = [];
+    let markerLayer = null;   // cluster bubbles of the current view
+    let companyTiles = null;  // company points, drawn on canvas from vector tiles
+    let companies = [];       // companies in the current view (sidebar)
+    let viewport = null;      // last /bbox response
     let currentFilter = 'all';
+    let searchQuery = '';
+    let searchIndex = new TechMapSearch.SearchIndex([]);  // over `companies`
+    let searchHits = new Set();  // ids of the companies matching searchQuery
+    let pendingRequest = null;
+    let clusterRequest = null;  // cluster tiles of the current view, in flight
+    let selectedCompanyId = null;
+    let listRows = [];        // companies in the sidebar list
+    let listFrame = null;     // pending requestAnimationFrame of the list
+
+    // Filter buttons -> category sent to the viewport API
+    const FILTER_CATEGORIES = {
+        all: null,
+        software: 'software',
+        agency: 'digital_agency',
+    };
+
+    // Point colours on the canvas layer, by category
+    const CATEGORY_COLORS = {
+        software: '#0d6efd',
+        digital_agency: '#198754',
+    };
+    const DEFAULT_COLOR = '#764ba2';
+    // Filtered-out points stay on the canvas layer, drawn as nothing
+    const HIDDEN_STYLE = { radius: 0, fill: false, stroke: false };
+
+    // Sidebar rows have a fixed height, so only those in view are rendered
+    const LIST_ROW_HEIGHT = 76;
+    const LIST_OVERSCAN = 6;
+    const SEARCH_DEBOUNCE_MS = 200;
 
     /**
      * Initialize the map when DOM is ready
      */
     function initMap() {
-        // Create map instance
+        selectedCompanyId = TECHMAP_CONFIG.selectedCompanyId;
+
+        // Create map instance (centered on the selected company, if any)
+        const selected = TECHMAP_CONFIG.selectedCompanyPosition;
         map = L.map('map', {
-            center: TECHMAP_CONFIG.mapCenter,
-            zoom: TECHMAP_CONFIG.mapZoom,
+            center: selected || TECHMAP_CONFIG.mapCenter,
+            zoom: selected ? 16 : TECHMAP_CONFIG.mapZoom,
             zoomControl: true,
         });
 
@@ -29,73 +63,213 @@
             maxZoom: 19,
         }).addTo(map);
 
-        // Fix Leaflet default marker icon paths
-        delete L.Icon.Default.prototype._getIconUrl;
-        L.Icon.Default.mergeOptions({
-            iconRetinaUrl: 'https://unpkg.com/leaflet@1.9.4/dist/images/marker-icon-2x.png',
-            iconUrl: 'https://unpkg.com/leaflet@1.9.4/dist/images/marker-icon.png',
-            shadowUrl: 'https://unpkg.com/leaflet@1.9.4/dist/images/marker-shadow.png',
+        // Companies as canvas points from the vector tiles - drawing cost
+        // depends on what is in view, not on how many companies exist
+        companyTiles = TechMapTiles.companyTiles(`${TECHMAP_CONFIG.tileUrl}/{z}/{x}/{y}.pbf`, {
+            layer: 'companies',
+            minZoom: TECHMAP_CONFIG.clusterBelowZoom,
+            maxZoom: 19,
+            style: companyStyle,
         });
+        companyTiles.on('click', e => openCompanyPopup(e.properties, e.latlng));
+        companyTiles.addTo(map);
+
+        // Cluster bubbles (with their counts) below clusterBelowZoom
+        markerLayer = L.layerGroup().addTo(map);
 
-        // Load companies from API
-        loadCompanies();
+        // Load what is in view now and after every pan/zoom
+        map.on('moveend', loadViewport);
+        loadViewport();
 
         // Setup event listeners
         setupEventListeners();
     }
 
     /**
-     * Load companies from API
+     * Load the companies (or cluster counts) inside the visible map area
      */
-    function loadCompanies() {
-        console.log('Loading companies from API...');
+    function loadViewport() {
+        loadClusters();
 
-        fetch(TECHMAP_CONFIG.apiUrl)
+        // A newer view replaces any request still in flight
+        if (pendingRequest) {
+            pendingRequest.abort();
+        }
+        pendingRequest = new AbortController();
+
+        const bounds = map.getBounds();
+        const params = new URLSearchParams({
+            bbox: [bounds.getWest(), bounds.getSouth(), bounds.getEast(), bounds.getNorth()]
+                .map(v => v.toFixed(5)).join(','),
+            zoom: map.getZoom(),
+        });
+        const category = FILTER_CATEGORIES[currentFilter];
+        if (category) {
+            params.set('category', category);
+        }
+
+        fetch(`${TECHMAP_CONFIG.viewportUrl}?${params}`, { signal: pendingRequest.signal })
             .then(response => response.json())
             .then(data => {
-                console.log(`Loaded ${data.length} companies`);
-                companies = data;
-                displayCompanies(companies);
-                populateCompanyList(companies);
-
-                // If there's a selected company, zoom to it
-                if (TECHMAP_CONFIG.selectedCompanyId) {
-                    const company = companies.find(c => c.id === TECHMAP_CONFIG.selectedCompanyId);
-                    if (company) {
-                        map.setView([company.lat, company.lng], 16);
-                    }
+                viewport = data;
+                companies = data.companies;
+                searchIndex = new TechMapSearch.SearchIndex(companies);
+                console.log(`Loaded ${data.total} companies in view`);
+                applySearch();
+                if (searchQuery) {
+                    refreshCompanyPoints();
                 }
+                openSelectedCompany();
             })
             .catch(error => {
+                if (error.name === 'AbortError') {
+                    return;
+                }
                 console.error('Error loading companies:', error);
                 showError('Gabim në ngarkimin e të dhënave. Ju lutem provoni përsëri më vonë.');
             });
     }
 
     /**
-     * Display companies on map
+     * Display the precomputed cluster bubbles of the visible web map tiles at
+     * low zoom; from clusterBelowZoom on, companies are points on the canvas
+     * tile layer
      */
-    function displayCompanies(companiesToDisplay) {
-        // Clear existing markers
-        markers.forEach(marker => map.removeLayer(marker));
-        markers = [];
-
-        // Add markers for each company
-        companiesToDisplay.forEach(company => {
-            if (company.lat && company.lng) {
-                const marker = L.marker([company.lat, company.lng])
-                    .addTo(map);
-
-                // Create popup content
-                const popupContent = createPopupContent(company);
-                marker.bindPopup(popupContent);
-
-                // Add marker to array
-                markers.push(marker);
+    function loadClusters() {
+        if (clusterRequest) {
+            clusterRequest.abort();
+            clusterRequest = null;
+        }
+        markerLayer.clearLayers();
+
+        const zoom = map.getZoom();
+        if (zoom >= TECHMAP_CONFIG.clusterBelowZoom) {
+            return;
+        }
+        const request = clusterRequest = new AbortController();
+        const category = FILTER_CATEGORIES[currentFilter];
+        const query = category ? `?${new URLSearchParams({ category })}` : '';
+        const bounds = map.getPixelBounds();
+        const min = bounds.min.divideBy(256).floor();
+        const max = bounds.max.divideBy(256).floor();
+        const last = 2 ** zoom - 1;
+        const tiles = [];
+        for (let x = Math.max(min.x, 0); x <= Math.min(max.x, last); x++) {
+            for (let y = Math.max(min.y, 0); y <= Math.min(max.y, last); y++) {
+                // Each cluster belongs to exactly one tile, so the tiles never repeat one
+                tiles.push(fetch(`${TECHMAP_CONFIG.clusterUrl}/${zoom}/${x}/${y}${query}`, { signal: request.signal })
+                    .then(response => {
+                        if (!response.ok) {
+                            throw new Error(`HTTP ${response.status}`);
+                        }
+                        return response.json();
+                    }));
             }
+        }
+
+        Promise.all(tiles)
+            .then(results => {
+                const clusters = results.flatMap(result => result.clusters);
+                clusters.forEach(cluster => markerLayer.addLayer(createClusterMarker(cluster)));
+                console.log(`Displayed ${clusters.length} clusters on map`);
+            })
+            .catch(error => {
+                if (error.name !== 'AbortError') {
+                    console.error('Error loading clusters:', error);
+                }
+            });
+    }
+
+    /**
+     * Canvas style of one company point; companies only placed near their
+     * city centre are drawn fainter
+     */
+    function companyStyle(properties) {
+        if (!isVisible(properties)) {
+            return HIDDEN_STYLE;
+        }
+        return {
+            radius: 6,
+            fill: true,
+            fillColor: CATEGORY_COLORS[properties.category] || DEFAULT_COLOR,
+            fillOpacity: properties.approximate ? 0.45 : 0.9,
+            color: '#ffffff',
+            weight: 1.5,
+        };
+    }
+
+    /**
+     * Re-apply the filters to the points already drawn, without reloading tiles
+     */
+    function refreshCompanyPoints() {
+        companyTiles.restyle();
+    }
+
+    /**
+     * Whether a company passes the category filter and the search query
+     */
+    function isVisible(company) {
+        const category = FILTER_CATEGORIES[currentFilter];
+        return (!category || company.category === category) && matchesSearch(company);
+    }
+
+    function matchesSearch(company) {
+        if (!searchQuery) {
+            return true;
+        }
+        if (searchIndex.ids.has(company.id)) {
+            return searchHits.has(company.id);
+        }
+        // A point of a crowded view that is not in the loaded list
+        return TechMapSearch.matches(company, searchQuery);
+    }
+
+    /**
+     * Run the search over the loaded companies and show the ranked hits in the sidebar
+     */
+    function runSearch() {
+        const hits = searchIndex.search(searchQuery);
+        searchHits = new Set(hits.map(company => company.id));
+        populateCompanyList(hits);
+    }
+
+    /**
+     * Popup for a company point - full details when the company is in the loaded view
+     */
+    function openCompanyPopup(properties, latlng) {
+        const company = companies.find(c => c.id === properties.id) || properties;
+        L.popup()
+            .setLatLng(latlng)
+            .setContent(createPopupContent(company))
+            .openOn(map);
+    }
+
+    /**
+     * Cluster marker with the company count; clicking zooms into it
+     */
+    function createClusterMarker(cluster) {
+        const size = cluster.count < 10 ? 30 : cluster.count < 100 ? 38 : 46;
+        const marker = L.marker([cluster.lat, cluster.lng], {
+            icon: L.divIcon({
+                className: 'map-cluster',
+                html: `<span>${cluster.count}</span>`,
+                iconSize: [size, size],
+            }),
         });
+        marker.on('click', () => map.setView([cluster.lat, cluster.lng], Math.min(map.getZoom() + 2, 18)));
+        return marker;
+    }
 
-        console.log(`Displayed ${markers.length} markers on map`);
+    /**
+     * Open the popup of the company picked from the sidebar or the URL, once it is loaded
+     */
+    function openSelectedCompany() {
+        if (!selectedCompanyId) return;
+        const company = companies.find(c => c.id === selectedCompanyId);
+        if (company) {
+            selectedCompanyId = null;
+            openCompanyPopup(company, [company.lat, company.lng]);
+        }
     }
 
     /**
@@ -138,40 +312,61 @@
         const listContainer = document.getElementById('company-list');
         if (!listContainer) return;
 
-        listContainer.innerHTML = '';
+        listRows = companiesToDisplay;
+        listContainer.scrollTop = 0;
 
         if (companiesToDisplay.length === 0) {
             listContainer.innerHTML = '<div class="alert alert-info m-2">Nuk u gjet asnjë kompani.</div>';
             return;
         }
 
-        companiesToDisplay.forEach(company => {
-            const item = document.createElement('div');
-            item.className = 'company-list-item';
-            item.innerHTML = `
-                <div class="company-name">${escapeHtml(company.name)}</div>
-                <div class="company-meta">
-                    <span class="badge bg-info">${escapeHtml(company.category)}</span>
-                    ${company.city ? `<span class="badge bg-secondary">${escapeHtml(company.city)}</span>` : ''}
+        // Only the first companies of a crowded view are sent
+        const note = viewport && viewport.total > companies.length
+            ? `<div class="alert alert-light m-2 small">${companies.length} nga ${viewport.total} kompani në këtë pamje - zmadhoni hartën për më shumë.</div>`
+            : '';
+        listContainer.innerHTML = `${note}<div class="company-list-window" style="height: ${listRows.length * LIST_ROW_HEIGHT}px"></div>`;
+        renderListWindow();
+    }
+
+    /**
+     * Render the sidebar rows in (and just around) the scrolled-to window
+     */
+    function renderListWindow() {
+        listFrame = null;
+        const listContainer = document.getElementById('company-list');
+        const listWindow = listContainer && listContainer.querySelector('.company-list-window');
+        if (!listWindow) return;
+
+        const top = listContainer.scrollTop - listWindow.offsetTop;
+        const first = Math.max(0, Math.floor(top / LIST_ROW_HEIGHT) - LIST_OVERSCAN);
+        const last = Math.min(listRows.length,
+            Math.ceil((top + listContainer.clientHeight) / LIST_ROW_HEIGHT) + LIST_OVERSCAN);
+
+        let html = '';
+        for (let i = first; i < last; i++) {
+            const company = listRows[i];
+            html += `
+                <div class="company-list-item" data-index="${i}" style="top: ${i * LIST_ROW_HEIGHT}px">
+                    <div class="company-name">${escapeHtml(company.name)}</div>
+                    <div class="company-meta">
+                        <span class="badge bg-info">${escapeHtml(company.category)}</span>
+                        ${company.city ? `<span class="badge bg-secondary">${escapeHtml(company.city)}</span>` : ''}
+                    </div>
                 </div>
             `;
+        }
+        listWindow.innerHTML = html;
+    }
 
-            // Click to zoom to company
-            item.addEventListener('click', () => {
-                map.setView([company.lat, company.lng], 16);
-
-                // Find and open the marker popup
-                const marker = markers.find(m =>
-                    m.getLatLng().lat === company.lat &&
-                    m.getLatLng().lng === company.lng
-                );
-                if (marker) {
-                    marker.openPopup();
-                }
-            });
-
-            listContainer.appendChild(item);
-        });
+    /**
+     * Call `fn` once input has paused for `wait` ms
+     */
+    function debounce(fn, wait) {
+        let timer = null;
+        return (...args) => {
+            clearTimeout(timer);
+            timer = setTimeout(() => fn(...args), wait);
+        };
     }
 
     /**
@@ -196,9 +391,25 @@
         // Search input
         const searchInput = document.getElementById('search-input');
         if (searchInput) {
-            searchInput.addEventListener('input', (e) => {
-                const query = e.target.value.toLowerCase();
-                filterBySearch(query);
+            const search = debounce(query => filterBySearch(query), SEARCH_DEBOUNCE_MS);
+            searchInput.addEventListener('input', (e) => search(e.target.value.trim()));
+        }
+
+        // Sidebar list: one scroll listener and one click listener for all rows
+        const listContainer = document.getElementById('company-list');
+        if (listContainer) {
+            listContainer.addEventListener('scroll', () => {
+                if (!listFrame) {
+                    listFrame = requestAnimationFrame(renderListWindow);
+                }
+            });
+            listContainer.addEventListener('click', (e) => {
+                const item = e.target.closest('.company-list-item');
+                if (!item) return;
+                // Zoom to the company; its popup opens once that view is loaded
+                const company = listRows[Number(item.dataset.index)];
+                selectedCompanyId = company.id;
+                map.setView([company.lat, company.lng], 16);
             });
         }
 
@@ -213,26 +424,12 @@
     }
 
     /**
-     * Filter companies by category
+     * Filter companies by category (server-side, for the current view)
      */
     function filterCompanies(filter) {
         currentFilter = filter;
-
-        let filtered = companies;
-
-        if (filter === 'software') {
-            filtered = companies.filter(c =>
-                c.category.toLowerCase().includes('software')
-            );
-        } else if (filter === 'agency') {
-            filtered = companies.filter(c =>
-                c.category.toLowerCase().includes('agency') ||
-                c.category.toLowerCase().includes('digital')
-            );
-        }
-
-        displayCompanies(filtered);
-        populateCompanyList(filtered);
+        loadViewport();
+        refreshCompanyPoints();
 
         // Update active button
         document.querySelectorAll('.btn-group button').forEach(btn => {
@@ -245,20 +442,16 @@
      * Filter companies by search query
      */
     function filterBySearch(query) {
-        if (!query) {
-            displayCompanies(companies);
-            populateCompanyList(companies);
-            return;
-        }
-
-        const filtered = companies.filter(c =>
-            c.name.toLowerCase().includes(query) ||
-            (c.category && c.category.toLowerCase().includes(query)) ||
-            (c.city && c.city.toLowerCase().includes(query))
-        );
+        searchQuery = query;
+        runSearch();
+        refreshCompanyPoints();
+    }
 
-        displayCompanies(filtered);
-        populateCompanyList(filtered);
+    /**
+     * Show a freshly loaded view: its companies matching the search query
+     */
+    function applySearch() {
+        runSearch();
     }
 
     /**
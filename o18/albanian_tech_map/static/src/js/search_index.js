@@ -0,0 +1,165 @@
+/**
+ * Albanian Tech Map - in-memory search index for the sidebar
+ *
+ * Built once per loaded view: word prefixes (1-2 characters) and trigrams
+ * map to sorted lists of row numbers, so a query only intersects a few short
+ * lists instead of scanning every company.
+ */
+
+var TechMapSearch = (function() {
+    'use strict';
+
+    // Albanian accent folding - same rules as fold_text() in models/tech_company.py
+    const FOLD_FROM = 'ëçËÇ';
+    const FOLD_TO = 'ecec';
+    const FOLD_PATTERN = new RegExp(`[${FOLD_FROM}]`, 'g');
+    const WORD_SPLIT = /[^\p{L}\p{N}]+/u;
+
+    function foldText(text) {
+        return (text || '').replace(FOLD_PATTERN, ch => FOLD_TO[FOLD_FROM.indexOf(ch)]).toLowerCase();
+    }
+
+    function words(text) {
+        return text.split(WORD_SPLIT).filter(Boolean);
+    }
+
+    /**
+     * Append row to the posting list of key, once per row
+     */
+    function post(lists, key, row) {
+        const list = lists.get(key);
+        if (!list) {
+            lists.set(key, [row]);
+        } else if (list[list.length - 1] !== row) {
+            list.push(row);
+        }
+    }
+
+    function intersect(a, b) {
+        const out = [];
+        let i = 0;
+        let j = 0;
+        while (i < a.length && j < b.length) {
+            if (a[i] === b[j]) {
+                out.push(a[i]);
+                i++;
+                j++;
+            } else if (a[i] < b[j]) {
+                i++;
+            } else {
+                j++;
+            }
+        }
+        return out;
+    }
+
+    class SearchIndex {
+        /**
+         * rows: companies with name, category and city
+         */
+        constructor(rows) {
+            this.rows = rows;
+            this.ids = new Set(rows.map(company => company.id));
+            this.names = [];
+            this.nameWords = [];  // ' word word ...' - ' ' + token finds word prefixes
+            this.texts = [];
+            this.prefixes = new Map();
+            this.trigrams = new Map();
+            rows.forEach((company, row) => {
+                const name = foldText(company.name);
+                const text = `${name} ${foldText(company.category).replace(/_/g, ' ')} ${foldText(company.city)}`;
+                this.names.push(name);
+                this.nameWords.push(` ${words(name).join(' ')}`);
+                this.texts.push(text);
+                words(text).forEach(word => {
+                    post(this.prefixes, word.slice(0, 1), row);
+                    if (word.length > 1) {
+                        post(this.prefixes, word.slice(0, 2), row);
+                    }
+                    for (let i = 0; i + 3 <= word.length; i++) {
+                        post(this.trigrams, word.slice(i, i + 3), row);
+                    }
+                });
+            });
+        }
+
+        /**
+         * Rows containing token: a word prefix for 1-2 characters, a substring from 3
+         */
+        candidates(token) {
+            if (token.length < 3) {
+                return this.prefixes.get(token) || [];
+            }
+            const lists = [];
+            for (let i = 0; i + 3 <= token.length; i++) {
+                const list = this.trigrams.get(token.slice(i, i + 3));
+                if (!list) {
+                    return [];
+                }
+                lists.push(list);
+            }
+            lists.sort((a, b) => a.length - b.length);
+            let rows = lists.reduce(intersect);
+            if (lists.length > 1) {
+                // Trigrams in the right words but not next to each other
+                rows = rows.filter(row => this.texts[row].includes(token));
+            }
+            return rows;
+        }
+
+        /**
+         * Rank of a matching row (0 = best): whole name, name prefix, then per
+         * token whether it starts a word of the name, occurs in it, or only
+         * matched category/city
+         */
+        rank(row, query, tokens) {
+            const name = this.names[row];
+            if (name === query) {
+                return 0;
+            }
+            if (name.startsWith(query)) {
+                return 1;
+            }
+            const nameWords = this.nameWords[row];
+            let rank = 2;
+            for (let i = 0; i < tokens.length; i++) {
+                if (!nameWords.includes(` ${tokens[i]}`)) {
+                    rank += name.includes(tokens[i]) ? 1 : 2;
+                }
+            }
+            return rank;
+        }
+
+        /**
+         * Companies matching every word of the query, best first (ties keep load order)
+         */
+        search(query) {
+            const folded = foldText(query).trim();
+            const tokens = words(folded);
+            if (!tokens.length) {
+                return this.rows;
+            }
+            const lists = tokens.map(token => this.candidates(token)).sort((a, b) => a.length - b.length);
+            // Ranks are small integers: bucket the rows (already in load order) instead of sorting
+            const buckets = [];
+            for (const row of lists.reduce(intersect)) {
+                const rank = this.rank(row, folded, tokens);
+                (buckets[rank] || (buckets[rank] = [])).push(this.rows[row]);
+            }
+            return [].concat(...buckets.filter(Boolean));
+        }
+    }
+
+    /**
+     * Same test as SearchIndex.search() for one company, without an index
+     */
+    function matches(company, query) {
+        const text = foldText(`${company.name} ${(company.category || '').replace(/_/g, ' ')} ${company.city || ''}`);
+        const textWords = words(text);
+        return words(foldText(query)).every(token => token.length < 3
+            ? textWords.some(word => word.startsWith(token))
+            : textWords.some(word => word.includes(token)));
+    }
+
+    return { foldText, matches, SearchIndex };
+})();